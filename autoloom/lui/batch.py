@@ -0,0 +1,146 @@
+import argparse
+import asyncio
+import json
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+from .engine import LoomEngine, LoomParams
+from .sessions import Session, SessionScheduler
+from .search import SearchParams, TreeSearch
+from .models.cascade import PrefilteredClassifier
+from .models.transport import close_transport
+from .telemetry import configure_logging, get_telemetry
+
+logger = logging.getLogger(__name__)
+
+
+def read_prompts(path: str) -> List[str]:
+    """Read prompts from a .jsonl file ({"prompt": ...} per line) or a text file (one per line)"""
+    prompts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                prompts.append(json.loads(line)["prompt"])
+            else:
+                prompts.append(line)
+    return prompts
+
+
+async def run_batch(prompts: List[str], params: LoomParams, rounds: int,
+                    concurrency: int, output_path: Path, search: Optional[SearchParams] = None):
+    """Run one loom session per prompt, writing each session to JSONL as it completes.
+
+    Without `search` each session greedily extends the best generation for
+    `rounds` rounds; with it each session runs a tree search instead.
+    """
+    engine = LoomEngine()
+    scheduler = SessionScheduler(concurrency)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    async def run_one(session: Session, prompt: str) -> dict:
+        try:
+            return await run_session(session, prompt)
+        except Exception as e:
+            # One failed session is recorded and the rest of the batch carries on
+            logger.error("Session %d failed: %s", session.id, e)
+            return {'session': session.id, 'original_prompt': prompt, 'error': f"{type(e).__name__}: {e}"}
+
+    async def run_session(session: Session, prompt: str) -> dict:
+        if search is not None:
+            result = await TreeSearch(engine.generator, params, search).run(prompt)
+            return {'session': session.id, 'original_prompt': prompt, **result.to_dict()}
+
+        results = await engine.run_session(prompt, params, rounds, session=session)
+        return {
+            'session': session.id,
+            'original_prompt': prompt,
+            'rounds': [result.to_dict() for result in results],
+            'final_text': results[-1].chosen_text if results else None,
+        }
+
+    try:
+        tasks = [scheduler.start(lambda session, prompt=prompt: run_one(session, prompt)).task for prompt in prompts]
+        with open(output_path, "w", encoding="utf-8") as f:
+            for done, future in enumerate(asyncio.as_completed(tasks), 1):
+                record = await future
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                if 'error' in record:
+                    print(f"[{done}/{len(prompts)}] session {record['session']}: failed ({record['error']})")
+                elif search is not None:
+                    print(f"[{done}/{len(prompts)}] session {record['session']}: best score {record['best_score']} from {record['nodes']} nodes")
+                else:
+                    print(f"[{done}/{len(prompts)}] session {record['session']}: {len(record['rounds'])} rounds")
+        print(f"Prompt tokens: {engine.generator.context.summary()}")
+        print(f"Sub-request sizes: {engine.generator.splitter.summary()}")
+        service_summary = engine.generator.service_summary()
+        if service_summary:
+            print(service_summary)
+        for model, classifier in engine.generator.classifiers.items():
+            if isinstance(classifier, PrefilteredClassifier):
+                print(f"Cascade ({model}): {classifier.stats.summary()}")
+            elif getattr(classifier, 'batch_requests', 0):
+                print(f"Batched scoring ({model}): {classifier.batch_summary()}")
+        if engine.generator.router.coalesced:
+            print(f"Coalesced requests: {engine.generator.router.summary()}")
+        if engine.generator.hedger.enabled:
+            print(f"Hedging: {engine.generator.hedger.summary()}")
+        print(get_telemetry().format_summary())
+    finally:
+        await scheduler.close()
+        await engine.close()
+        await close_transport()
+        get_telemetry().close()
+
+
+def main():
+    """Entry point for lui-batch"""
+    parser = argparse.ArgumentParser(description="Run loom sessions headlessly and write the results as JSONL")
+    parser.add_argument("prompts", help="Prompt file: .jsonl with a 'prompt' field, or one prompt per line")
+    parser.add_argument("-o", "--output", default="loom_results.jsonl", help="Output JSONL path")
+    parser.add_argument("--generation-model", default="meta-llama/Meta-Llama-3.1-405B")
+    parser.add_argument("--classifier-model", default="gpt-4")
+    parser.add_argument("--rounds", type=int, default=5, help="Rounds per session")
+    parser.add_argument("--num-generations", type=int, default=5)
+    parser.add_argument("--max-tokens", type=int, default=100)
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--concurrency", type=int, default=8, help="Sessions running at once")
+    parser.add_argument("--no-stream", action="store_true", help="Use batch requests instead of streaming")
+    parser.add_argument("--search", choices=["greedy", "beam", "mcts"], default="greedy",
+                        help="greedy extends the best generation each round; beam and mcts search the tree")
+    parser.add_argument("--beam-width", type=int, default=3, help="Nodes kept per depth (beam) or expanded per iteration (mcts)")
+    parser.add_argument("--branching", type=int, default=4, help="Samples per expanded node")
+    parser.add_argument("--iterations", type=int, default=10, help="MCTS iterations")
+    args = parser.parse_args()
+    configure_logging()
+
+    params = LoomParams(
+        generation_model=args.generation_model,
+        classifier_model=args.classifier_model,
+        temperature=args.temperature,
+        max_tokens=args.max_tokens,
+        num_generations=args.num_generations,
+        stream=not args.no_stream,
+    )
+    search = None
+    if args.search != "greedy":
+        search = SearchParams(
+            strategy=args.search,
+            beam_width=args.beam_width,
+            branching=args.branching,
+            depth=args.rounds,
+            iterations=args.iterations,
+        )
+    prompts = read_prompts(args.prompts)
+    try:
+        asyncio.run(run_batch(prompts, params, args.rounds, args.concurrency, Path(args.output), search))
+    except KeyboardInterrupt:
+        print("\nProcess interrupted by user")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import time
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from .models.generator import Generator
+from .models.context import get_token_counter
+from .sessions import Session
+from .telemetry import get_telemetry
+
+
+class LoomParams:
+    """Settings for one loom session"""
+    def __init__(self, generation_model: str, classifier_model: str,
+                 temperature: float = 0.7, max_tokens: int = 100,
+                 num_generations: int = 5, stream: bool = True):
+        self.generation_model = generation_model
+        self.classifier_model = classifier_model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.num_generations = num_generations
+        self.stream = stream
+
+
+class RoundResult:
+    """The generations of one round and their (index, score) pairs, best first"""
+    def __init__(self, prompt: str, generations: List[str], scores: List[Tuple[int, int]]):
+        self.prompt = prompt
+        self.generations = generations
+        self.scores = scores
+
+    @property
+    def chosen(self) -> Tuple[int, int]:
+        return self.scores[0]
+
+    @property
+    def chosen_text(self) -> str:
+        return self.generations[self.chosen[0]]
+
+    def to_dict(self) -> dict:
+        chosen_idx, chosen_score = self.chosen
+        return {
+            'prompt': self.prompt,
+            'generations': self.generations,
+            'scores': self.scores,
+            'chosen': chosen_idx,
+            'chosen_score': chosen_score,
+        }
+
+
+class LoomListener:
+    """Receives progress from the engine. The default implementation ignores everything."""
+    async def on_round_start(self, prompt: str, num_generations: int):
+        pass
+
+    async def on_token(self, idx: int, text: str):
+        pass
+
+    async def on_generations(self, generations: List[str]):
+        pass
+
+    async def on_score(self, idx: int, score: int):
+        pass
+
+
+class SpeculativeRound(LoomListener):
+    """A round started from a candidate before the user confirmed it as the next prompt.
+
+    Progress is buffered until `adopt` hands the round to a listener.
+    `discard` cancels it and returns what it had already spent.
+    """
+    def __init__(self, engine: "LoomEngine", prompt: str, params: LoomParams):
+        self.prompt = prompt
+        self.params = params
+        self._listener: Optional[LoomListener] = None
+        self._events: Deque[Tuple[str, tuple]] = deque()
+        self._texts: Dict[int, str] = {}
+        self._scored = 0
+        self._started = time.monotonic()
+        self.task = asyncio.ensure_future(engine.run_round(prompt, params, self))
+
+    async def _emit(self, name: str, *args):
+        if self._listener is None:
+            self._events.append((name, args))
+        else:
+            await getattr(self._listener, name)(*args)
+
+    async def on_round_start(self, prompt: str, num_generations: int):
+        await self._emit("on_round_start", prompt, num_generations)
+
+    async def on_token(self, idx: int, text: str):
+        self._texts[idx] = text
+        await self._emit("on_token", idx, text)
+
+    async def on_generations(self, generations: List[str]):
+        self._texts.update(enumerate(generations))
+        await self._emit("on_generations", generations)
+
+    async def on_score(self, idx: int, score: int):
+        self._scored += 1
+        await self._emit("on_score", idx, score)
+
+    async def adopt(self, listener: LoomListener) -> Optional[RoundResult]:
+        """Wait for the round, replaying its progress to `listener` if it is still running.
+
+        A round that already finished is returned without replay; the caller renders its result.
+        """
+        with get_telemetry().span("speculation.adopt", finished=self.task.done(),
+                                  ahead_s=time.monotonic() - self._started):
+            if not self.task.done():
+                while self._events:
+                    name, args = self._events.popleft()
+                    await getattr(listener, name)(*args)
+                self._listener = listener
+        return await self.task
+
+    def cost(self) -> Dict[str, float]:
+        """Completion tokens received, scores requested and seconds spent so far"""
+        counter = get_token_counter(self.params.generation_model)
+        return {
+            'completion_tokens': sum(counter.count(text) for text in self._texts.values()),
+            'scores': self._scored,
+            'seconds': time.monotonic() - self._started,
+        }
+
+    def discard(self) -> Dict[str, float]:
+        cost = self.cost()
+        with get_telemetry().span("speculation.discard", finished=self.task.done(), **cost):
+            self.task.cancel()
+        # Nobody awaits a discarded round, so retrieve its outcome to keep errors out of the loop's log
+        self.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return cost
+
+
+def has_successful_generation(generations: List[str]) -> bool:
+    return any(g and not g.startswith("Error:") for g in generations)
+
+
+class LoomEngine:
+    """Runs loom rounds and sessions without any UI.
+
+    Several sessions can run concurrently on one event loop; they share the
+    generator, its classifiers and the process-wide transport.
+    """
+    def __init__(self, generator: Optional[Generator] = None):
+        self.generator = generator or Generator()
+
+    async def run_round(self, prompt: str, params: LoomParams,
+                        listener: Optional[LoomListener] = None) -> Optional[RoundResult]:
+        """Generate and score one round; None if every generation failed"""
+        listener = listener or LoomListener()
+        with get_telemetry().span("round", generation_model=params.generation_model,
+                                  classifier_model=params.classifier_model, n=params.num_generations,
+                                  stream=params.stream):
+            return await self._run_round(prompt, params, listener)
+
+    async def _run_round(self, prompt: str, params: LoomParams, listener: LoomListener) -> Optional[RoundResult]:
+        await listener.on_round_start(prompt, params.num_generations)
+
+        if params.stream:
+            generations, scores = await self.generator.stream_and_classify(
+                prompt,
+                params.generation_model,
+                params.max_tokens,
+                params.temperature,
+                params.num_generations,
+                params.classifier_model,
+                on_token=listener.on_token,
+                on_score=listener.on_score
+            )
+            if not has_successful_generation(generations):
+                return None
+        else:
+            generations = await self.generator.generate_batch(
+                prompt,
+                params.generation_model,
+                params.max_tokens,
+                params.temperature,
+                params.num_generations
+            )
+            if not has_successful_generation(generations):
+                return None
+            await listener.on_generations(generations)
+            scores = await self.generator.classify(generations, params.classifier_model, listener.on_score, prompt)
+
+        return RoundResult(prompt, generations, scores)
+
+    async def run_session(self, prompt: str, params: LoomParams, rounds: int,
+                          listener: Optional[LoomListener] = None,
+                          session: Optional[Session] = None) -> List[RoundResult]:
+        """Run up to `rounds` rounds, each continuing from the previous round's best generation.
+
+        With a scheduled `session`, pausing it holds the session between rounds.
+        """
+        results = []
+        for _ in range(rounds):
+            if session is not None:
+                await session.checkpoint()
+            result = await self.run_round(prompt, params, listener)
+            if result is None:
+                break
+            results.append(result)
+            prompt = result.chosen_text
+        return results
+
+    def speculate(self, prompt: str, params: LoomParams) -> SpeculativeRound:
+        """Start the round for `prompt` in the background; adopt or discard it once the prompt is decided"""
+        return SpeculativeRound(self, prompt, params)
+
+    async def close(self):
+        await self.generator.close()
@@ -1,6 +1,10 @@
+import os
+from lui.telemetry import configure_logging
 from lui.ui.app import AUTOLOOM
 
 def main():
+    # The TUI owns the terminal, so library logs go to a file
+    configure_logging(os.getenv("LUI_LOG_PATH", "lui.log"))
     app = AUTOLOOM()
     app.run()
 
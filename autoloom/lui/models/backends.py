@@ -0,0 +1,146 @@
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from .endpoints import hyperbolic_base_url, openai_base_url
+from .prefix import get_prefix_router
+from .resilience import RetryPolicy
+
+load_dotenv()
+
+
+class Backend:
+    """An OpenAI-compatible completions provider and what it can do.
+
+    `models` maps the model names it serves to display labels and
+    `prefixes` claims any other model starting with one of them. `max_n` is
+    the most samples one request may ask for (1 when the server ignores n)
+    and `timeout` the per-request timeout in seconds. A comma-separated base
+    URL lists replicas; prompts are spread over them by prefix, so each
+    replica's prompt cache sees the prompts it can reuse.
+    """
+    def __init__(self, name: str, base_url: Callable[[], str], api_key_env: Optional[str],
+                 models: Optional[Dict[str, str]] = None, prefixes: Tuple[str, ...] = (),
+                 max_n: Optional[int] = None, supports_streaming: bool = True, timeout: float = 60.0,
+                 max_attempts: int = 6, deadline: float = 180.0):
+        self.name = name
+        self._base_url = base_url
+        self.api_key_env = api_key_env
+        self.models = models or {}
+        self.prefixes = prefixes
+        self.max_n = max_n
+        self.supports_streaming = supports_streaming
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+
+    @property
+    def base_url(self) -> str:
+        return self.servers[0]
+
+    @property
+    def servers(self) -> List[str]:
+        return [url.strip().rstrip("/") for url in self._base_url().split(",") if url.strip()]
+
+    def server_for(self, prompt: str) -> str:
+        """The replica whose prompt cache has most likely seen this prompt's prefix"""
+        return get_prefix_router().server_for(self.servers, prompt)
+
+    @property
+    def completions_url(self) -> str:
+        return f"{self.base_url}/completions"
+
+    def completions_url_for(self, prompt: str) -> str:
+        return f"{self.server_for(prompt)}/completions"
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return os.getenv(self.api_key_env) if self.api_key_env else None
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def retry_policy(self) -> RetryPolicy:
+        return RetryPolicy(max_attempts=self.max_attempts, base_delay=1.0, max_delay=30.0, deadline=self.deadline)
+
+    def serves(self, model: str) -> bool:
+        return model in self.models or any(model.startswith(prefix) for prefix in self.prefixes)
+
+
+class BackendRegistry:
+    """Maps generation model names to backends.
+
+    A model is routed to the backend that lists it, then to one whose prefix
+    matches, then to the default. "<backend>:<model>" picks a backend
+    explicitly, e.g. to benchmark the same model on two servers.
+    """
+    def __init__(self, default: str):
+        self.default = default
+        self._backends: Dict[str, Backend] = {}
+
+    def register(self, backend: Backend):
+        self._backends[backend.name] = backend
+
+    def get(self, name: str) -> Backend:
+        return self._backends[name]
+
+    def resolve(self, model: str) -> Tuple[Backend, str]:
+        """The backend for a model and the model name to send to it"""
+        name, _, rest = model.partition(":")
+        if rest and name in self._backends:
+            return self._backends[name], rest
+        for backend in self._backends.values():
+            if model in backend.models:
+                return backend, model
+        for backend in self._backends.values():
+            if backend.serves(model):
+                return backend, model
+        return self._backends[self.default], model
+
+    def generation_models(self) -> List[Tuple[str, str]]:
+        """(label, model) pairs for every listed model, for model pickers"""
+        return [(label, model) for backend in self._backends.values() for model, label in backend.models.items()]
+
+    def __iter__(self):
+        return iter(self._backends.values())
+
+
+def default_registry() -> BackendRegistry:
+    registry = BackendRegistry(default="hyperbolic")
+    registry.register(Backend(
+        "hyperbolic", hyperbolic_base_url, "HYPERBOLIC_API_KEY",
+        models={"meta-llama/Meta-Llama-3.1-405B": "Llama-405b Base"},
+    ))
+    # Completions API models are slower to answer
+    registry.register(Backend(
+        "openai", openai_base_url, "OPENAI_API_KEY",
+        models={"gpt-4-base": "GPT-4 Base", "gpt-3.5-turbo-instruct": "GPT-3.5 Turbo Instruct"},
+        prefixes=("gpt-",), max_n=128, timeout=120.0,
+    ))
+
+    # An OpenAI-compatible server on this machine or network, such as vLLM or llama.cpp
+    local_url = os.getenv("LOCAL_LLM_BASE_URL")
+    if local_url:
+        max_n = os.getenv("LOCAL_LLM_MAX_N")
+        models = [model.strip() for model in os.getenv("LOCAL_LLM_MODELS", "").split(",") if model.strip()]
+        registry.register(Backend(
+            "local", lambda: local_url, "LOCAL_LLM_API_KEY",
+            models={model: f"{model} (local)" for model in models},
+            max_n=int(max_n) if max_n else None, timeout=30.0, max_attempts=3, deadline=60.0,
+        ))
+    return registry
+
+
+_registry: Optional[BackendRegistry] = None
+
+
+def get_backend_registry() -> BackendRegistry:
+    """The process-wide registry: Hyperbolic, OpenAI and, when LOCAL_LLM_BASE_URL is set, a local server"""
+    global _registry
+    if _registry is None:
+        _registry = default_registry()
+    return _registry
@@ -0,0 +1,136 @@
+import os
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from .classifier import rank_scores
+
+load_dotenv()
+
+
+class HeuristicScorer:
+    """Free 0-100 score from surface features: rewards lexical variety, penalises repetition and empty text"""
+    model = "heuristic"
+
+    def score(self, text: str) -> float:
+        words = text.split()
+        if not words:
+            return 0.0
+        variety = len(set(words)) / len(words)
+        # Very short continuations carry little signal either way
+        length = min(len(words) / 20, 1.0)
+        return round(100 * variety * (0.5 + 0.5 * length), 2)
+
+    async def classify_one(self, text: str, prefix: str = "") -> Optional[float]:
+        return self.score(text)
+
+    async def classify_batch(self, texts: List[str], callback=None,
+                             prefix: str = "") -> List[Tuple[int, Optional[float]]]:
+        scores = [(idx, self.score(text)) for idx, text in enumerate(texts)]
+        if callback:
+            for idx, score in scores:
+                await callback(idx, score)
+        return rank_scores(scores)
+
+    async def close(self):
+        pass
+
+
+class CascadeStats:
+    def __init__(self):
+        self.rounds = 0
+        self.candidates = 0
+        self.judged = 0
+        self.close_calls = 0
+        self.cheap_seconds = 0.0
+        self.judge_seconds = 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'rounds': self.rounds,
+            'candidates': self.candidates,
+            'judged': self.judged,
+            'close_calls': self.close_calls,
+            # Share of candidates settled by the cheap stage alone
+            'cheap_hit_rate': 1 - self.judged / self.candidates if self.candidates else 0.0,
+            'judge_calls_saved': self.candidates - self.judged,
+            'cheap_seconds': self.cheap_seconds,
+            'judge_seconds': self.judge_seconds,
+        }
+
+
+class PrefilteredClassifier:
+    """Two-stage cascade: a cheap scorer ranks the whole round, an expensive judge rescores the contenders.
+
+    The top `keep_fraction` of a batch (at least `min_keep`) goes to the
+    judge, plus any candidate whose cheap score is within `margin` points of
+    the lowest kept one, since the cheap stage cannot separate those. Judged
+    candidates rank first by the judge's score; the rest keep their cheap
+    scores and rank after them. Candidates the cheap stage failed to score
+    are always judged.
+    """
+    # Selection needs the whole round, so streamed rounds are scored once every choice has finished
+    needs_round = True
+
+    def __init__(self, prefilter, classifier, keep_fraction: float = 0.5, min_keep: int = 1, margin: float = 0.0):
+        self.prefilter = prefilter
+        self.classifier = classifier
+        self.model = classifier.model
+        self.keep_fraction = keep_fraction
+        self.min_keep = min_keep
+        self.margin = margin
+        self.stats = CascadeStats()
+
+    def select(self, cheap: List[Tuple[int, Optional[float]]]) -> Tuple[List[int], List[Tuple[int, Optional[float]]]]:
+        """Split ranked cheap scores into indices for the judge and (index, score) pairs settled cheaply"""
+        unscored = [idx for idx, score in cheap if score is None]
+        ranked = [(idx, score) for idx, score in cheap if score is not None]
+        keep = min(len(ranked), max(self.min_keep, math.ceil(self.keep_fraction * len(ranked))))
+        kept, rest = ranked[:keep], ranked[keep:]
+
+        if kept and self.margin > 0:
+            cutoff = kept[-1][1] - self.margin
+            close = [(idx, score) for idx, score in rest if score >= cutoff]
+            self.stats.close_calls += len(close)
+            kept, rest = kept + close, rest[len(close):]
+        return [idx for idx, _ in kept] + unscored, rest
+
+    async def classify_one(self, text: str, prefix: str = "") -> Optional[float]:
+        return await self.classifier.classify_one(text, prefix)
+
+    async def classify_batch(self, texts: List[str], callback=None,
+                             prefix: str = "") -> List[Tuple[int, Optional[float]]]:
+        started = time.monotonic()
+        cheap = await self.prefilter.classify_batch(texts, prefix=prefix)
+        self.stats.cheap_seconds += time.monotonic() - started
+        judged, settled = self.select(cheap)
+
+        self.stats.rounds += 1
+        self.stats.candidates += len(texts)
+        self.stats.judged += len(judged)
+
+        async def forward(position: int, score: Optional[float]):
+            if callback:
+                await callback(judged[position], score)
+
+        started = time.monotonic()
+        rescored = await self.classifier.classify_batch([texts[idx] for idx in judged], forward, prefix)
+        self.stats.judge_seconds += time.monotonic() - started
+        if callback:
+            for idx, score in settled:
+                await callback(idx, score)
+        return [(judged[position], score) for position, score in rescored] + settled
+
+    async def close(self):
+        await self.prefilter.close()
+        await self.classifier.close()
+
+
+def prefilter_settings() -> Tuple[Optional[str], float, float]:
+    """The PREFILTER_MODEL, PREFILTER_KEEP and PREFILTER_MARGIN settings; no cascade when the model is unset"""
+    return (
+        os.getenv("PREFILTER_MODEL") or None,
+        float(os.getenv("PREFILTER_KEEP", "0.5")),
+        float(os.getenv("PREFILTER_MARGIN", "0")),
+    )
@@ -1,27 +1,128 @@
 import os
-import aiohttp
+import math
 import asyncio
-from typing import List, Tuple
+import logging
+from typing import Dict, List, Optional, Tuple
 import json
 from dotenv import load_dotenv
+from .rate_limiter import RateLimiter, get_rate_limiter, estimate_tokens
+from .transport import get_transport
+from .endpoints import openai_base_url
+from .resilience import FatalError, RetryPolicy, raise_for_status
+from .hedging import get_hedger
+from .score_cache import ScoreCache, get_score_cache
+from ..telemetry import get_telemetry
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+CLASSIFIER_SYSTEM_PROMPT = "You are a classifier. Your task is to rate the quality and coherence of text on a scale from 0-100. Respond with ONLY a number, no explanation."
+BATCH_CLASSIFIER_SYSTEM_PROMPT = (
+    "You are a classifier. You will receive a JSON object whose \"texts\" list holds several candidate texts. "
+    "Rate the quality and coherence of each text on a scale from 0-100. Respond with ONLY a JSON object "
+    "of the form {\"scores\": [...]}, with one integer per text in the same order, no explanation."
+)
+
+# tuni's fine-tuning format (tuni/tuner.py). Y/N classifiers fine-tuned on tuni output are asked in the
+# format they were trained on, with the round's prompt as the prefix and the generation as the suffix.
+TUNI_SYSTEM_PROMPT = "You are a helpful assistant."
+
+def tuni_user_message(prefix: str, suffix: str, ai_completions: int) -> str:
+    return f"""I will give you a prefix and a suffix. The prefix is taken from human writing. The suffix is either written by a human or is an AI completion of the prefix. Note that, for every human example I will ask you about, there are {ai_completions} AI examples; adjust your priors accordingly. Please just give a Y or N for the guess; say Y x% of the time if you are x% sure this is a human suffix, for example. The prefix is \"\"\"{prefix}\"\"\". The suffix is \"\"\"{suffix}\"\"\". Now answer just Y or N."""
+
+def rank_scores(scores: List[Tuple[int, Optional[float]]]) -> List[Tuple[int, Optional[float]]]:
+    """Sort (index, score) pairs best first, with failed (None) scores last"""
+    return sorted(scores, key=lambda x: -1 if x[1] is None else x[1], reverse=True)
+
+def parse_batch_scores(content: str, count: int) -> Optional[List[int]]:
+    """Scores from a batched reply, or None unless it is valid JSON with exactly `count` numbers"""
+    try:
+        scores = json.loads(content)["scores"]
+        if not isinstance(scores, list) or len(scores) != count:
+            return None
+        return [max(0, min(100, int(score))) for score in scores]
+    except (ValueError, TypeError, KeyError):
+        return None
+
+def logprob_score(top_logprobs: List[dict]) -> Optional[float]:
+    """A 0-100 score from the top log-probabilities of a classifier's single output token.
+
+    Y/N classifiers score 100 * P(Y) / (P(Y) + P(N)); numeric classifiers score
+    the probability-weighted mean of the number tokens. None if neither kind
+    of label appears among the candidates.
+    """
+    yes = no = 0.0
+    weighted = number_mass = 0.0
+    for candidate in top_logprobs:
+        token = candidate.get("token", "").strip().lower()
+        probability = math.exp(candidate.get("logprob", -math.inf))
+        if token in ("y", "yes"):
+            yes += probability
+        elif token in ("n", "no"):
+            no += probability
+        elif token.isdigit() and int(token) <= 100:
+            weighted += probability * int(token)
+            number_mass += probability
+
+    if yes + no > number_mass and yes + no > 0:
+        return round(100 * yes / (yes + no), 2)
+    if number_mass > 0:
+        return round(weighted / number_mass, 2)
+    return None
+
+class _Pending:
+    """A scoring request shared by every caller classifying the same text"""
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
 class Classifier:
-    def __init__(self, model="gpt-4"):
-        self.url = "https://api.openai.com/v1/chat/completions"
+    """Scores texts 0-100 with a chat model.
+
+    `scoring` is "digits" (parse the number in a short free-text reply) or
+    "logprob" (read one output token's top log-probabilities, which gives a
+    continuous score for numeric and Y/N fine-tuned classifiers alike).
+    With `batch_size` > 1 in digits mode, texts that arrive within `batch_window` seconds of
+    each other are rated together in one JSON request; if that request fails
+    or its reply cannot be parsed, each text falls back to its own request.
+    """
+    def __init__(self, model="gpt-4", rate_limiter: RateLimiter = None, score_cache: ScoreCache = None,
+                 batch_size: Optional[int] = None, batch_window: Optional[float] = None,
+                 scoring: Optional[str] = None):
+        self.url = f"{openai_base_url()}/chat/completions"
         self.model = model # Using standard GPT-4 model
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"
         }
-        self._session = None
+        # Shared across classifiers so every round respects the same API limits
+        self.rate_limiter = rate_limiter or get_rate_limiter("openai")
+        self.score_cache = score_cache or get_score_cache()
+        self.retry_policy = RetryPolicy(max_attempts=4, base_delay=0.5, max_delay=20.0, deadline=60.0)
+        self.hedger = get_hedger()
+        # Identical texts in the same round share one in-flight request
+        self._pending: Dict[str, _Pending] = {}
+
+        self.scoring = scoring or os.getenv("SCORE_MODE", "digits")
+        if self.scoring not in ("digits", "logprob"):
+            raise ValueError(f"Unknown scoring mode: {self.scoring}")
+        self.batch_size = batch_size if batch_size is not None else int(os.getenv("SCORE_BATCH_SIZE", "1"))
+        self.batch_window = batch_window if batch_window is not None else float(os.getenv("SCORE_BATCH_WINDOW", "0.05"))
+        self._queue: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flushes = set()
+        self.batch_requests = 0
+        self.batch_fallbacks = 0
+        # Logprob mode states tuni's human-to-AI ratio; match the --completions the classifier was trained with
+        self.tuni_completions = int(os.getenv("TUNI_COMPLETIONS", "5"))
 
     async def get_session(self):
-        """Get or create an aiohttp session"""
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
-        return self._session
+        """Get the pooled session from the shared transport"""
+        return await get_transport().get_session()
 
     def _prepare_classification_prompt(self, text: str) -> List[dict]:
         """Prepare the messages for classification"""
@@ -30,7 +131,7 @@ class Classifier:
             return [
                 {
                     "role": "developer", 
-                    "content": "You are a classifier. Your task is to rate the quality and coherence of text on a scale from 0-100. Respond with ONLY a number, no explanation."
+                    "content": CLASSIFIER_SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
@@ -42,7 +143,7 @@ class Classifier:
             return [
                 {
                     "role": "system",
-                    "content": "You are a classifier. Your task is to rate the quality and coherence of text on a scale from 0-100. Respond with ONLY a number, no explanation."
+                    "content": CLASSIFIER_SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
@@ -50,79 +151,264 @@ class Classifier:
                 }
             ]
 
-    async def classify_one(self, text: str) -> int:
-        """Classify a single piece of text"""
+    def _logprob_messages(self, text: str, prefix: str) -> List[dict]:
+        return [
+            {"role": "system", "content": TUNI_SYSTEM_PROMPT},
+            {"role": "user", "content": tuni_user_message(prefix.lstrip(), text, self.tuni_completions)}
+        ]
+
+    async def classify_one(self, text: str, prefix: str = "") -> Optional[float]:
+        """Classify a single piece of text, reusing cached scores for identical text.
+
+        `prefix` is the prompt the text continues; only logprob mode, which
+        asks in tuni's prefix/suffix format, uses it. Returns None when no
+        score could be obtained, so failures rank last instead of
+        masquerading as a middling score.
+        """
+        if self.scoring == "logprob":
+            key = self._cache_key(self._logprob_messages(text, prefix)[1]["content"], TUNI_SYSTEM_PROMPT)
+        elif self.batch_size > 1:
+            key = self._cache_key(text, BATCH_CLASSIFIER_SYSTEM_PROMPT)
+        else:
+            key = self._cache_key(text, CLASSIFIER_SYSTEM_PROMPT)
+        pending = self._pending.get(key)
+        if pending is None:
+            cached = self.score_cache.get(key)
+            if cached is not None:
+                return cached
+            # The request runs as its own task, so a caller that is cancelled never cancels it for the others
+            pending = self._pending[key] = _Pending(asyncio.ensure_future(self._score(key, text, prefix)))
+            pending.task.add_done_callback(lambda task: self._forget(key, pending))
+
+        pending.waiters += 1
         try:
-            data = {
-                "model": self.model,
-                "messages": self._prepare_classification_prompt(text),
-                "temperature": 0,
-                "max_tokens": 10,
-                "response_format": {"type": "text"}
-            }
+            return await asyncio.shield(pending.task)
+        finally:
+            pending.waiters -= 1
+            if pending.waiters == 0 and not pending.task.done():
+                # Nobody is waiting any more; later callers start a fresh request
+                self._forget(key, pending)
+                pending.task.cancel()
+
+    def _forget(self, key: str, pending: "_Pending"):
+        if self._pending.get(key) is pending:
+            del self._pending[key]
+
+    def _cache_key(self, text: str, system_prompt: str) -> str:
+        """Scores are cached under the prompt that produced them, so batched and single scores stay apart"""
+        # Digits-mode keys predate scoring modes and are left unchanged so existing caches stay valid
+        cache_model = self.model if self.scoring == "digits" else f"{self.model}:{self.scoring}"
+        return ScoreCache.make_key(cache_model, system_prompt, text)
+
+    async def _score(self, key: str, text: str, prefix: str) -> Optional[float]:
+        if self.scoring == "logprob":
+            score = await self._request_logprob_score(text, prefix)
+        elif self.batch_size > 1:
+            # The flush caches each score under the prompt it came from
+            return await self._score_batched(text)
+        else:
+            score = await self._request_score(text)
+        # Failures are not cached so the text is retried next time
+        if score is not None:
+            self.score_cache.put(key, score)
+        return score
+
+    async def _post(self, data: dict, tokens: int, hedge_key: str) -> dict:
+        """POST a chat request through the rate limiter, retry policy and hedger; every attempt is a span"""
+        telemetry = get_telemetry()
 
+        async def request() -> dict:
             session = await self.get_session()
-            
-            async with session.post(self.url, headers=self.headers, json=data) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    print(f"API Error (Status {response.status}): {error_text}")
-                    return 50
-
-                try:
+            with telemetry.span("http.chat", model=self.model, max_tokens=data["max_tokens"]):
+                async with session.post(self.url, headers=self.headers, json=data) as response:
+                    await raise_for_status(response)
                     result = await response.json()
-                    if not result.get('choices'):
-                        print(f"No choices in response: {result}")
-                        return 50
-                        
-                    content = result['choices'][0]['message']['content'].strip()
-                    print(f"Raw score response: {content}")  # Debug print
-                    
-                    # Extract just the numbers from the content
-                    score = int(''.join(filter(str.isdigit, content)))
-                    
-                    # Ensure score is within bounds
-                    score = max(0, min(100, score))
-                    print(f"Processed score: {score}")  # Debug print
-                    return score
-                    
-                except (KeyError, ValueError) as e:
-                    print(f"Error parsing response: {e}")
-                    print(f"Raw response: {json.dumps(result, indent=2)}")
-                    return 50
+                telemetry.record_usage(result.get("usage"))
+                return result
 
+        def admit():
+            return self.rate_limiter.acquire(tokens)
+
+        # Each attempt, hedges included, waits for the rate limiter before the deadline, hedger or span time it
+        return await self.retry_policy.call(self.url, lambda: self.hedger.run(hedge_key, request, admit=admit),
+                                            admit=admit)
+
+    async def _request_score(self, text: str) -> Optional[int]:
+        """Ask the API for a score; None if the request failed for good or the reply had no number"""
+        data = {
+            "model": self.model,
+            "messages": self._prepare_classification_prompt(text),
+            "temperature": 0,
+            "max_tokens": 10,
+            "response_format": {"type": "text"}
+        }
+        tokens = estimate_tokens(text) + data["max_tokens"]
+
+        try:
+            result = await self._post(data, tokens, self.model)
         except Exception as e:
-            print(f"Unexpected error in classify_one: {str(e)}")
-            return 50
-
-    async def classify_batch(self, texts: List[str], callback=None) -> List[Tuple[int, int]]:
-        """Classify multiple texts and return (index, score) tuples sorted by score"""
-        scores = []
-        tasks = []
-        
-        # Create tasks with delay between each to avoid rate limiting
-        for text in texts:
-            tasks.append(self.classify_one(text))
-            await asyncio.sleep(0.5)  # Add small delay between requests
-        
-        for i, future in enumerate(asyncio.as_completed(tasks)):
+            logger.warning("Classification request failed: %s", e)
+            return None
+
+        try:
+            content = result['choices'][0]['message']['content'].strip()
+            logger.debug("Raw score response: %s", content)
+
+            # Extract just the numbers from the content
+            score = int(''.join(filter(str.isdigit, content)))
+
+            # Ensure score is within bounds
+            score = max(0, min(100, score))
+            logger.debug("Processed score: %s", score)
+            return score
+
+        except (KeyError, IndexError, ValueError) as e:
+            logger.warning("Error parsing response: %s", e)
+            logger.debug("Raw response: %s", json.dumps(result, indent=2))
+            return None
+
+    async def _request_logprob_score(self, text: str, prefix: str = "") -> Optional[float]:
+        """Score from the label-token probabilities of a one-token reply; None if there are none"""
+        data = {
+            "model": self.model,
+            "messages": self._logprob_messages(text, prefix),
+            "temperature": 0,
+            "max_tokens": 1,
+            "logprobs": True,
+            "top_logprobs": 20
+        }
+        tokens = estimate_tokens(data["messages"][1]["content"]) + data["max_tokens"]
+
+        try:
+            result = await self._post(data, tokens, self.model)
+        except Exception as e:
+            logger.warning("Classification request failed: %s", e)
+            return None
+
+        try:
+            top_logprobs = result['choices'][0]['logprobs']['content'][0]['top_logprobs']
+        except (KeyError, IndexError, TypeError) as e:
+            logger.warning("Error parsing logprobs: %s", e)
+            return None
+        score = logprob_score(top_logprobs)
+        if score is None:
+            logger.warning("No score labels among top tokens: %s", [c.get('token') for c in top_logprobs])
+        return score
+
+    async def _score_batched(self, text: str) -> Optional[float]:
+        """Queue a text for the next batched request and wait for its score"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((text, future))
+        if len(self._queue) >= self.batch_size:
+            self._start_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._start_flush)
+        return await future
+
+    def _start_flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._queue = self._queue[:self.batch_size], self._queue[self.batch_size:]
+        if self._queue:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._start_flush)
+        task = asyncio.ensure_future(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]):
+        batch = [(text, future) for text, future in batch if not future.done()]
+        if not batch:
+            return
+        texts = [text for text, _ in batch]
+        try:
+            scores = await self._request_scores(texts) if len(texts) > 1 else None
+            system_prompt = BATCH_CLASSIFIER_SYSTEM_PROMPT
+            if scores is None:
+                if len(texts) > 1:
+                    self.batch_fallbacks += 1
+                scores = await asyncio.gather(*(self._request_score(text) for text in texts))
+                system_prompt = CLASSIFIER_SYSTEM_PROMPT
+            for (text, future), score in zip(batch, scores):
+                # Failures are not cached so the text is retried next time
+                if score is not None:
+                    self.score_cache.put(self._cache_key(text, system_prompt), score)
+                if not future.done():
+                    future.set_result(score)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _request_scores(self, texts: List[str]) -> Optional[List[int]]:
+        """Rate several texts in one JSON request; None if the request or its reply is unusable"""
+        data = {
+            "model": self.model,
+            "messages": [
+                {"role": "developer" if self.model == "gpt-4.1" else "system", "content": BATCH_CLASSIFIER_SYSTEM_PROMPT},
+                {"role": "user", "content": json.dumps({"texts": texts})}
+            ],
+            "temperature": 0,
+            "max_tokens": 10 + 5 * len(texts),
+            "response_format": {"type": "json_object"}
+        }
+        tokens = sum(estimate_tokens(text) for text in texts) + data["max_tokens"]
+
+        self.batch_requests += 1
+        try:
+            result = await self._post(data, tokens, f"{self.model}:batch")
+        except FatalError as e:
+            # The model rejects JSON output or the batched prompt; stop trying
+            logger.warning("Batched classification unsupported, scoring one text per request: %s", e)
+            self.batch_size = 1
+            return None
+        except Exception as e:
+            logger.warning("Batched classification request failed: %s", e)
+            return None
+
+        try:
+            content = result['choices'][0]['message']['content']
+        except (KeyError, IndexError, TypeError):
+            content = ""
+        scores = parse_batch_scores(content, len(texts))
+        if scores is None:
+            logger.warning("Could not parse batched scores: %s", content[:200])
+        return scores
+
+    def batch_summary(self) -> Dict[str, int]:
+        return {
+            'batch_size': self.batch_size,
+            'batch_requests': self.batch_requests,
+            'batch_fallbacks': self.batch_fallbacks,
+        }
+
+    async def classify_batch(self, texts: List[str], callback=None,
+                             prefix: str = "") -> List[Tuple[int, Optional[float]]]:
+        """Classify multiple texts continuing `prefix` and return (index, score) tuples sorted by score"""
+        async def classify_indexed(idx: int, text: str) -> Tuple[int, Optional[float]]:
             try:
-                score = await future
-                scores.append((i, score))
-                if callback:
-                    await callback(i, score)
+                score = await self.classify_one(text, prefix)
             except Exception as e:
-                print(f"Error in batch classification for text {i}: {str(e)}")
-                scores.append((i, 50))
-                if callback:
-                    await callback(i, 50)
-        
-        # Sort by score in descending order
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return scores
+                logger.warning("Error in batch classification for text %d: %s", idx, e)
+                score = None
+            if callback:
+                await callback(idx, score)
+            return idx, score
+
+        # The rate limiter paces requests, so every classification can be started at once
+        with get_telemetry().span("classify", model=self.model, candidates=len(texts)):
+            scores = list(await asyncio.gather(*(classify_indexed(idx, text) for idx, text in enumerate(texts))))
+
+        return rank_scores(scores)
 
     async def close(self):
-        """Close the aiohttp session"""
-        if self._session and not self._session.closed:
-            await self._session.close()
-            self._session = None
\ No newline at end of file
+        """Cancel queued batches and commit cached scores; the session belongs to the shared transport"""
+        self.score_cache.flush()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        for _, future in self._queue:
+            future.cancel()
+        self._queue = []
+        for task in list(self._flushes):
+            task.cancel()
\ No newline at end of file
@@ -0,0 +1,219 @@
+import os
+import re
+import hashlib
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from .transport import get_transport
+from .endpoints import openai_base_url
+from .rate_limiter import RateLimiter, get_rate_limiter, estimate_tokens
+from .resilience import RetryPolicy, raise_for_status
+from ..telemetry import get_telemetry
+
+try:
+    import tiktoken
+except ImportError:  # optional; fall back to a regex approximation
+    tiktoken = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Context windows of the generation models offered in the lui
+MODEL_CONTEXT_LIMITS = {
+    "meta-llama/Meta-Llama-3.1-405B": 32768,
+    "gpt-4-base": 8192,
+    "gpt-3.5-turbo-instruct": 4096,
+}
+DEFAULT_CONTEXT_LIMIT = 8192
+
+# Roughly one token per word, punctuation mark or run of whitespace
+_APPROX_TOKEN_PATTERN = re.compile(r"\s*\w+|\s*[^\w\s]|\s+")
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Non-OpenAI models (e.g. Llama) are counted with a close general-purpose encoding
+        return tiktoken.get_encoding("cl100k_base")
+
+
+class TokenCounter:
+    """Counts and trims text in tokens of a given model, using tiktoken when installed"""
+    def __init__(self, model: str):
+        self.model = model
+        self.encoding = _get_encoding(model)
+
+    def _approx_offsets(self, text: str) -> List[int]:
+        return [match.start() for match in _APPROX_TOKEN_PATTERN.finditer(text)]
+
+    def offsets(self, text: str) -> List[int]:
+        """Character offset at which each token starts"""
+        if self.encoding is not None:
+            return self.encoding.decode_with_offsets(self.encoding.encode(text))[1]
+        return self._approx_offsets(text)
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return len(self._approx_offsets(text))
+
+    def head(self, text: str, tokens: int) -> str:
+        """The first `tokens` tokens of text"""
+        if tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text)[:tokens])
+        offsets = self._approx_offsets(text)
+        return text if tokens >= len(offsets) else text[:offsets[tokens]]
+
+    def tail(self, text: str, tokens: int) -> str:
+        """The last `tokens` tokens of text"""
+        if tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text)[-tokens:])
+        offsets = self._approx_offsets(text)
+        return text if tokens >= len(offsets) else text[offsets[-tokens]:]
+
+
+@lru_cache(maxsize=32)
+def get_token_counter(model: str) -> TokenCounter:
+    return TokenCounter(model)
+
+
+class ChatSummarizer:
+    """Summarises the head of a long prompt with a chat model, caching by head text.
+
+    Requests share the OpenAI rate limiter, retry policy, circuit breaker and
+    telemetry spans with the classifier.
+    """
+    def __init__(self, model: str = "gpt-4.1-mini", rate_limiter: RateLimiter = None):
+        self.url = f"{openai_base_url()}/chat/completions"
+        self.model = model
+        self.headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"
+        }
+        self.rate_limiter = rate_limiter or get_rate_limiter("openai")
+        self.retry_policy = RetryPolicy(max_attempts=4, base_delay=0.5, max_delay=20.0, deadline=60.0)
+        self._cache: Dict[str, str] = {}
+
+    async def __call__(self, text: str, max_tokens: int) -> str:
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if key not in self._cache:
+            data = {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": "Summarise the following text so a reader can continue it in the same voice. Respond with only the summary."},
+                    {"role": "user", "content": text}
+                ],
+                "temperature": 0,
+                "max_tokens": max_tokens
+            }
+            telemetry = get_telemetry()
+
+            async def request() -> dict:
+                session = await get_transport().get_session()
+                with telemetry.span("http.summarize", model=self.model, max_tokens=max_tokens):
+                    async with session.post(self.url, headers=self.headers, json=data) as response:
+                        await raise_for_status(response)
+                        result = await response.json()
+                    telemetry.record_usage(result.get("usage"))
+                    return result
+
+            tokens = estimate_tokens(text) + max_tokens
+            result = await self.retry_policy.call(self.url, request, admit=lambda: self.rate_limiter.acquire(tokens))
+            self._cache[key] = result['choices'][0]['message']['content'].strip() + "\n\n"
+        return self._cache[key]
+
+
+class ContextManager:
+    """Keeps generation prompts within the model's context window.
+
+    Policies, applied only when a prompt is over budget:
+      - "sliding": keep the most recent tokens
+      - "pinned": keep the first `pinned_tokens` (the preamble) plus the most recent tokens
+      - "summarize": replace everything before the tail with a summary of at most
+        `pinned_tokens`; falls back to "pinned" if summarising fails
+    The budget is the model's context limit minus `max_tokens`, optionally
+    capped by `max_prompt_tokens` to bound latency and cost.
+    """
+    POLICIES = ("sliding", "pinned", "summarize")
+
+    def __init__(self, policy: str = "sliding", pinned_tokens: int = 256,
+                 max_prompt_tokens: Optional[int] = None, summarizer=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown context policy: {policy}")
+        self.policy = policy
+        self.pinned_tokens = pinned_tokens
+        self.max_prompt_tokens = max_prompt_tokens
+        self.summarizer = summarizer or (ChatSummarizer() if policy == "summarize" else None)
+
+        self.requests = 0
+        self.truncated = 0
+        self.last_prompt_tokens = 0
+        self.max_sent_tokens = 0
+        self.total_prompt_tokens = 0
+
+    @classmethod
+    def from_env(cls) -> "ContextManager":
+        """Configured by CONTEXT_POLICY, CONTEXT_PINNED_TOKENS and CONTEXT_MAX_PROMPT_TOKENS"""
+        max_prompt_tokens = os.getenv("CONTEXT_MAX_PROMPT_TOKENS")
+        return cls(
+            policy=os.getenv("CONTEXT_POLICY", "sliding"),
+            pinned_tokens=int(os.getenv("CONTEXT_PINNED_TOKENS", "256")),
+            max_prompt_tokens=int(max_prompt_tokens) if max_prompt_tokens else None,
+        )
+
+    def budget(self, model: str, max_tokens: int) -> int:
+        budget = MODEL_CONTEXT_LIMITS.get(model, DEFAULT_CONTEXT_LIMIT) - max_tokens
+        if self.max_prompt_tokens:
+            budget = min(budget, self.max_prompt_tokens)
+        return max(budget, 1)
+
+    async def _shrink(self, prompt: str, counter: TokenCounter, budget: int) -> str:
+        pinned = min(self.pinned_tokens, budget // 2)
+        if self.policy == "sliding" or pinned <= 0:
+            return counter.tail(prompt, budget)
+
+        if self.policy == "summarize":
+            tail = counter.tail(prompt, budget - pinned)
+            head = prompt[:len(prompt) - len(tail)]
+            try:
+                summary = await self.summarizer(head, pinned)
+                return counter.head(summary, pinned) + tail
+            except Exception as e:
+                logger.warning("Summarising prompt head failed, keeping the preamble instead: %s", e)
+
+        return counter.head(prompt, pinned) + counter.tail(prompt, budget - pinned)
+
+    async def fit(self, prompt: str, model: str, max_tokens: int) -> Tuple[str, int]:
+        """Return the prompt to send and its token count"""
+        counter = get_token_counter(model)
+        budget = self.budget(model, max_tokens)
+        tokens = counter.count(prompt)
+        if tokens > budget:
+            prompt = await self._shrink(prompt, counter, budget)
+            tokens = counter.count(prompt)
+            self.truncated += 1
+
+        self.requests += 1
+        self.last_prompt_tokens = tokens
+        self.max_sent_tokens = max(self.max_sent_tokens, tokens)
+        self.total_prompt_tokens += tokens
+        return prompt, tokens
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'requests': self.requests,
+            'truncated': self.truncated,
+            'last_prompt_tokens': self.last_prompt_tokens,
+            'max_prompt_tokens': self.max_sent_tokens,
+            'avg_prompt_tokens': self.total_prompt_tokens / self.requests if self.requests else 0.0,
+        }
@@ -0,0 +1,14 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def openai_base_url() -> str:
+    """OpenAI API root; OPENAI_BASE_URL points it elsewhere (e.g. a local mock server)"""
+    return os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+
+
+def hyperbolic_base_url() -> str:
+    """Hyperbolic API root; HYPERBOLIC_BASE_URL points it elsewhere"""
+    return os.getenv("HYPERBOLIC_BASE_URL", "https://api.hyperbolic.xyz/v1").rstrip("/")
@@ -1,38 +1,58 @@
 import os
-import aiohttp
+import time
 import asyncio
 import json
-from typing import List, Tuple
-from .classifier import Classifier
+import logging
+from typing import Dict, List, Optional, Tuple
+import aiohttp
+from .classifier import Classifier, rank_scores
+from .transport import get_transport
+from .context import ContextManager
+from .backends import Backend, get_backend_registry
+from .resilience import RetryPolicy, RetryableError, FatalError, raise_for_status
+from .hedging import get_hedger
+from .rate_limiter import get_rate_limiters
+from .prefix import get_prefix_router
+from .splitting import ChunkLimit, get_request_splitter, split_n
+from .local_classifier import LocalClassifier
+from .cascade import HeuristicScorer, PrefilteredClassifier, prefilter_settings
+from ..telemetry import get_telemetry
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+async def _next_payload(response: aiohttp.ClientResponse) -> Optional[str]:
+    """The next server-sent `data:` payload, or None once the stream ends"""
+    while True:
+        raw_line = await response.content.readline()
+        if not raw_line:
+            return None
+        line = raw_line.decode("utf-8").strip()
+        if line.startswith("data:"):
+            return line[len("data:"):].strip()
+
+
 class Generator:
     def __init__(self):
-        # Generation endpoints
-        self.hyperbolic_url = "https://api.hyperbolic.xyz/v1/completions"
-        self.openai_completions_url = "https://api.openai.com/v1/completions"
-        
-        # Only used by classifier, not by generator
-        self.openai_chat_url = "https://api.openai.com/v1/chat/completions"
-        
-        self.hyperbolic_headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {os.getenv('HYPERBOLIC_API_KEY')}"
-        }
-        self.openai_headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"
-        }
-        self._session = None
+        # Generation models are routed to providers by the backend registry
+        self.backends = get_backend_registry()
+        self.retry_policies: Dict[str, RetryPolicy] = {}
         self.classifier = None
+        # Trims prompts to the model's context window and records the token counts sent
+        self.context = ContextManager.from_env()
+        self.hedger = get_hedger()
+        self.splitter = get_request_splitter()
+        self.router = get_prefix_router()
+        # One classifier per model, reused across rounds
+        self.classifiers: Dict[str, Classifier] = {}
         
         # Verification of API keys
-        if not os.getenv('OPENAI_API_KEY'):
-            print("WARNING: OPENAI_API_KEY environment variable is not set")
-        if not os.getenv('HYPERBOLIC_API_KEY'):
-            print("WARNING: HYPERBOLIC_API_KEY environment variable is not set")
+        for backend in self.backends:
+            if backend.api_key_env and backend.name != "local" and not backend.api_key:
+                logger.warning("%s environment variable is not set", backend.api_key_env)
 
     async def __aenter__(self):
         """Async context manager entry"""
@@ -44,22 +64,51 @@ class Generator:
         await self.close()
 
     async def get_session(self):
-        """Get or create the aiohttp session"""
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
-        return self._session
-
-    async def reset_session(self):
-        """Reset the session between rounds"""
-        if self._session:
-            await self._session.close()
-        self._session = None
-        await self.get_session()
+        """Get the pooled session from the shared transport"""
+        return await get_transport().get_session()
+
+    def get_retry_policy(self, backend: Backend) -> RetryPolicy:
+        """One retry policy per backend, so retry counts and limits stay per provider"""
+        if backend.name not in self.retry_policies:
+            self.retry_policies[backend.name] = backend.retry_policy()
+        return self.retry_policies[backend.name]
 
     async def generate_batch(self, prompt: str, model: str, max_tokens: int, temperature: float, n: int = 5) -> List[str]:
-        # Determine which API to use based on the model
-        is_openai_model = model.startswith("gpt-")
-        
+        """Generate n completions as parallel sub-requests sized by the request splitter.
+
+        Completions from sub-requests that succeeded are kept even if others
+        failed; only when all of them fail is an error returned for every sample.
+        Greedy (temperature 0) requests identical to one in flight share its result.
+        """
+        backend, model = self.backends.resolve(model)
+        prompt, _ = await self.context.fit(prompt, model, max_tokens)
+        if temperature == 0:
+            key = (backend.name, model, prompt, max_tokens, n)
+            return list(await self.router.coalesce(
+                key, lambda: self._generate_chunks(backend, prompt, model, max_tokens, temperature, n)))
+        return await self._generate_chunks(backend, prompt, model, max_tokens, temperature, n)
+
+    async def _generate_chunks(self, backend: Backend, prompt: str, model: str, max_tokens: int,
+                               temperature: float, n: int) -> List[str]:
+        limit = self.splitter.limit(backend.name, model)
+
+        chunks = split_n(n, min(limit.size, backend.max_n or limit.size))
+        with get_telemetry().span("generate", backend=backend.name, model=model, n=n, sub_requests=len(chunks)):
+            results = await asyncio.gather(
+                *(self._generate_chunk(backend, prompt, model, max_tokens, temperature, chunk, limit, n) for chunk in chunks),
+                return_exceptions=True
+            )
+
+        completions = [text for result in results if isinstance(result, list) for text in result]
+        errors = [result for result in results if isinstance(result, BaseException)]
+        for e in errors:
+            logger.warning("Generation failed: %s", e)
+        if not completions:
+            return [f"Error: {str(errors[0])}"] * n
+        return completions
+
+    async def _generate_chunk(self, backend: Backend, prompt: str, model: str, max_tokens: int, temperature: float,
+                              n: int, limit: ChunkLimit, requested: int) -> List[str]:
         # All generation models including gpt-4-base use the completions API
         data = {
             "prompt": prompt,
@@ -70,99 +119,224 @@ class Generator:
             "n": n
         }
         
-        url = self.openai_completions_url if is_openai_model else self.hyperbolic_url
-        headers = self.openai_headers if is_openai_model else self.hyperbolic_headers
-        
-        wait_time = 1
-        # More retries for models using completions API
-        max_retries = 8 if model in ["gpt-4-base", "gpt-3.5-turbo-instruct"] else 5
-        attempts = 0
-        
-        print(f"Using max_retries: {max_retries} for model: {model}")
-        
-        while attempts < max_retries:
+        # Sub-requests share the prompt, so they go to the replica that cached it
+        url = backend.completions_url_for(prompt)
+        headers = backend.headers
+
+        telemetry = get_telemetry()
+
+        async def request() -> List[str]:
+            session = await self.get_session()
+            started = time.monotonic()
+            with telemetry.span("http.completions", backend=backend.name, model=model, n=n, max_tokens=max_tokens):
+                try:
+                    async with session.post(url, headers=headers, json=data, timeout=backend.timeout) as response:
+                        await raise_for_status(response)
+                        try:
+                            result = await response.json(content_type=None)
+                        except (UnicodeError, json.JSONDecodeError) as e:
+                            raise RetryableError(f"Error parsing response: {str(e)}")
+                except (RetryableError, FatalError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    # Providers that cap n answer 400, so fatal errors shrink the sub-request size too;
+                    # 429s are about request rate, which smaller sub-requests would only raise
+                    if getattr(e, "status", None) != 429:
+                        limit.record_failure(n)
+                    raise
+                telemetry.record_usage(result.get("usage"))
+            limit.record_success(n, max_tokens, time.monotonic() - started, requested)
+
+            # All generation models use the completions API with 'text' field
+            completions = [choice['text'] for choice in result.get('choices', []) if choice.get('text')]
+            if not completions:
+                raise RetryableError(f"No completions in response: {json.dumps(result)[:500]}")
+            return completions
+
+        # Latency grows with the completion size, so hedge thresholds are tracked per request shape
+        hedge_key = f"{model}:{max_tokens}:{n}"
+        return await self.get_retry_policy(backend).call(url, lambda: self.hedger.run(hedge_key, request))
+
+    async def generate_stream(self, prompt: str, model: str, max_tokens: int, temperature: float, n: int = 5,
+                              on_token=None, on_choice=None) -> List[str]:
+        """Generate n completions over SSE, reporting each choice as it grows and as it finishes.
+
+        `on_token(idx, text_so_far)` is awaited for every streamed chunk and
+        `on_choice(idx, text)` once per choice when its finish_reason arrives.
+        Falls back to `generate_batch` if the stream fails before any choice finished.
+        """
+        backend, api_model = self.backends.resolve(model)
+        if not backend.supports_streaming or (backend.max_n is not None and n > backend.max_n):
+            # One stream cannot carry this round; fall back to (split) batch requests
+            texts = await self.generate_batch(prompt, model, max_tokens, temperature, n)
+            texts = (texts + [""] * n)[:n]
+            for idx, text in enumerate(texts):
+                if on_choice:
+                    await on_choice(idx, text)
+            return texts
+
+        prompt, _ = await self.context.fit(prompt, api_model, max_tokens)
+        data = {
+            "prompt": prompt,
+            "model": api_model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": 0.9,
+            "n": n,
+            "stream": True
+        }
+        url = backend.completions_url_for(prompt)
+        headers = backend.headers
+
+        texts = [""] * n
+        finished = [False] * n
+
+        async def finish(idx: int):
+            if not finished[idx]:
+                finished[idx] = True
+                if on_choice:
+                    await on_choice(idx, texts[idx])
+
+        async def open_stream() -> Tuple[aiohttp.ClientResponse, Optional[str]]:
+            # The stream counts as answered at its first event, so a hedge races on time to first token
+            session = await self.get_session()
+            response = await session.post(url, headers=headers, json=data, timeout=backend.timeout)
             try:
-                session = await self.get_session()
-                print(f"Making request to {url} with model {model}")
-                
-                # Increase timeout to 120 seconds for completions API models
-                request_timeout = 120 if model in ["gpt-4-base", "gpt-3.5-turbo-instruct"] else 60
-                print(f"Using timeout of {request_timeout} seconds")
-                
-                async with session.post(url, headers=headers, json=data, timeout=request_timeout) as response:
-                    response_text = await response.text()
-                    print(f"Response status: {response.status}")
-                    
-                    # Validate response
-                    try:
-                        response_text.encode('utf-8').decode('utf-8')
-                        result = json.loads(response_text)
-                        
-                        if response.status == 200 and 'choices' in result:
-                            # All generation models use the completions API with 'text' field
-                            completions = [choice['text'] for choice in result['choices'] if choice.get('text')]
-                                
-                            if completions:
-                                return completions
-                        else:
-                            print(f"API Error: {response_text}")
-                    
-                    except (UnicodeError, json.JSONDecodeError) as e:
-                        print(f"Error parsing response: {str(e)}")
-                    
-                    # If we get here, something went wrong
-                    attempts += 1
-                    if attempts >= max_retries:
-                        return [f"Error: Maximum retries ({max_retries}) exceeded"] * n
-                    
-                    # For completions API models, use longer wait times between retries
-                    if model in ["gpt-4-base", "gpt-3.5-turbo-instruct"]:
-                        wait_time = min(wait_time * 2, 120)  # Up to 2 minutes for completions API models
-                    else:
-                        wait_time = min(wait_time * 2, 60)  # Up to 60s for other models
-                    
-                    print(f"Retrying batch. Attempt {attempts}/{max_retries}. Waiting {wait_time}s...")
-                    await asyncio.sleep(wait_time)
-                    
-            except asyncio.TimeoutError:
-                print("Request timed out")
-                attempts += 1
-                if attempts >= max_retries:
-                    return [f"Error: Request timed out after multiple attempts"] * n
-                # For completions API models, use longer wait times between retries
-                if model in ["gpt-4-base", "gpt-3.5-turbo-instruct"]:
-                    wait_time = min(wait_time * 2, 120)  # Up to 2 minutes for completions API models
-                else:
-                    wait_time = min(wait_time * 2, 60)  # Up to 60s for other models
-                    
-                print(f"Timeout error. Attempt {attempts}/{max_retries}. Waiting {wait_time}s...")
-                await asyncio.sleep(wait_time)
-                
-            except Exception as e:
-                print(f"Unexpected error: {str(e)}")
-                attempts += 1
-                if attempts >= max_retries:
-                    return [f"Error: Maximum retries ({max_retries}) exceeded - {str(e)}"] * n
-                # For completions API models, use longer wait times between retries
-                if model in ["gpt-4-base", "gpt-3.5-turbo-instruct"]:
-                    wait_time = min(wait_time * 2, 120)  # Up to 2 minutes for completions API models
-                else:
-                    wait_time = min(wait_time * 2, 60)  # Up to 60s for other models
-                    
-                print(f"Network error. Attempt {attempts}/{max_retries}. Waiting {wait_time}s...")
-                await asyncio.sleep(wait_time)
-        
-        return [f"Error: Maximum retries ({max_retries}) exceeded"] * n
+                await raise_for_status(response)
+                return response, await _next_payload(response)
+            except BaseException:
+                response.close()
+                raise
+
+        try:
+            started = time.perf_counter()
+            with get_telemetry().span("http.completions_stream", backend=backend.name, model=api_model, n=n,
+                                      max_tokens=max_tokens) as span:
+                response, payload = await self.hedger.run(
+                    f"{api_model}:stream:{n}", open_stream, discard=lambda opened: opened[0].close())
+                try:
+                    while payload is not None and payload != "[DONE]":
+                        chunk = json.loads(payload)
+                        if chunk.get("error"):
+                            # Providers report failures mid-stream as an error event, not a status code
+                            error = chunk["error"]
+                            raise RetryableError(f"Stream error: {error.get('message', error) if isinstance(error, dict) else error}")
+                        # Servers that honour stream_options send usage in a final chunk
+                        get_telemetry().record_usage(chunk.get("usage"))
+                        for choice in chunk.get("choices", []):
+                            idx = choice.get("index", 0)
+                            if idx >= n:
+                                continue
+                            if choice.get("text"):
+                                if "first_token_s" not in span.attributes:
+                                    span.set("first_token_s", time.perf_counter() - started)
+                                texts[idx] += choice["text"]
+                                if on_token:
+                                    await on_token(idx, texts[idx])
+                            if choice.get("finish_reason") is not None:
+                                await finish(idx)
+                        payload = await _next_payload(response)
+                finally:
+                    response.release()
+
+        except Exception as e:
+            logger.warning("Streaming error: %s", e)
+            if not any(finished):
+                completions = await self.generate_batch(prompt, model, max_tokens, temperature, n)
+                for idx, text in enumerate(completions[:n]):
+                    texts[idx] = text
+                    await finish(idx)
+                return texts
+
+        # Choices the stream never closed are treated as finished with what arrived
+        for idx in range(n):
+            await finish(idx)
+        return texts
 
-    async def classify(self, generations: List[str], classifier_model: str, callback=None) -> List[Tuple[int, int]]:
-        """Initialize classifier with model and classify generations"""
-        self.classifier = Classifier(classifier_model)
-        return await self.classifier.classify_batch(generations, callback)
+    async def stream_and_classify(self, prompt: str, model: str, max_tokens: int, temperature: float, n: int,
+                                  classifier_model: str, on_token=None, on_score=None) -> Tuple[List[str], List[Tuple[int, int]]]:
+        """Stream a round and score each choice as soon as it finishes.
+
+        Returns the generations and (index, score) tuples sorted by score.
+        """
+        classifier = self.get_classifier(classifier_model)
+        if getattr(classifier, "needs_round", False):
+            generations = await self.generate_stream(prompt, model, max_tokens, temperature, n, on_token)
+            valid = [idx for idx, text in enumerate(generations) if text and not text.startswith("Error:")]
+
+            async def forward(position: int, value):
+                if on_score:
+                    await on_score(valid[position], value)
+
+            ranked = await classifier.classify_batch([generations[idx] for idx in valid], forward, prompt)
+            failed = [(idx, 0) for idx in range(len(generations)) if idx not in valid]
+            for idx, value in failed:
+                if on_score:
+                    await on_score(idx, value)
+            # Keep the classifier's ranking; a cascade orders judged candidates ahead of the rest
+            return generations, [(valid[position], value) for position, value in ranked] + failed
+
+        score_tasks = []
+
+        async def score(idx: int, text: str) -> Tuple[int, int]:
+            # Empty or failed choices are ranked last without spending a classification
+            value = await classifier.classify_one(text, prompt) if text and not text.startswith("Error:") else 0
+            if on_score:
+                await on_score(idx, value)
+            return idx, value
+
+        async def on_choice(idx: int, text: str):
+            score_tasks.append(asyncio.create_task(score(idx, text)))
+
+        try:
+            generations = await self.generate_stream(prompt, model, max_tokens, temperature, n, on_token, on_choice)
+            scores = list(await asyncio.gather(*score_tasks))
+        finally:
+            for task in score_tasks:
+                task.cancel()
+
+        return generations, rank_scores(scores)
+
+    @staticmethod
+    def create_classifier(classifier_model: str):
+        """A remote Classifier, a LocalClassifier for "local:<path>" model names, or the free "heuristic" scorer"""
+        if classifier_model == "heuristic":
+            return HeuristicScorer()
+        if classifier_model.startswith("local:"):
+            return LocalClassifier.from_model_name(classifier_model)
+        return Classifier(classifier_model)
+
+    def get_classifier(self, classifier_model: str) -> Classifier:
+        """Get the cached classifier for a model, creating it on first use"""
+        if classifier_model not in self.classifiers:
+            classifier = self.create_classifier(classifier_model)
+            prefilter_model, keep_fraction, margin = prefilter_settings()
+            if prefilter_model and prefilter_model != classifier_model:
+                classifier = PrefilteredClassifier(self.create_classifier(prefilter_model), classifier,
+                                                   keep_fraction, margin=margin)
+            self.classifiers[classifier_model] = classifier
+        self.classifier = self.classifiers[classifier_model]
+        return self.classifier
+
+    def service_summary(self) -> str:
+        """Queue wait and latency per rate limiter, and hit rates of the score caches in use, one line each"""
+        lines = [f"Rate limiter ({name}): {limiter.stats.format_summary()}"
+                 for name, limiter in get_rate_limiters().items()]
+        caches = {}
+        for classifier in self.classifiers.values():
+            # A cascade caches what its judge scores
+            cache = getattr(getattr(classifier, "classifier", classifier), "score_cache", None)
+            if cache is not None:
+                caches[id(cache)] = cache
+        lines.extend(f"Score cache: {cache.format_summary()}" for cache in caches.values())
+        return "\n".join(lines)
+
+    async def classify(self, generations: List[str], classifier_model: str, callback=None,
+                       prefix: str = "") -> List[Tuple[int, Optional[float]]]:
+        """Classify generations of `prefix` with the (cached) classifier for the given model"""
+        return await self.get_classifier(classifier_model).classify_batch(generations, callback, prefix)
 
     async def close(self):
-        """Close both the generator and classifier sessions"""
-        if self._session is not None:
-            await self._session.close()
-            self._session = None
-        if self.classifier is not None:  # Add this check
-            await self.classifier.close()
\ No newline at end of file
+        """Close the classifiers; pooled connections are closed with the transport"""
+        for classifier in self.classifiers.values():
+            await classifier.close()
+        self.classifiers.clear()
+        self.classifier = None
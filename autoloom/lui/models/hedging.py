@@ -0,0 +1,138 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import AsyncContextManager, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+from dotenv import load_dotenv
+
+load_dotenv()
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Rolling window of recent successful request latencies"""
+    def __init__(self, window: int = 200):
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class Hedger:
+    """Sends a duplicate of a slow request and keeps whichever answers first.
+
+    A request is hedged once it has run longer than the `percentile` latency
+    of recent requests with the same key (e.g. the model). At most
+    `max_hedge_fraction` of requests are hedged, which caps the extra spend.
+    The losing request is cancelled.
+
+    The caller admits the primary attempt (e.g. through a rate limiter)
+    before calling `run`, so the threshold clock starts when it is sent;
+    `admit` is entered before a hedge is sent, and its wait is not recorded
+    as latency. `discard` is called with the result of a losing attempt that
+    finished anyway, so it can release what it holds.
+    """
+    def __init__(self, enabled: bool = True, percentile: float = 95.0, min_samples: int = 20,
+                 max_hedge_fraction: float = 0.1, min_delay: float = 0.5):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_hedge_fraction = max_hedge_fraction
+        self.min_delay = min_delay
+        self._trackers: Dict[str, LatencyTracker] = {}
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def threshold(self, key: str) -> Optional[float]:
+        """Seconds after which a request with this key is hedged; None until enough samples exist"""
+        tracker = self._trackers.get(key)
+        if tracker is None or len(tracker.samples) < self.min_samples:
+            return None
+        return max(tracker.percentile(self.percentile), self.min_delay)
+
+    def _within_budget(self) -> bool:
+        return self.hedged < self.max_hedge_fraction * self.requests
+
+    async def _timed(self, key: str, request: Callable[[], Awaitable[T]],
+                     admit: Optional[Callable[[], AsyncContextManager]] = None) -> T:
+        if admit is not None:
+            async with admit():
+                return await self._timed(key, request)
+        started = time.monotonic()
+        result = await request()
+        self._trackers.setdefault(key, LatencyTracker()).record(time.monotonic() - started)
+        return result
+
+    async def run(self, key: str, request: Callable[[], Awaitable[T]],
+                  admit: Optional[Callable[[], AsyncContextManager]] = None,
+                  discard: Optional[Callable[[T], None]] = None) -> T:
+        """Await `request()`, hedging it with a second call if it is unusually slow"""
+        self.requests += 1
+        primary = asyncio.ensure_future(self._timed(key, request))
+        threshold = self.threshold(key) if self.enabled else None
+        if threshold is None:
+            return await primary
+
+        hedge = None
+        winner = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=threshold)
+            if done or not self._within_budget():
+                result = await primary
+                winner = primary
+                return result
+
+            self.hedged += 1
+            hedge = asyncio.ensure_future(self._timed(key, request, admit))
+            pending = {primary, hedge}
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # An attempt can end cancelled (e.g. by the request itself), and exception() raises on those
+                succeeded = [task for task in done if not task.cancelled() and task.exception() is None]
+                if succeeded:
+                    winner = succeeded[0]
+                    if winner is hedge:
+                        self.hedge_wins += 1
+                    return winner.result()
+                if not pending:
+                    # Both attempts failed; surface one of the errors
+                    errors = [task.exception() for task in (primary, hedge) if not task.cancelled()]
+                    raise errors[0] if errors else asyncio.CancelledError()
+        finally:
+            for task in (primary, hedge):
+                if task is None or task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif discard is not None and not task.cancelled() and task.exception() is None:
+                    discard(task.result())
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'requests': self.requests,
+            'hedged': self.hedged,
+            'hedge_wins': self.hedge_wins,
+            'hedge_rate': self.hedged / self.requests if self.requests else 0.0,
+        }
+
+
+_hedger: Optional[Hedger] = None
+
+
+def get_hedger() -> Hedger:
+    """The process-wide hedger. Off unless HEDGE_ENABLED=1; tuned by HEDGE_PERCENTILE and HEDGE_MAX_FRACTION"""
+    global _hedger
+    if _hedger is None:
+        _hedger = Hedger(
+            enabled=os.getenv("HEDGE_ENABLED", "0") == "1",
+            percentile=float(os.getenv("HEDGE_PERCENTILE", "95")),
+            max_hedge_fraction=float(os.getenv("HEDGE_MAX_FRACTION", "0.1")),
+        )
+    return _hedger
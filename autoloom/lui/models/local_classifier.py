@@ -0,0 +1,204 @@
+import re
+import json
+import zlib
+import asyncio
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional; only needed for the local classifier
+    np = None
+
+from .classifier import rank_scores
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+SUFFIX_PATTERN = re.compile(r'The suffix is """(.*)"""\. Now answer', re.DOTALL)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("The local classifier needs numpy: pip install numpy")
+
+
+def featurize(texts: List[str], dims: int, ngram: int = 2):
+    """Hashed, log-scaled, L2-normalised word n-gram counts as sparse (rows, columns, values) arrays"""
+    rows, columns = [], []
+    for row, text in enumerate(texts):
+        words = TOKEN_PATTERN.findall(text.lower())
+        for n in range(1, ngram + 1):
+            for i in range(len(words) - n + 1):
+                rows.append(row)
+                columns.append(zlib.crc32(" ".join(words[i:i + n]).encode("utf-8")) % dims)
+
+    rows = np.asarray(rows, dtype=np.int64)
+    columns = np.asarray(columns, dtype=np.int64)
+    # Merge repeated n-grams within a row into one count
+    cells, counts = np.unique(rows * dims + columns, return_counts=True)
+    rows, columns = cells // dims, cells % dims
+    values = np.log1p(counts).astype(np.float32)
+    norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=len(texts)))
+    values /= np.maximum(norms[rows], 1e-12)
+    return rows, columns, values
+
+
+class NgramModel:
+    """Logistic regression over hashed word n-grams; predicts P(human-written)"""
+    def __init__(self, weights, bias: float = 0.0, ngram: int = 2):
+        _require_numpy()
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.ngram = ngram
+
+    @property
+    def dims(self) -> int:
+        return len(self.weights)
+
+    def predict(self, texts: List[str]):
+        """Probabilities for a whole batch in one vectorized pass"""
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        rows, columns, values = featurize(texts, self.dims, self.ngram)
+        logits = np.bincount(rows, weights=values * self.weights[columns], minlength=len(texts)) + self.bias
+        return 1 / (1 + np.exp(-logits))
+
+    @classmethod
+    def train(cls, texts: List[str], labels: List[int], dims: int = 2 ** 18, ngram: int = 2,
+              epochs: int = 200, learning_rate: float = 2.0, l2: float = 1e-6) -> "NgramModel":
+        """Full-batch gradient descent, with classes weighted to balance human and AI examples"""
+        _require_numpy()
+        rows, columns, values = featurize(texts, dims, ngram)
+        y = np.asarray(labels, dtype=np.float64)
+        positives = max(y.sum(), 1.0)
+        negatives = max(len(y) - y.sum(), 1.0)
+        sample_weights = np.where(y == 1, len(y) / (2 * positives), len(y) / (2 * negatives))
+
+        weights = np.zeros(dims, dtype=np.float64)
+        bias = 0.0
+        for _ in range(epochs):
+            logits = np.bincount(rows, weights=values * weights[columns], minlength=len(y)) + bias
+            error = (1 / (1 + np.exp(-logits)) - y) * sample_weights / len(y)
+            weights -= learning_rate * (np.bincount(columns, weights=values * error[rows], minlength=dims) + l2 * weights)
+            bias -= learning_rate * error.sum()
+        return cls(weights, bias, ngram)
+
+    def save(self, path: str):
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, ngram=self.ngram)
+
+    @classmethod
+    def load(cls, path: str) -> "NgramModel":
+        _require_numpy()
+        with np.load(path) as data:
+            return cls(data["weights"], float(data["bias"]), int(data["ngram"]))
+
+
+def read_tuni_examples(path: str) -> Tuple[List[str], List[int]]:
+    """Suffixes and labels (1 = human, 0 = AI) from a tuni fine-tuning JSONL file"""
+    texts, labels = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            messages = json.loads(line)["messages"]
+            match = SUFFIX_PATTERN.search(messages[-2]["content"])
+            texts.append(match.group(1) if match else messages[-2]["content"])
+            labels.append(1 if messages[-1]["content"].strip() == "Y" else 0)
+    return texts, labels
+
+
+_worker_model: Optional[NgramModel] = None
+
+
+def _init_worker(weights, bias: float, ngram: int):
+    global _worker_model
+    _worker_model = NgramModel(weights, bias, ngram)
+
+
+def _predict_in_worker(texts: List[str]) -> List[float]:
+    return _worker_model.predict(texts).tolist()
+
+
+class LocalClassifier:
+    """Scores texts 0-100 on CPU with an NgramModel; same interface as Classifier.
+
+    Rounds are scored in one vectorized batch in the event loop; batches of
+    at least `pool_threshold` texts are split across a process pool.
+    """
+    def __init__(self, model: str, ngram_model: NgramModel, pool_threshold: int = 512, workers: int = 4):
+        self.model = model
+        self.ngram_model = ngram_model
+        self.pool_threshold = pool_threshold
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_model_name(cls, model: str) -> "LocalClassifier":
+        """Load from a "local:<path to .npz>" model name"""
+        return cls(model, NgramModel.load(model[len("local:"):]))
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.ngram_model.weights, self.ngram_model.bias, self.ngram_model.ngram)
+            )
+        return self._pool
+
+    async def score_texts(self, texts: List[str]) -> List[float]:
+        """0-100 scores for every text, in order"""
+        if len(texts) < self.pool_threshold:
+            probabilities = self.ngram_model.predict(texts).tolist()
+        else:
+            loop = asyncio.get_running_loop()
+            size = -(-len(texts) // self.workers)
+            chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+            results = await asyncio.gather(*(loop.run_in_executor(self._get_pool(), _predict_in_worker, chunk)
+                                             for chunk in chunks))
+            probabilities = [p for result in results for p in result]
+        return [round(100 * p, 2) for p in probabilities]
+
+    async def classify_one(self, text: str, prefix: str = "") -> Optional[float]:
+        return (await self.score_texts([text]))[0]
+
+    async def classify_batch(self, texts: List[str], callback=None,
+                             prefix: str = "") -> List[Tuple[int, Optional[float]]]:
+        """Classify multiple texts and return (index, score) tuples sorted by score; trained on suffixes alone, so `prefix` is unused"""
+        scores = list(enumerate(await self.score_texts(texts)))
+        if callback:
+            for idx, score in scores:
+                await callback(idx, score)
+        return rank_scores(scores)
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a local n-gram classifier on tuni fine-tuning data")
+    parser.add_argument("data", nargs="+", help="tuni JSONL files")
+    parser.add_argument("-o", "--output", default="local_classifier.npz")
+    parser.add_argument("--dims", type=int, default=2 ** 18, help="Hashed feature dimensions")
+    parser.add_argument("--ngram", type=int, default=2)
+    parser.add_argument("--epochs", type=int, default=200)
+    args = parser.parse_args()
+
+    texts, labels = [], []
+    for path in args.data:
+        file_texts, file_labels = read_tuni_examples(path)
+        texts.extend(file_texts)
+        labels.extend(file_labels)
+    print(f"Training on {len(texts)} examples ({sum(labels)} human)")
+
+    model = NgramModel.train(texts, labels, dims=args.dims, ngram=args.ngram, epochs=args.epochs)
+    accuracy = float(((model.predict(texts) >= 0.5) == np.asarray(labels, dtype=bool)).mean())
+    model.save(args.output)
+    print(f"Training accuracy {accuracy:.3f}; model written to {args.output}")
+    print(f"Use it with the classifier model name local:{args.output}")
+
+
+if __name__ == "__main__":
+    main()
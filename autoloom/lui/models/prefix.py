@@ -0,0 +1,85 @@
+import os
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+from dotenv import load_dotenv
+
+load_dotenv()
+
+T = TypeVar("T")
+
+
+def pick_server(servers: List[str], key: str) -> str:
+    """The server for a key by rendezvous hashing: stable per key, and adding a server moves only its share"""
+    if len(servers) == 1:
+        return servers[0]
+    return max(servers, key=lambda server: hashlib.md5(f"{server}|{key}".encode("utf-8")).digest())
+
+
+class _Inflight:
+    """A request shared by every caller that made it while it was in flight"""
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class PrefixRouter:
+    """Routes prompts that share a prefix to the same server and coalesces identical in-flight requests.
+
+    Prompt caches (a provider's, or a local server's prefix cache) only hit
+    when related prompts reach the server that saw the prefix, so prompts are
+    keyed by their first `prefix_chars` characters. Identical requests made
+    while one is in flight wait for it instead of being sent again.
+    """
+    def __init__(self, prefix_chars: int = 64):
+        self.prefix_chars = prefix_chars
+        self._inflight: Dict[Hashable, _Inflight] = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    def affinity_key(self, prompt: str) -> str:
+        return prompt[:self.prefix_chars]
+
+    def server_for(self, servers: List[str], prompt: str) -> str:
+        return pick_server(servers, self.affinity_key(prompt))
+
+    async def coalesce(self, key: Hashable, request: Callable[[], Awaitable[T]]) -> T:
+        """Run `request`, or wait for the identical one already in flight"""
+        self.requests += 1
+        pending = self._inflight.get(key)
+        if pending is None:
+            # The request runs as its own task, so a caller that is cancelled never cancels it for the others
+            pending = self._inflight[key] = _Inflight(asyncio.ensure_future(request()))
+            pending.task.add_done_callback(lambda task: self._forget(key, pending))
+        else:
+            self.coalesced += 1
+
+        pending.waiters += 1
+        try:
+            return await asyncio.shield(pending.task)
+        finally:
+            pending.waiters -= 1
+            if pending.waiters == 0 and not pending.task.done():
+                # Nobody is waiting any more; later callers start a fresh request
+                self._forget(key, pending)
+                pending.task.cancel()
+
+    def _forget(self, key: Hashable, pending: "_Inflight"):
+        if self._inflight.get(key) is pending:
+            del self._inflight[key]
+
+    def summary(self) -> Dict[str, int]:
+        return {'requests': self.requests, 'coalesced': self.coalesced}
+
+
+_router: Optional[PrefixRouter] = None
+
+
+def get_prefix_router() -> PrefixRouter:
+    """The process-wide router; PREFIX_AFFINITY_CHARS sets how much of a prompt picks its server"""
+    global _router
+    if _router is None:
+        _router = PrefixRouter(int(os.getenv("PREFIX_AFFINITY_CHARS", "64")))
+    return _router
@@ -0,0 +1,161 @@
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional, Dict
+
+
+class TokenBucket:
+    """A token bucket that refills continuously at a fixed rate"""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate  # tokens added per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        self._refill()
+        # A request larger than the bucket can never fit, so let it through once full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class LimiterStats:
+    """Running totals for queue wait and request latency"""
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record_wait(self, seconds: float):
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+
+    def record_latency(self, seconds: float):
+        self.requests += 1
+        self.total_latency += seconds
+        self.max_latency = max(self.max_latency, seconds)
+
+    def summary(self) -> Dict[str, float]:
+        count = max(self.requests, 1)
+        return {
+            'requests': self.requests,
+            'in_flight': self.in_flight,
+            'avg_wait': self.total_wait / count,
+            'max_wait': self.max_wait,
+            'avg_latency': self.total_latency / count,
+            'max_latency': self.max_latency,
+        }
+
+    def format_summary(self) -> str:
+        stats = self.summary()
+        return (f"{stats['requests']} requests, {stats['in_flight']} in flight; "
+                f"queue wait avg {stats['avg_wait']:.2f}s (max {stats['max_wait']:.2f}s), "
+                f"latency avg {stats['avg_latency']:.2f}s (max {stats['max_latency']:.2f}s)")
+
+
+class RateLimiter:
+    """Limits requests per second, tokens per minute and concurrent requests.
+
+    Use `async with limiter.acquire(tokens):` around a single API request.
+    Time spent waiting for a slot is recorded separately from the time spent
+    inside the block, so queueing and backend latency can be tuned apart.
+    """
+    def __init__(self, requests_per_second: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None,
+                 max_concurrency: Optional[int] = None):
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+
+        self._request_bucket = TokenBucket(requests_per_second, max(requests_per_second, 1)) if requests_per_second else None
+        self._token_bucket = TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute else None
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self._lock = asyncio.Lock()
+        self.stats = LimiterStats()
+
+    async def _wait_for_buckets(self, tokens: int):
+        # The lock keeps waiters in FIFO order so a large request is not starved
+        async with self._lock:
+            while True:
+                delay = 0.0
+                if self._request_bucket:
+                    delay = max(delay, self._request_bucket.delay_for(1))
+                if self._token_bucket:
+                    delay = max(delay, self._token_bucket.delay_for(tokens))
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            if self._request_bucket:
+                self._request_bucket.take(1)
+            if self._token_bucket:
+                self._token_bucket.take(tokens)
+
+    @asynccontextmanager
+    async def acquire(self, tokens: int = 0):
+        """Wait for capacity, then hold a concurrency slot for the duration of the block"""
+        queued_at = time.monotonic()
+        if self._semaphore:
+            await self._semaphore.acquire()
+        try:
+            await self._wait_for_buckets(tokens)
+            started_at = time.monotonic()
+            self.stats.record_wait(started_at - queued_at)
+            self.stats.in_flight += 1
+            try:
+                yield
+            finally:
+                self.stats.in_flight -= 1
+                self.stats.record_latency(time.monotonic() - started_at)
+        finally:
+            if self._semaphore:
+                self._semaphore.release()
+
+
+def _env_number(name: str, cast):
+    value = os.getenv(name)
+    return cast(value) if value else None
+
+
+_shared_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(name: str = "openai") -> RateLimiter:
+    """Get the process-wide limiter for a backend, configured from the environment.
+
+    For the "openai" limiter the variables are OPENAI_MAX_RPS, OPENAI_MAX_TPM and
+    OPENAI_MAX_CONCURRENCY. Unset values mean that dimension is not limited.
+    """
+    if name not in _shared_limiters:
+        prefix = name.upper()
+        _shared_limiters[name] = RateLimiter(
+            requests_per_second=_env_number(f"{prefix}_MAX_RPS", float),
+            tokens_per_minute=_env_number(f"{prefix}_MAX_TPM", float),
+            max_concurrency=_env_number(f"{prefix}_MAX_CONCURRENCY", int),
+        )
+    return _shared_limiters[name]
+
+
+def get_rate_limiters() -> Dict[str, RateLimiter]:
+    """Every process-wide limiter created so far, by backend name"""
+    return dict(_shared_limiters)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate used for tokens-per-minute accounting"""
+    return len(text) // 4 + 1
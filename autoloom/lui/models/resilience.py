@@ -0,0 +1,229 @@
+import time
+import random
+import asyncio
+import email.utils
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, Awaitable, Callable, Dict, Mapping, Optional, TypeVar
+from urllib.parse import urlparse
+import aiohttp
+
+from ..telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Statuses worth retrying; every other 4xx will fail the same way again
+RETRYABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    """A failure that may succeed on retry, optionally with a server-suggested delay"""
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class FatalError(Exception):
+    """A failure that retrying cannot fix (bad request, auth, unknown model)"""
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the backend while its host's circuit is open"""
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse OpenAI-style reset durations such as '20ms', '1s' or '6m0s'"""
+    total = 0.0
+    number = ""
+    i = 0
+    units = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    while i < len(value):
+        char = value[i]
+        if char.isdigit() or char == ".":
+            number += char
+            i += 1
+            continue
+        unit = "ms" if value.startswith("ms", i) else char
+        if unit not in units or not number:
+            return None
+        total += float(number) * units[unit]
+        number = ""
+        i += len(unit)
+    if number:
+        total += float(number)
+    return total
+
+
+def parse_retry_after(headers: Mapping[str, str], status: Optional[int] = None) -> Optional[float]:
+    """Seconds to wait according to Retry-After or, for a 429, the reset header of the exhausted limit.
+
+    OpenAI sends x-ratelimit-reset-* on every response, and the reset is the
+    time until the bucket is full again, so it only says anything about a
+    retry when the request was rate limited and that bucket is empty.
+    """
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if value:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            try:
+                return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+
+    if status != 429:
+        return None
+    resets = [_parse_duration(headers[f"x-ratelimit-reset-{limit}"]) for limit in ("requests", "tokens")
+              if headers.get(f"x-ratelimit-remaining-{limit}") == "0" and headers.get(f"x-ratelimit-reset-{limit}")]
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+
+def error_for_status(status: int, headers: Mapping[str, str], body: str) -> Exception:
+    message = f"API Error (Status {status}): {body[:500]}"
+    if status in RETRYABLE_STATUSES:
+        return RetryableError(message, status, parse_retry_after(headers, status))
+    return FatalError(message, status)
+
+
+async def raise_for_status(response: aiohttp.ClientResponse):
+    """Raise RetryableError or FatalError for a non-200 aiohttp response"""
+    if response.status != 200:
+        raise error_for_status(response.status, response.headers, await response.text())
+
+
+class CircuitBreaker:
+    """Stops calling a host after repeated failures, then lets one probe through after a cool-down"""
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release(self):
+        """Give back a probe slot whose request was cancelled before it finished"""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    """The process-wide breaker for the host of `url`"""
+    host = urlparse(url).netloc or url
+    if host not in _breakers:
+        _breakers[host] = CircuitBreaker()
+    return _breakers[host]
+
+
+@asynccontextmanager
+async def _admitted(admit: Optional[Callable[[], AsyncContextManager]]):
+    if admit is None:
+        yield
+    else:
+        async with admit():
+            yield
+
+
+class RetryPolicy:
+    """Retries retryable failures with full-jitter exponential backoff.
+
+    Server hints (Retry-After, rate-limit reset headers) replace the computed
+    delay. Fatal errors are raised at once, every attempt goes through the
+    host's circuit breaker, and the attempts and backoff together are
+    bounded by `deadline` seconds. Time spent waiting for admission (a rate
+    limiter) is not part of the deadline.
+    """
+    def __init__(self, max_attempts: int = 5, base_delay: float = 0.5,
+                 max_delay: float = 30.0, deadline: float = 120.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retries = 0
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.max_delay) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def call(self, url: str, request: Callable[[], Awaitable[T]],
+                   admit: Optional[Callable[[], AsyncContextManager]] = None) -> T:
+        """Await `request()` with retries; each attempt first waits in `admit` (e.g. a rate limiter's acquire)"""
+        breaker = get_circuit_breaker(url)
+        # Seconds left for attempts and backoff; waiting for admission is neither a host failure nor counted here
+        remaining = self.deadline
+        attempt = 0
+        while True:
+            async with _admitted(admit):
+                if not breaker.allow():
+                    raise CircuitOpenError(f"Circuit open for {urlparse(url).netloc}; not sending request")
+                started = time.monotonic()
+                try:
+                    # An attempt in flight is cut off at the deadline too, whatever its own timeout
+                    result = await asyncio.wait_for(request(), max(remaining, 0))
+                    breaker.record_success()
+                    return result
+                except asyncio.CancelledError:
+                    breaker.release()
+                    raise
+                except FatalError:
+                    # The host answered; the request itself is wrong
+                    breaker.record_success()
+                    raise
+                except (RetryableError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if getattr(e, "status", None) == 429:
+                        # Rate limiting means the host is healthy, just busy
+                        breaker.release()
+                    else:
+                        breaker.record_failure()
+                    error = e
+                finally:
+                    remaining -= time.monotonic() - started
+
+            # Back off outside `admit`, so a waiting retry holds no slot
+            attempt += 1
+            delay = self.backoff(attempt, getattr(error, "retry_after", None))
+            if attempt >= self.max_attempts or delay > remaining:
+                raise error
+            remaining -= delay
+            self.retries += 1
+            get_telemetry().record_retry(f"{type(error).__name__}: {str(error)}")
+            logger.warning("Retrying after %s: %s. Attempt %d/%d, waiting %.1fs",
+                           type(error).__name__, str(error)[:200], attempt, self.max_attempts, delay)
+            await asyncio.sleep(delay)
@@ -0,0 +1,123 @@
+import os
+import time
+import sqlite3
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Dict
+
+
+class ScoreCache:
+    """Content-addressed cache of classifier scores.
+
+    Keys are a hash of (classifier model, system prompt, text). Entries live in
+    a bounded in-memory LRU and, when `path` is given, in a SQLite file that
+    survives restarts. Disk hits are promoted back into memory. Disk writes
+    are committed every `commit_every` scores or `commit_interval` seconds,
+    and on `flush`/`close`, so scoring never waits on one fsync per score.
+    """
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None,
+                 commit_every: int = 100, commit_interval: float = 5.0):
+        self.max_entries = max_entries
+        self.path = path
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+        self._memory: "OrderedDict[str, float]" = OrderedDict()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path)
+            self._db.execute("CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, score INTEGER NOT NULL)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, text: str) -> str:
+        digest = hashlib.sha256()
+        for part in (model, system_prompt, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _remember(self, key: str, score: float):
+        self._memory[key] = score
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[float]:
+        """Look up a score, counting the hit or miss"""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+
+        if self._db is not None:
+            row = self._db.execute("SELECT score FROM scores WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._remember(key, row[0])
+                self.hits += 1
+                self.disk_hits += 1
+                return row[0]
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, score: float):
+        self._remember(key, score)
+        if self._db is not None:
+            self._db.execute("INSERT OR REPLACE INTO scores (key, score) VALUES (?, ?)", (key, score))
+            self._uncommitted += 1
+            if (self._uncommitted >= self.commit_every
+                    or time.monotonic() - self._last_commit >= self.commit_interval):
+                self.flush()
+
+    def flush(self):
+        """Commit scores written since the last commit"""
+        if self._db is not None and self._uncommitted:
+            self._db.commit()
+            self._uncommitted = 0
+        self._last_commit = time.monotonic()
+
+    def summary(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._memory),
+        }
+
+    def format_summary(self) -> str:
+        stats = self.summary()
+        return (f"{stats['hits']} hits ({stats['disk_hits']} from disk), {stats['misses']} misses, "
+                f"{stats['hit_rate']:.0%} hit rate, {stats['entries']} entries in memory")
+
+    def close(self):
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+
+_score_cache: Optional[ScoreCache] = None
+
+
+def get_score_cache() -> ScoreCache:
+    """Get the process-wide score cache, configured from the environment.
+
+    SCORE_CACHE_SIZE bounds the in-memory tier (default 10000 entries) and
+    SCORE_CACHE_PATH enables the on-disk SQLite tier.
+    """
+    global _score_cache
+    if _score_cache is None:
+        _score_cache = ScoreCache(
+            max_entries=int(os.getenv("SCORE_CACHE_SIZE", "10000")),
+            path=os.getenv("SCORE_CACHE_PATH") or None,
+        )
+    return _score_cache
@@ -0,0 +1,98 @@
+import os
+import math
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def split_n(n: int, size: int) -> List[int]:
+    """Split n samples into the fewest sub-requests of at most `size`, as evenly as possible"""
+    if n <= 0:
+        return []
+    parts = math.ceil(n / max(size, 1))
+    base, extra = divmod(n, parts)
+    return [base + 1] * extra + [base] * (parts - extra)
+
+
+class ChunkLimit:
+    """Learned sub-request size for one provider and model, adjusted AIMD-style.
+
+    A fast success grows the size by one when the size was what limited it
+    (the chunk was full, or the round had to be split); a failure, or a
+    success that took more than `slowdown` times the fastest recent
+    per-token latency, halves it.
+    """
+    def __init__(self, size: int, max_size: int, slowdown: float, window: int = 50):
+        self.size = size
+        self.max_size = max_size
+        self.slowdown = slowdown
+        self._per_token: Deque[float] = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.slow = 0
+
+    def record_success(self, n: int, max_tokens: int, seconds: float, requested: Optional[int] = None):
+        self.successes += 1
+        per_token = seconds / max(max_tokens, 1)
+        baseline = min(self._per_token) if self._per_token else per_token
+        self._per_token.append(per_token)
+        if per_token > self.slowdown * baseline and n > 1:
+            self.slow += 1
+            self.size = max(1, min(self.size, n) // 2)
+        elif (requested or n) >= self.size:
+            # split_n spreads a round evenly, so its chunks rarely reach the size itself
+            self.size = min(self.max_size, self.size + 1)
+
+    def record_failure(self, n: int):
+        self.failures += 1
+        self.size = max(1, min(self.size, n) // 2)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'size': self.size,
+            'successes': self.successes,
+            'failures': self.failures,
+            'slow': self.slow,
+        }
+
+
+class RequestSplitter:
+    """Decides how a round of n samples is split into parallel sub-requests.
+
+    Without an `initial_size` rounds start unsplit (up to `max_size`) and
+    are only split once a provider fails or slows down.
+    """
+    def __init__(self, initial_size: Optional[int] = None, max_size: int = 16, slowdown: float = 2.0):
+        self.initial_size = initial_size or max_size
+        self.max_size = max_size
+        self.slowdown = slowdown
+        self._limits: Dict[str, ChunkLimit] = {}
+
+    def limit(self, provider: str, model: str) -> ChunkLimit:
+        key = f"{provider}:{model}"
+        if key not in self._limits:
+            self._limits[key] = ChunkLimit(self.initial_size, self.max_size, self.slowdown)
+        return self._limits[key]
+
+    def split(self, provider: str, model: str, n: int) -> List[int]:
+        return split_n(n, self.limit(provider, model).size)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {key: limit.summary() for key, limit in self._limits.items()}
+
+
+_splitter = None
+
+
+def get_request_splitter() -> RequestSplitter:
+    """The process-wide splitter, configured by GENERATION_CHUNK_SIZE, GENERATION_MAX_CHUNK_SIZE and GENERATION_SLOWDOWN"""
+    global _splitter
+    if _splitter is None:
+        _splitter = RequestSplitter(
+            initial_size=int(os.getenv("GENERATION_CHUNK_SIZE", "0")) or None,
+            max_size=int(os.getenv("GENERATION_MAX_CHUNK_SIZE", "16")),
+            slowdown=float(os.getenv("GENERATION_SLOWDOWN", "2.0")),
+        )
+    return _splitter
@@ -0,0 +1,99 @@
+import os
+import importlib.util
+import aiohttp
+import httpx
+from typing import Optional
+from dotenv import load_dotenv
+
+from ..telemetry import get_telemetry
+
+load_dotenv()
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+class Transport:
+    """Process-wide pool of keep-alive HTTP connections shared by every backend.
+
+    aiohttp callers (Generator, Classifier) take the session from `get_session`
+    and OpenAI SDK callers (tuni) take the httpx client from `get_httpx_client`.
+    Neither should close what they are given; call `close()` once on shutdown.
+    """
+    def __init__(self,
+                 limit: int = 100,
+                 limit_per_host: int = 32,
+                 keepalive_timeout: int = 90,
+                 dns_cache_ttl: int = 300,
+                 http2: bool = True):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        # httpx only speaks HTTP/2 when the optional h2 package is installed
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._httpx_client: Optional[httpx.AsyncClient] = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Get or create the shared aiohttp session"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, trace_configs=[get_telemetry().trace_config()])
+        return self._session
+
+    def get_httpx_client(self) -> httpx.AsyncClient:
+        """Get or create the shared httpx client used by OpenAI SDK clients"""
+        if self._httpx_client is None or self._httpx_client.is_closed:
+            self._httpx_client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.limit,
+                    max_keepalive_connections=self.limit_per_host,
+                    keepalive_expiry=self.keepalive_timeout,
+                ),
+                timeout=httpx.Timeout(120.0, connect=10.0),
+            )
+        return self._httpx_client
+
+    async def close(self):
+        """Close every pooled connection"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self._httpx_client is not None and not self._httpx_client.is_closed:
+            await self._httpx_client.aclose()
+        self._httpx_client = None
+
+
+_transport: Optional[Transport] = None
+
+
+def get_transport() -> Transport:
+    """Get the transport for this process, configured from the environment"""
+    global _transport
+    if _transport is None:
+        _transport = Transport(
+            limit=_env_int("HTTP_POOL_LIMIT", 100),
+            limit_per_host=_env_int("HTTP_POOL_LIMIT_PER_HOST", 32),
+            keepalive_timeout=_env_int("HTTP_KEEPALIVE_TIMEOUT", 90),
+            dns_cache_ttl=_env_int("HTTP_DNS_CACHE_TTL", 300),
+            http2=os.getenv("HTTP2", "1") != "0",
+        )
+    return _transport
+
+
+async def close_transport():
+    """Close the process-wide transport if it was created"""
+    global _transport
+    if _transport is not None:
+        await _transport.close()
+        _transport = None
@@ -0,0 +1,138 @@
+import math
+import asyncio
+from typing import List, Optional
+
+from .engine import LoomParams, has_successful_generation
+from .models.generator import Generator
+from .tree import NodeStore
+
+
+class SearchParams:
+    """Shape of a tree search.
+
+    `strategy` is "beam" (keep the best `beam_width` nodes at every depth) or
+    "mcts" (UCB selection driven by classifier scores). Each expanded node
+    gets `branching` children from a single n-sample request.
+    """
+    def __init__(self, strategy: str = "beam", beam_width: int = 3, branching: int = 4,
+                 depth: int = 5, iterations: int = 10, exploration: float = 1.4):
+        if strategy not in ("beam", "mcts"):
+            raise ValueError(f"Unknown search strategy: {strategy}")
+        self.strategy = strategy
+        self.beam_width = beam_width
+        self.branching = branching
+        self.depth = depth
+        self.iterations = iterations
+        self.exploration = exploration
+
+
+class SearchResult:
+    def __init__(self, store: NodeStore, best: int, requests: int):
+        self.store = store
+        self.best = best
+        self.requests = requests
+
+    @property
+    def best_text(self) -> str:
+        return self.store.text(self.best)
+
+    def to_dict(self) -> dict:
+        path = self.store.path(self.best)
+        return {
+            'best_text': self.best_text,
+            'best_score': self.store.score(self.best),
+            'path_scores': [self.store.score(node) for node in path[1:]],
+            'nodes': len(self.store),
+            'generation_requests': self.requests,
+        }
+
+
+class TreeSearch:
+    """Searches the continuation tree instead of greedily extending one branch"""
+    def __init__(self, generator: Generator, params: LoomParams, search: SearchParams):
+        self.generator = generator
+        self.params = params
+        self.search = search
+        self.requests = 0
+
+    async def expand(self, store: NodeStore, node: int) -> List[int]:
+        """Sample `branching` continuations of a node in one request and score them"""
+        self.requests += 1
+        prompt = store.text(node)
+        generations = await self.generator.generate_batch(
+            prompt,
+            self.params.generation_model,
+            self.params.max_tokens,
+            self.params.temperature,
+            self.search.branching
+        )
+        generations = [g for g in generations if g and not g.startswith("Error:")]
+        if not has_successful_generation(generations):
+            return []
+
+        scores = await self.generator.classify(generations, self.params.classifier_model, prefix=prompt)
+        return [store.add(node, generations[idx], score) for idx, score in scores]
+
+    async def beam(self, store: NodeStore) -> int:
+        frontier = [NodeStore.ROOT]
+        for _ in range(self.search.depth):
+            expansions = await asyncio.gather(*(self.expand(store, node) for node in frontier))
+            children = [child for expansion in expansions for child in expansion]
+            if not children:
+                break
+            children.sort(key=lambda child: store.scores[child], reverse=True)
+            frontier = children[:self.search.beam_width]
+        return max(frontier, key=lambda node: store.scores[node])
+
+    def _ucb(self, store: NodeStore, node: int, parent_visits: int) -> float:
+        if store.visits[node] == 0:
+            return math.inf
+        mean = store.value_sums[node] / store.visits[node]
+        return mean + self.search.exploration * math.sqrt(math.log(parent_visits + 1) / store.visits[node])
+
+    def _select(self, store: NodeStore) -> int:
+        node = NodeStore.ROOT
+        while store.children(node) and store.depths[node] < self.search.depth:
+            node = max(store.children(node), key=lambda child: self._ucb(store, child, store.visits[node]))
+        return node
+
+    def _backpropagate(self, store: NodeStore, node: int, value: float, visits: int = 1):
+        while node != -1:
+            store.visits[node] += visits
+            store.value_sums[node] += value
+            node = store.parents[node]
+
+    async def mcts(self, store: NodeStore) -> int:
+        for _ in range(self.search.iterations):
+            # Pick up to beam_width distinct leaves per iteration so their requests run together;
+            # a virtual visit on each pick steers the next pick elsewhere
+            leaves = []
+            for _ in range(self.search.beam_width):
+                leaf = self._select(store)
+                if leaf in leaves or store.depths[leaf] >= self.search.depth:
+                    break
+                leaves.append(leaf)
+                self._backpropagate(store, leaf, 0.0)
+            if not leaves:
+                break
+
+            expansions = await asyncio.gather(*(self.expand(store, leaf) for leaf in leaves))
+            for leaf, children in zip(leaves, expansions):
+                # Undo the virtual visit before adding the real values
+                self._backpropagate(store, leaf, 0.0, visits=-1)
+                for child in children:
+                    self._backpropagate(store, child, max(store.scores[child], 0.0) / 100)
+
+        deepest = max(store.depths)
+        candidates = [node for node in range(1, len(store)) if store.depths[node] == deepest]
+        if not candidates:
+            return NodeStore.ROOT
+        return max(candidates, key=lambda node: store.scores[node])
+
+    async def run(self, prompt: str, store: Optional[NodeStore] = None) -> SearchResult:
+        store = store or NodeStore(prompt)
+        if self.search.strategy == "beam":
+            best = await self.beam(store)
+        else:
+            best = await self.mcts(store)
+        return SearchResult(store, best, self.requests)
@@ -0,0 +1,126 @@
+import os
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class Session:
+    """One loom session running as a tracked task.
+
+    The session's loop calls `checkpoint()` between steps (rounds, countdown
+    ticks); a paused session waits there until it is resumed, so pausing
+    never interrupts a request in flight.
+    """
+    def __init__(self, session_id: int):
+        self.id = session_id
+        self.state = "queued"
+        self.task: Optional[asyncio.Task] = None
+        self._running = asyncio.Event()
+        self._running.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self.task is not None and self.task.done()
+
+    async def checkpoint(self):
+        if self.paused:
+            self.state = "paused"
+            await self._running.wait()
+            self.state = "running"
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        # A paused session has to wake up to see the cancellation
+        self._running.set()
+        if self.task is not None:
+            self.task.cancel()
+
+
+class SessionScheduler:
+    """Runs loom sessions as tracked tasks, at most `max_sessions` at a time.
+
+    Each session is a flat loop in its own task instead of a chain of
+    recursive calls, so long runs keep a constant stack. Sessions started
+    beyond the limit wait in "queued" until one finishes.
+    """
+    def __init__(self, max_sessions: int = 4):
+        self.max_sessions = max_sessions
+        # Created on first use, inside the event loop that runs the sessions
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._sessions: Dict[int, Session] = {}
+        self._next_id = 0
+
+    @classmethod
+    def from_env(cls) -> "SessionScheduler":
+        """LUI_MAX_SESSIONS sets how many sessions may run at once (default 4)"""
+        return cls(int(os.getenv("LUI_MAX_SESSIONS", "4")))
+
+    def start(self, run: Callable[[Session], Awaitable]) -> Session:
+        """Schedule `run(session)` and return its session; the task's result is whatever `run` returns"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_sessions)
+        session = Session(self._next_id)
+        self._next_id += 1
+        self._sessions[session.id] = session
+
+        async def runner():
+            async with self._slots:
+                session.state = "running"
+                return await run(session)
+
+        session.task = asyncio.ensure_future(runner())
+        session.task.add_done_callback(lambda task: self._finished(session))
+        return session
+
+    def _finished(self, session: Session):
+        self._sessions.pop(session.id, None)
+        if session.task.cancelled():
+            session.state = "cancelled"
+        elif session.task.exception() is not None:
+            session.state = "failed"
+            logger.error("Session %d failed: %s", session.id, session.task.exception())
+        else:
+            session.state = "finished"
+
+    def get(self, session_id: int) -> Optional[Session]:
+        return self._sessions.get(session_id)
+
+    @property
+    def sessions(self) -> List[Session]:
+        """Sessions that are queued, running or paused"""
+        return list(self._sessions.values())
+
+    def pause(self, session_id: int):
+        self._sessions[session_id].pause()
+
+    def resume(self, session_id: int):
+        self._sessions[session_id].resume()
+
+    async def cancel(self, session_id: int):
+        """Cancel a session and wait until it has stopped"""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.cancel()
+            await asyncio.gather(session.task, return_exceptions=True)
+
+    async def close(self):
+        """Cancel every session and wait for them to stop"""
+        sessions = self.sessions
+        for session in sessions:
+            session.cancel()
+        await asyncio.gather(*(session.task for session in sessions), return_exceptions=True)
+
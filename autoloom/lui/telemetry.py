@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("lui_span", default=None)
+
+
+class Span:
+    """One timed phase or request; nested spans share the trace id of the outermost one"""
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.start = time.time()
+        self.duration = 0.0
+        self._started = time.perf_counter()
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: float):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self) -> dict:
+        """OpenTelemetry-style span record"""
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_id,
+            'start_time_unix_nano': int(self.start * 1e9),
+            'end_time_unix_nano': int((self.start + self.duration) * 1e9),
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class Telemetry:
+    """Records spans for every phase and request, keeps rolling per-phase stats and exports spans.
+
+    Spans nest through a context variable, so tasks started inside a span
+    (gathered requests, streamed scoring) become its children. With `path`
+    set, finished spans are appended to that file as JSON lines.
+    """
+    def __init__(self, path: Optional[str] = None, window: int = 1000):
+        self.path = path
+        self._file = None
+        self._unflushed = 0
+        self._durations: Dict[str, Deque[float]] = {}
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.window = window
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.retries = 0
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        parent = _current_span.get()
+        span = Span(name, parent.trace_id if parent else os.urandom(16).hex(),
+                    parent.span_id if parent else None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+            span.set("error", f"{type(e).__name__}: {str(e)[:200]}")
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def record_usage(self, usage: Optional[dict]):
+        """Add an API response's `usage` token counts to the current span and the totals"""
+        if not usage:
+            return
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        span = current_span()
+        if span is not None:
+            span.add("prompt_tokens", prompt_tokens)
+            span.add("completion_tokens", completion_tokens)
+
+    def record_retry(self, reason: str):
+        self.retries += 1
+        span = current_span()
+        if span is not None:
+            span.add("retries", 1)
+            span.set("last_retry_reason", reason[:200])
+
+    def _finish(self, span: Span):
+        span.duration = time.perf_counter() - span._started
+        if "ttfb_s" in span.attributes:
+            span.set("body_s", max(span.duration - span.attributes["ttfb_s"], 0.0))
+        self.counts[span.name] = self.counts.get(span.name, 0) + 1
+        if span.status != "ok":
+            self.errors[span.name] = self.errors.get(span.name, 0) + 1
+        self._durations.setdefault(span.name, deque(maxlen=self.window)).append(span.duration)
+
+        if self.path:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(span.to_dict()) + "\n")
+            self._unflushed += 1
+            if self._unflushed >= 100:
+                self.flush()
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+        self._unflushed = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def summary(self) -> Dict[str, dict]:
+        phases = {}
+        for name, durations in self._durations.items():
+            ordered = sorted(durations)
+            phases[name] = {
+                'count': self.counts[name],
+                'errors': self.errors.get(name, 0),
+                'mean_s': sum(ordered) / len(ordered),
+                'p50_s': ordered[len(ordered) // 2],
+                'p95_s': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            }
+        return {
+            'phases': phases,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'retries': self.retries,
+        }
+
+    def format_summary(self) -> str:
+        """Plain-text table of the summary, for the TUI and CLI"""
+        summary = self.summary()
+        lines = [f"{'phase':<26}{'count':>7}{'errors':>8}{'mean':>9}{'p50':>9}{'p95':>9}"]
+        for name, phase in sorted(summary['phases'].items()):
+            lines.append(f"{name:<26}{phase['count']:>7}{phase['errors']:>8}"
+                         f"{phase['mean_s']:>8.3f}s{phase['p50_s']:>8.3f}s{phase['p95_s']:>8.3f}s")
+        lines.append("")
+        lines.append(f"tokens: {summary['prompt_tokens']} prompt, {summary['completion_tokens']} completion; "
+                     f"retries: {summary['retries']}")
+        if self.path:
+            lines.append(f"spans written to {self.path}")
+        return "\n".join(lines)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """aiohttp hooks that attach queue, connect and time-to-first-byte timings to the current span"""
+        config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            ctx.request_start = time.perf_counter()
+
+        async def on_queued_start(session, ctx, params):
+            ctx.queued = time.perf_counter()
+
+        async def on_queued_end(session, ctx, params):
+            span = current_span()
+            if span is not None:
+                span.add("queue_s", time.perf_counter() - ctx.queued)
+
+        async def on_create_start(session, ctx, params):
+            ctx.connecting = time.perf_counter()
+
+        async def on_create_end(session, ctx, params):
+            span = current_span()
+            if span is not None:
+                span.add("connect_s", time.perf_counter() - ctx.connecting)
+
+        async def on_reuse(session, ctx, params):
+            span = current_span()
+            if span is not None:
+                span.set("reused_connection", True)
+
+        async def on_request_end(session, ctx, params):
+            # Fires once the response headers have arrived
+            span = current_span()
+            if span is not None:
+                span.set("ttfb_s", time.perf_counter() - ctx.request_start)
+                span.set("http_status", params.response.status)
+
+        config.on_request_start.append(on_request_start)
+        config.on_connection_queued_start.append(on_queued_start)
+        config.on_connection_queued_end.append(on_queued_end)
+        config.on_connection_create_start.append(on_create_start)
+        config.on_connection_create_end.append(on_create_end)
+        config.on_connection_reuseconn.append(on_reuse)
+        config.on_request_end.append(on_request_end)
+        return config
+
+
+_telemetry: Optional[Telemetry] = None
+
+
+def get_telemetry() -> Telemetry:
+    """The process-wide telemetry; LUI_TRACE_PATH exports spans as JSON lines"""
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = Telemetry(os.getenv("LUI_TRACE_PATH") or None)
+    return _telemetry
+
+
+def configure_logging(log_path: Optional[str] = None):
+    """Send library logs to stderr, or to `log_path` when a full-screen UI owns the terminal"""
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    if log_path:
+        logging.basicConfig(filename=log_path, level=level,
+                            format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    else:
+        logging.basicConfig(level=level, format="%(message)s")
@@ -0,0 +1,82 @@
+import json
+from array import array
+from typing import List, Optional
+
+NO_SCORE = -1.0
+
+
+def format_score(score: Optional[float]) -> str:
+    """Scores are floats in the store; show whole numbers without a trailing .0"""
+    return "unscored" if score is None else f"{score:g}"
+
+
+class NodeStore:
+    """Append-only loom tree kept in parallel arrays.
+
+    Each node stores only its own text (the root holds the original prompt),
+    a parent index and a score. Node ids are indices, so the whole tree is a
+    handful of flat arrays plus one list of strings.
+    """
+    __slots__ = ("parents", "depths", "scores", "visits", "value_sums", "texts", "_children")
+
+    ROOT = 0
+
+    def __init__(self, root_text: str):
+        self.parents = array("i", [-1])
+        self.depths = array("i", [0])
+        self.scores = array("d", [NO_SCORE])
+        # Visit counts and summed values for MCTS backpropagation
+        self.visits = array("i", [0])
+        self.value_sums = array("d", [0.0])
+        self.texts: List[str] = [root_text]
+        self._children: List[List[int]] = [[]]
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def add(self, parent: int, text: str, score: Optional[float] = None) -> int:
+        """Append a child of `parent` and return its id"""
+        node = len(self.texts)
+        self.parents.append(parent)
+        self.depths.append(self.depths[parent] + 1)
+        self.scores.append(NO_SCORE if score is None else score)
+        self.visits.append(0)
+        self.value_sums.append(0.0)
+        self.texts.append(text)
+        self._children.append([])
+        self._children[parent].append(node)
+        return node
+
+    def set_score(self, node: int, score: float):
+        self.scores[node] = score
+
+    def score(self, node: int) -> Optional[float]:
+        return None if self.scores[node] == NO_SCORE else self.scores[node]
+
+    def children(self, node: int) -> List[int]:
+        return self._children[node]
+
+    def path(self, node: int) -> List[int]:
+        """Node ids from the root down to `node`"""
+        nodes = []
+        while node != -1:
+            nodes.append(node)
+            node = self.parents[node]
+        nodes.reverse()
+        return nodes
+
+    def text(self, node: int) -> str:
+        """The full text from the root prompt through `node`"""
+        return "".join(self.texts[n] for n in self.path(node))
+
+    def export_jsonl(self, f, start: int = 0) -> int:
+        """Append nodes from `start` onwards to an open JSONL file and return the next start"""
+        for node in range(start, len(self.texts)):
+            f.write(json.dumps({
+                'id': node,
+                'parent': self.parents[node],
+                'text': self.texts[node],
+                'score': self.score(node),
+            }) + "\n")
+        f.flush()
+        return len(self.texts)
@@ -1,16 +1,18 @@
 from textual.app import App, ComposeResult
-from textual.containers import Container, Vertical
-from textual.widgets import Header, Footer, Input, Select, Button, Static
+from textual.containers import Container
+from textual.widgets import Header, Footer, Input, Select, Button, Static, Checkbox
 import asyncio
 import pyperclip
 import os
 import re
 from dotenv import load_dotenv
 
-from .components.generation_box import GenerationBox
+from .components.generation_list import GenerationList
 from .components.completion_overlay import CompletionOverlay
 from .components.quit_overlay import QuitConfirmationOverlay
+from .components.telemetry_overlay import TelemetryOverlay
 from .generation_manager import GenerationManager
+from ..models.backends import get_backend_registry
 
 load_dotenv()
 
@@ -48,6 +50,9 @@ class AUTOLOOM(App):
     BINDINGS = [
         ("ctrl+c", "quit", "Quit"),
         ("ctrl+s", "show_completion", "Show Full Completion"),
+        ("ctrl+t", "show_telemetry", "Telemetry"),
+        ("ctrl+p", "toggle_pause", "Pause/Resume"),
+        ("ctrl+x", "stop", "Stop"),
         ("ctrl+equals", "zoom_in", "Zoom In"),
         ("ctrl+minus", "zoom_out", "Zoom Out"),
     ]
@@ -61,20 +66,31 @@ class AUTOLOOM(App):
 
     async def action_quit(self) -> None:
         """Show quit confirmation overlay"""
-        self.push_screen(QuitConfirmationOverlay(self.generation_manager.completion_history))
+        manager = self.generation_manager
+        self.push_screen(QuitConfirmationOverlay(manager.history, manager.current_node))
 
     def action_show_completion(self) -> None:
         """Show the full completion overlay with history without copying"""
-        if self.generation_manager.completion_history:
-            full_history = "Original Prompt:\n" + self.generation_manager.original_prompt + "\n\n"
-            for i, entry in enumerate(self.generation_manager.completion_history, 1):
-                full_history += f"Completion {i} (score: {entry['score']}):\n{entry['result']}\n\n"
-            self.push_screen(CompletionOverlay(full_history))
+        manager = self.generation_manager
+        if manager.history is not None and manager.current_node != manager.history.ROOT:
+            self.push_screen(CompletionOverlay(store=manager.history, node=manager.current_node))
         else:
             prompt_input = self.query_one("#prompt-input")
             if prompt_input and prompt_input.value:
                 self.push_screen(CompletionOverlay(prompt_input.value))
                 
+    def action_show_telemetry(self) -> None:
+        """Show latency, token and retry totals for this session"""
+        self.push_screen(TelemetryOverlay(self.generation_manager.details_summary))
+
+    async def action_toggle_pause(self) -> None:
+        """Pause or resume the running loom session"""
+        await self.generation_manager.toggle_pause()
+
+    async def action_stop(self) -> None:
+        """Stop the running loom session"""
+        await self.generation_manager.stop()
+
     def action_zoom_in(self) -> None:
         """Zoom in the UI by increasing the scale factor"""
         if self.zoom_level < 2.0:  # Set a reasonable upper limit
@@ -94,11 +110,7 @@ class AUTOLOOM(App):
             Static("LUI v0.0.3, by VIE MCCOY and Morpheus Systems", id="version"),
             Container(
                 Input(placeholder="Enter your prompt...", id="prompt-input"),
-                Select([
-                    ("Llama-405b Base", "meta-llama/Meta-Llama-3.1-405B"),
-                    ("GPT-4 Base", "gpt-4-base"),
-                    ("GPT-3.5 Turbo Instruct", "gpt-3.5-turbo-instruct")
-                ], prompt="Select Generation Model", id="generation-model-select", value="meta-llama/Meta-Llama-3.1-405B"),
+                Select(get_backend_registry().generation_models(), prompt="Select Generation Model", id="generation-model-select", value="meta-llama/Meta-Llama-3.1-405B"),
                 Select(
                     get_classifier_models(),
                     prompt="Select Classification Model", 
@@ -112,11 +124,12 @@ class AUTOLOOM(App):
                     Input(placeholder="Wait Time (s)", value="10", id="wait-time-input"),
                     id="settings"
                 ),
+                Checkbox("Stream tokens and score as each generation finishes", value=True, id="stream-checkbox"),
                 Button("Generate", id="generate-btn"),
                 id="input-container"
             ),
             Container(
-                Vertical(id="generations"),
+                GenerationList(id="generations"),
                 Static("Ready", id="timer"),
                 id="generation-view",
                 classes="hidden"
@@ -140,10 +153,10 @@ class AUTOLOOM(App):
 
     async def update_status(self, text: str):
         """Update status with animation"""
-        if self._status_task:
-            self._status_task.cancel()
-            await asyncio.sleep(0.1)  # Allow cancellation to process
-        self._status_task = asyncio.create_task(self.animate_status(text))
+        # Replace the task before yielding, so concurrent updates can't leave an orphaned animation running
+        previous, self._status_task = self._status_task, asyncio.create_task(self.animate_status(text))
+        if previous:
+            previous.cancel()
 
     def on_mount(self):
         """Initialize UI elements on mount"""
@@ -166,9 +179,13 @@ class AUTOLOOM(App):
         """Handle button press events"""
         # Only handle generate button events at app level
         if event.button.id == "generate-btn":
-            asyncio.create_task(self.generation_manager.generate())
+            self.generation_manager.generate()
             event.stop()  # Stop event propagation
 
+    def on_generation_list_selected(self, message: GenerationList.Selected):
+        """Clicking a generation during the countdown continues with it instead"""
+        self.generation_manager.select_generation(message.idx)
+
     async def on_unmount(self):
         """Cleanup on app shutdown"""
         self.is_closing = True
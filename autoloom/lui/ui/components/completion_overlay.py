@@ -3,11 +3,30 @@ from textual.containers import Container
 from textual.widgets import Static, Button
 import pyperclip
 from textual.app import ComposeResult
+from typing import Optional
+from ...tree import NodeStore, format_score
+
+def format_completion_history(store: NodeStore, node: int) -> str:
+    """Render the path to `node` as the full-completion view, in one pass"""
+    path = store.path(node)
+    parts = ["Original Prompt:\n", store.texts[path[0]], "\n\n"]
+    for i, step in enumerate(path[1:], 1):
+        parts.append(f"Completion {i} (score: {format_score(store.score(step))}):\n{store.texts[step]}\n\n")
+    return "".join(parts)
 
 class CompletionOverlay(Screen):
-    def __init__(self, completion_text: str):
+    def __init__(self, completion_text: Optional[str] = None, store: Optional[NodeStore] = None, node: int = NodeStore.ROOT):
         super().__init__()
-        self.completion_text = completion_text
+        self._completion_text = completion_text
+        self.store = store
+        self.node = node
+
+    @property
+    def completion_text(self) -> str:
+        """Built from the tree on first use, so opening the app never pays for it"""
+        if self._completion_text is None:
+            self._completion_text = format_completion_history(self.store, self.node)
+        return self._completion_text
 
     def compose(self) -> ComposeResult:
         yield Container(
@@ -0,0 +1,230 @@
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+from rich.segment import Segment
+from rich.style import Style
+from rich.text import Text
+from textual.geometry import Size
+from textual.message import Message
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from ...tree import format_score
+
+# Lines around each entry's text: top border, bottom border and a blank spacer
+ENTRY_CHROME = 3
+
+
+class GenerationEntry:
+    """One candidate in the list; caches its wrapped text until the text, score or width changes"""
+    __slots__ = ("idx", "text", "score", "status", "winner", "_lines", "_width")
+
+    def __init__(self, idx: int, text: str = "", status: str = ""):
+        self.idx = idx
+        self.text = text
+        self.score = None
+        self.status = status
+        self.winner = False
+        self._lines: Optional[List[Strip]] = None
+        self._width = 0
+
+    @property
+    def label(self) -> str:
+        if self.winner:
+            return f"👑 Selected output (score: {format_score(self.score)}): {self.text}"
+        if self.score is not None:
+            return f"Generation {self.idx + 1} (score: {format_score(self.score)}): {self.text}"
+        if self.status and not self.text:
+            return f"Generation {self.idx + 1}: ({self.status})"
+        suffix = f" ({self.status})" if self.status else ""
+        return f"Generation {self.idx + 1}: {self.text}{suffix}"
+
+    def invalidate(self):
+        self._lines = None
+
+    def lines(self, console, width: int) -> List[Strip]:
+        """Wrapped text lines; a plain Text is never parsed as markup, so nothing needs escaping"""
+        if self._lines is None or self._width != width:
+            wrapped = Text(self.label).wrap(console, max(width, 1))
+            self._lines = [Strip(line.render(console), line.cell_len) for line in wrapped] or [Strip.blank(0)]
+            self._width = width
+        return self._lines
+
+
+class GenerationList(ScrollView):
+    """Scrollable list of boxed generations that renders only the visible lines.
+
+    Rows are updated and reordered in place, each entry caches its wrapped
+    text, and the number of scored entries is tracked as scores arrive.
+    """
+    COMPONENT_CLASSES = {
+        "generation-list--box",
+        "generation-list--border",
+        "generation-list--winner",
+        "generation-list--winner-border",
+        "generation-list--hover",
+    }
+
+    class Selected(Message):
+        """Posted when a generation is clicked"""
+        def __init__(self, idx: int):
+            self.idx = idx
+            super().__init__()
+
+    def __init__(self, id: Optional[str] = None):
+        super().__init__(id=id)
+        self.entries: List[GenerationEntry] = []
+        self.order: List[int] = []
+        self.scored_count = 0
+        self._offsets: List[int] = []
+        self._layout_dirty = True
+        self._layout_width = 0
+        self._hover: Optional[int] = None
+
+    # --- updates -------------------------------------------------------
+
+    def reset(self, count: int, status: str = ""):
+        """Replace the list with `count` empty entries"""
+        self.entries = [GenerationEntry(idx, status=status) for idx in range(count)]
+        self.order = list(range(count))
+        self.scored_count = 0
+        self._hover = None
+        self._changed(scroll_home=True)
+
+    def set_texts(self, texts: List[str], status: str = ""):
+        """Replace the list with one entry per text"""
+        self.reset(len(texts), status)
+        for entry, text in zip(self.entries, texts):
+            entry.text = text
+
+    def set_text(self, idx: int, text: str, status: str = ""):
+        entry = self.entries[idx]
+        entry.text = text
+        entry.status = status
+        entry.invalidate()
+        self._changed()
+
+    def set_score(self, idx: int, score: Optional[float]):
+        entry = self.entries[idx]
+        if entry.score is None and entry.status != "scored":
+            self.scored_count += 1
+        entry.score = score
+        entry.status = "scored"
+        entry.invalidate()
+        self._changed()
+
+    def show_ranking(self, ranked: List[Tuple[int, Optional[float]]]):
+        """Reorder entries best first and mark the winner, without rebuilding anything else"""
+        for entry in self.entries:
+            if entry.winner:
+                entry.winner = False
+                entry.invalidate()
+        for idx, score in ranked:
+            entry = self.entries[idx]
+            entry.score = score
+            entry.status = "scored"
+            entry.invalidate()
+        ranked_ids = {idx for idx, _ in ranked}
+        self.order = [idx for idx, _ in ranked] + [idx for idx in range(len(self.entries)) if idx not in ranked_ids]
+        if self.order:
+            self.entries[self.order[0]].winner = True
+        self._changed(scroll_home=True)
+
+    def _changed(self, scroll_home: bool = False):
+        self._layout_dirty = True
+        if scroll_home:
+            self.scroll_to(0, 0, animate=False)
+        self.refresh()
+
+    # --- layout and rendering ------------------------------------------
+
+    @property
+    def _text_width(self) -> int:
+        # Border and one column of padding on each side
+        return max(self.scrollable_content_region.width - 4, 1)
+
+    def _layout(self):
+        width = self._text_width
+        if not self._layout_dirty and width == self._layout_width:
+            return
+        console = self.app.console
+        offsets = []
+        total = 0
+        for idx in self.order:
+            offsets.append(total)
+            total += len(self.entries[idx].lines(console, width)) + ENTRY_CHROME
+        self._offsets = offsets
+        self._layout_width = width
+        self._layout_dirty = False
+        self.virtual_size = Size(self.scrollable_content_region.width, total)
+
+    def _entry_at(self, line: int) -> Tuple[Optional[int], int]:
+        """(position in order, line within the entry) for a virtual line"""
+        position = bisect_right(self._offsets, line) - 1
+        if position < 0 or position >= len(self.order):
+            return None, 0
+        return position, line - self._offsets[position]
+
+    def _styles(self, entry: GenerationEntry, position: int) -> Tuple[Style, Style]:
+        if entry.winner:
+            box = self.get_component_rich_style("generation-list--winner")
+            border = self.get_component_rich_style("generation-list--winner-border")
+        else:
+            box = self.get_component_rich_style("generation-list--box")
+            border = self.get_component_rich_style("generation-list--border")
+        if position == self._hover:
+            hover = self.get_component_rich_style("generation-list--hover")
+            box, border = box + hover, border + hover
+        return box, border
+
+    def render_line(self, y: int) -> Strip:
+        self._layout()
+        scroll_x, scroll_y = self.scroll_offset
+        width = self.scrollable_content_region.width
+        position, local = self._entry_at(y + scroll_y)
+        if position is None:
+            return Strip.blank(width, self.rich_style)
+
+        entry = self.entries[self.order[position]]
+        lines = entry.lines(self.app.console, self._text_width)
+        box, border = self._styles(entry, position)
+        top_left, top_right, bottom_left, bottom_right, horizontal, vertical = (
+            "╔", "╗", "╚", "╝", "═", "║") if entry.winner else ("┌", "┐", "└", "┘", "─", "│")
+        inner = width - 2
+
+        if local == 0:
+            segments = [Segment(top_left + horizontal * inner + top_right, border)]
+        elif local <= len(lines):
+            text = lines[local - 1]
+            padding = max(self._text_width - text.cell_length, 0)
+            segments = [Segment(vertical, border), Segment(" ", box)]
+            segments.extend(text.apply_style(box))
+            segments.extend([Segment(" " * (padding + 1), box), Segment(vertical, border)])
+        elif local == len(lines) + 1:
+            segments = [Segment(bottom_left + horizontal * inner + bottom_right, border)]
+        else:
+            return Strip.blank(width, self.rich_style)
+        return Strip(segments, width).crop(scroll_x, scroll_x + width)
+
+    # --- interaction ---------------------------------------------------
+
+    def on_resize(self):
+        self._layout_dirty = True
+
+    def _position_at(self, event) -> Optional[int]:
+        offset = event.get_content_offset(self)
+        return self._entry_at(offset.y + self.scroll_offset.y)[0] if offset is not None else None
+
+    def on_click(self, event):
+        position = self._position_at(event)
+        if position is not None:
+            self.post_message(self.Selected(self.order[position]))
+
+    def on_mouse_move(self, event):
+        position = self._position_at(event)
+        if position != self._hover:
+            self._hover = position
+            self.refresh()
+
+    def on_leave(self, event):
+        if self._hover is not None:
+            self._hover = None
+            self.refresh()
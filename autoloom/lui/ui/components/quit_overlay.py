@@ -3,26 +3,36 @@ from textual.containers import Container
 from textual.widgets import Static, Button
 import pyperclip
 from textual.app import ComposeResult
+from typing import Optional
+from ...tree import NodeStore, format_score
+
+def format_session_history(store: Optional[NodeStore], node: int) -> str:
+    """Render every step on the path to `node` with its prompt, in one pass"""
+    parts = ["Session History:\n\n"]
+    if store is not None:
+        path = store.path(node)
+        for i in range(1, len(path)):
+            parts.append(f"Step {i}:\n")
+            parts.append(f"Prompt: {store.texts[path[i - 1]]}\n")
+            parts.append(f"Completion: {store.texts[path[i]]}\n")
+            parts.append(f"Score: {format_score(store.score(path[i]))}\n\n")
+    return "".join(parts)
 
 class QuitConfirmationOverlay(Screen):
-    def __init__(self, completion_history):
+    def __init__(self, store: Optional[NodeStore] = None, node: int = NodeStore.ROOT):
         super().__init__()
-        self.completion_history = completion_history
+        self.store = store
+        self.node = node
+        self.full_state = ""
 
     def compose(self) -> ComposeResult:
-        full_state = "Session History:\n\n"
-        if self.completion_history:
-            for i, entry in enumerate(self.completion_history, 1):
-                full_state += f"Step {i}:\n"
-                full_state += f"Prompt: {entry['prompt']}\n"
-                full_state += f"Completion: {entry['result']}\n"
-                full_state += f"Score: {entry['score']}\n\n"
-        
+        self.full_state = format_session_history(self.store, self.node)
+
         yield Container(
             Container(
                 Container(
                     Static("Do you want to copy the session history before quitting?"),
-                    Static(full_state, id="quit-state-text"),
+                    Static(self.full_state, id="quit-state-text", markup=False),
                     id="scroll-container"
                 ),
                 Container(
@@ -38,7 +48,7 @@ class QuitConfirmationOverlay(Screen):
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "copy-quit-btn":
-            pyperclip.copy(self.query_one("#quit-state-text").render())
+            pyperclip.copy(self.full_state)
             self.app.exit()
         elif event.button.id == "just-quit-btn":
             self.app.exit()
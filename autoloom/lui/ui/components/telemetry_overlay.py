@@ -0,0 +1,39 @@
+from typing import Callable, Optional
+from textual.screen import Screen
+from textual.containers import Container
+from textual.widgets import Static, Button
+from textual.app import ComposeResult
+from ...telemetry import get_telemetry
+
+class TelemetryOverlay(Screen):
+    """Per-phase latency, token usage and retries for this session, plus any `details` lines"""
+    def __init__(self, details: Optional[Callable[[], str]] = None):
+        super().__init__()
+        self.details = details
+
+    def summary(self) -> str:
+        details = self.details() if self.details else ""
+        return get_telemetry().format_summary() + (f"\n{details}" if details else "")
+
+    def compose(self) -> ComposeResult:
+        yield Container(
+            Container(
+                Container(
+                    Static(self.summary(), id="telemetry-text", markup=False),
+                    id="scroll-container"
+                ),
+                Container(
+                    Button("Refresh", id="refresh-btn"),
+                    Button("Return", id="return-btn"),
+                    id="overlay-buttons"
+                ),
+                id="overlay-content"
+            ),
+            id="overlay"
+        )
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        if event.button.id == "refresh-btn":
+            self.query_one("#telemetry-text", Static).update(self.summary())
+        elif event.button.id == "return-btn":
+            self.app.pop_screen()
@@ -1,18 +1,45 @@
+import os
 import asyncio
-from typing import Dict, Any, Tuple
-from ..models.generator import Generator
-from .components.generation_box import GenerationBox
+import logging
+from typing import Dict, Any, Optional, Tuple
+from ..engine import LoomEngine, LoomListener, LoomParams, SpeculativeRound, has_successful_generation
+from ..sessions import Session, SessionScheduler
+from ..models.transport import close_transport
+from ..telemetry import get_telemetry
+from ..tree import NodeStore
 
-class GenerationManager:
+logger = logging.getLogger(__name__)
+
+class GenerationManager(LoomListener):
+    """Textual view over LoomEngine: reads settings from widgets and renders progress"""
     def __init__(self, app):
         self.app = app
-        self.generator = Generator()
+        self.engine = LoomEngine()
+        self.generator = self.engine.generator
         self.generations = []
+        self._stream = True
+        self._scores = []
         self.original_prompt = ""
-        self.completion_history = []
+        # The loom tree: every round's generations are children of the node they continued
+        self.history: Optional[NodeStore] = None
+        self.current_node = NodeStore.ROOT
+        self._history_path = os.getenv("LUI_HISTORY_PATH")
+        self._exported_nodes = 0
         self._status_task = None
         self.is_closing = False
         self.wait_time = 10
+        # Each Generate press runs as a scheduled session; only the latest one drives the widgets
+        self.scheduler = SessionScheduler.from_env()
+        self.session: Optional[Session] = None
+        # Rounds started during the countdown from the best LUI_SPECULATE candidates, keyed by candidate
+        self.speculate = int(os.getenv("LUI_SPECULATE", "0"))
+        self._params: Optional[LoomParams] = None
+        self._speculations: Dict[int, SpeculativeRound] = {}
+        self._adopted: Optional[SpeculativeRound] = None
+        self._override: Optional[int] = None
+        self._override_event: Optional[asyncio.Event] = None
+        self.speculation_stats = {'started': 0, 'adopted': 0, 'discarded': 0,
+                                  'wasted_tokens': 0, 'wasted_scores': 0, 'wasted_seconds': 0.0}
 
     async def update_status(self, text: str):
         """Delegate status updates to the app"""
@@ -27,90 +54,174 @@ class GenerationManager:
             'temperature': float(self.app.query_one("#temp-input").value),
             'max_tokens': int(self.app.query_one("#tokens-input").value),
             'num_generations': int(self.app.query_one("#gen-count-input").value),
-            'wait_time': int(self.app.query_one("#wait-time-input").value)
+            'wait_time': int(self.app.query_one("#wait-time-input").value),
+            'stream': self.app.query_one("#stream-checkbox").value
         }
 
-    async def perform_generation_phase(self, inputs: Dict[str, Any]) -> bool:
-        """Handle the text generation phase"""
-        await self.update_status("Generating in batch")
-        self.generations = await self.generator.generate_batch(
-            inputs['prompt'],
-            inputs['generation_model'],
-            inputs['max_tokens'],
-            inputs['temperature'],
-            inputs['num_generations']
+    def params_from_inputs(self, inputs: Dict[str, Any]) -> LoomParams:
+        return LoomParams(
+            generation_model=inputs['generation_model'],
+            classifier_model=inputs['classifier_model'],
+            temperature=inputs['temperature'],
+            max_tokens=inputs['max_tokens'],
+            num_generations=inputs['num_generations'],
+            stream=inputs['stream']
         )
 
-        if not self.generations or all(g.startswith("Error:") for g in self.generations):
-            await self.update_status("No successful generations")
-            self.app.show_input_view()
-            return False
-        return True
+    async def on_round_start(self, prompt: str, num_generations: int):
+        """Show one placeholder row per generation"""
+        await self.update_status("Streaming generations" if self._stream else "Generating in batch")
+        self.generations = [""] * num_generations
+        self.app.query_one("#generations").reset(num_generations, "Streaming..." if self._stream else "")
 
-    async def perform_scoring_phase(self, classifier_model: str):
-        """Handle the scoring phase"""
-        await self.update_status("Scoring all generations in parallel")
-        generations_container = self.app.query_one("#generations")
-        generations_container.remove_children()
+    async def on_token(self, idx: int, text: str):
+        self.generations[idx] = text
+        self.app.query_one("#generations").set_text(idx, text)
 
-        gen_boxes = []
-        for idx, text in enumerate(self.generations):
-            box = GenerationBox(f"Generation {idx+1}: {text} (Awaiting score...)")
-            generations_container.mount(box)
-            gen_boxes.append(box)
-
-        async def update_score(idx: int, score: int):
-            gen_boxes[idx].text = f"Generation {idx+1} (score: {score}): {self.generations[idx]}"
-            gen_boxes[idx].refresh()
-            scored_count = sum(1 for box in gen_boxes if "score:" in box.text)
-            await self.update_status(f"Scored {scored_count}/{len(self.generations)} generations")
+    async def on_generations(self, generations):
+        """Show batch generations while they are scored"""
+        await self.update_status("Scoring all generations in parallel")
+        self.generations = generations
+        self.app.query_one("#generations").set_texts(generations, "Awaiting score...")
 
-        return await self.generator.classify(self.generations, classifier_model, update_score)
+    async def on_score(self, idx: int, score: int):
+        generation_list = self.app.query_one("#generations")
+        generation_list.set_score(idx, score)
+        prompt_tokens = self.generator.context.last_prompt_tokens
+        await self.update_status(f"Scored {generation_list.scored_count}/{len(self.generations)} generations (prompt: {prompt_tokens} tokens)")
 
     async def display_results(self, scored_generations) -> Tuple[int, int]:
-        """Display the generation results"""
-        generations_container = self.app.query_one("#generations")
-        generations_container.remove_children()
-        
-        chosen_idx, chosen_score = scored_generations[0]
-        generations_container.mount(
-            GenerationBox(
-                f"Selected output (score: {chosen_score}): {self.generations[chosen_idx]}",
-                winner=True
-            )
-        )
+        """Reorder the generations best first and mark the selected one"""
+        with get_telemetry().span("render", boxes=len(scored_generations)):
+            generation_list = self.app.query_one("#generations")
+            if len(generation_list.entries) != len(self.generations):
+                generation_list.set_texts(self.generations)
+            # Streams that fell back to batch requests never reported their tokens
+            for idx, text in enumerate(self.generations):
+                if generation_list.entries[idx].text != text:
+                    generation_list.set_text(idx, text)
+            generation_list.show_ranking(scored_generations)
 
-        for idx, score in scored_generations[1:]:
-            generations_container.mount(
-                GenerationBox(f"Generation {idx+1} (score: {score}): {self.generations[idx]}")
-            )
+        return scored_generations[0]
 
-        return chosen_idx, chosen_score
-
-    async def handle_countdown(self, chosen_idx: int, chosen_score: int) -> bool:
-        """Handle countdown and selection process"""
-        for i in range(self.wait_time, 0, -1):
-            await self.update_status(f"Continuing with selected generation in {i}")
-            await asyncio.sleep(1)
+    async def handle_countdown(self, chosen_idx: int, chosen_score: int, session: Session) -> bool:
+        """Handle countdown and selection process; clicking a generation during it continues with that one"""
+        self.start_speculation()
+        self._override = None
+        self._override_event = asyncio.Event()
+        with get_telemetry().span("countdown", wait_time=self.wait_time, speculating=len(self._speculations)):
+            for i in range(self.wait_time, 0, -1):
+                if session.paused:
+                    await self.update_status("Paused (ctrl+p to resume)")
+                    await session.checkpoint()
+                await self.update_status(f"Continuing with selected generation in {i}")
+                try:
+                    await asyncio.wait_for(self._override_event.wait(), 1)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+        self._override_event = None
+        if self._override is not None:
+            chosen_idx = self._override
+        self.settle_speculation(chosen_idx)
 
         prompt_input = self.app.query_one("#prompt-input")
         if prompt_input:
             chosen_completion = self.generations[chosen_idx]
-            self.completion_history.append({
-                'prompt': self.original_prompt if not self.completion_history else self.completion_history[-1]['result'],
-                'result': chosen_completion,
-                'score': chosen_score
-            })
+            self.record_round(chosen_idx)
             prompt_input.value = chosen_completion
             self.app.show_input_view()
             return True
         return False
 
-    async def generate(self):
-        """Main generation orchestration"""
+    def select_generation(self, idx: int):
+        """Override the selected generation; only takes effect during the countdown"""
+        if self._override_event is None or not has_successful_generation([self.generations[idx]]):
+            return
+        self._override = idx
+        self._override_event.set()
+
+    def start_speculation(self):
+        """Start next-round generation from the best candidates while the countdown runs"""
+        if not self.speculate or self._params is None:
+            return
+        candidates = [idx for idx, _ in self._scores if has_successful_generation([self.generations[idx]])]
+        for idx in candidates[:self.speculate]:
+            self._speculations[idx] = self.engine.speculate(self.generations[idx], self._params)
+            self.speculation_stats['started'] += 1
+
+    def settle_speculation(self, chosen_idx: int):
+        """Keep the speculative round for the chosen generation and discard the rest"""
+        self._adopted = self._speculations.pop(chosen_idx, None)
+        if self._adopted is not None:
+            self.speculation_stats['adopted'] += 1
+        for idx, speculation in self._speculations.items():
+            cost = speculation.discard()
+            self.speculation_stats['discarded'] += 1
+            self.speculation_stats['wasted_tokens'] += cost['completion_tokens']
+            self.speculation_stats['wasted_scores'] += cost['scores']
+            self.speculation_stats['wasted_seconds'] += cost['seconds']
+            logger.info("Discarded speculative round from generation %d: %d completion tokens, %d scores, %.1fs",
+                        idx + 1, cost['completion_tokens'], cost['scores'], cost['seconds'])
+        self._speculations.clear()
+
+    def speculation_summary(self) -> str:
+        stats = self.speculation_stats
+        if not stats['started']:
+            return ""
+        return (f"speculation: {stats['started']} started, {stats['adopted']} adopted, {stats['discarded']} discarded; "
+                f"wasted {stats['wasted_tokens']} completion tokens, {stats['wasted_scores']} scores, "
+                f"{stats['wasted_seconds']:.1f}s")
+
+    def details_summary(self) -> str:
+        """Speculation, rate limiter and score cache totals for the telemetry overlay"""
+        lines = [self.speculation_summary(), self.generator.service_summary()]
+        return "\n".join(line for line in lines if line)
+
+    def record_round(self, chosen_idx: int):
+        """Add this round's scored generations to the tree and move to the chosen one"""
+        if self.history is None:
+            self.history = NodeStore(self.original_prompt)
+        parent = self.current_node
+        for idx, score in self._scores:
+            node = self.history.add(parent, self.generations[idx], score)
+            if idx == chosen_idx:
+                self.current_node = node
+        self.export_history()
+
+    def export_history(self):
+        """Append nodes added since the last export to LUI_HISTORY_PATH, if set"""
+        if self._history_path and self.history is not None:
+            with open(self._history_path, "a", encoding="utf-8") as f:
+                self._exported_nodes = self.history.export_jsonl(f, self._exported_nodes)
+
+    def generate(self) -> Session:
+        """Start a loom session from the current inputs, cancelling the one already running"""
+        previous = self.session
+        if previous is not None:
+            previous.cancel()
+        self.session = self.scheduler.start(lambda session: self.run_session(session, previous))
+        return self.session
+
+    async def run_session(self, session: Session, previous: Optional[Session] = None):
+        """Play rounds until one fails or the session is cancelled"""
+        if previous is not None:
+            # The cancelled session must stop writing to the widgets before this one starts
+            await asyncio.gather(previous.task, return_exceptions=True)
         try:
-            generations_container = self.app.query_one("#generations")
-            generations_container.remove_children()
+            while True:
+                if session.paused:
+                    await self.update_status("Paused (ctrl+p to resume)")
+                    await session.checkpoint()
+                if not await self.play_round(session):
+                    break
+        finally:
+            self.discard_speculation()
+
+    async def play_round(self, session: Session) -> bool:
+        """Run one round and its countdown; True when the session should continue with another round"""
+        try:
+            self.app.query_one("#generations").reset(0)
             self.app.show_generation_view()
 
             inputs = await self.get_input_values()
@@ -121,23 +232,59 @@ class GenerationManager:
             if not self.original_prompt:
                 self.original_prompt = inputs['prompt']
 
-            if not await self.perform_generation_phase(inputs):
-                return
+            self._stream = inputs['stream']
+            self._params = self.params_from_inputs(inputs)
+            adopted, self._adopted = self._adopted, None
+            if adopted is not None and adopted.prompt == inputs['prompt']:
+                result = await adopted.adopt(self)
+            else:
+                if adopted is not None:
+                    adopted.discard()
+                result = await self.engine.run_round(inputs['prompt'], self._params, self)
+            if result is None:
+                await self.update_status("No successful generations")
+                self.app.show_input_view()
+                return False
 
-            scored_generations = await self.perform_scoring_phase(inputs['classifier_model'])
+            self.generations = result.generations
+            scored_generations = result.scores
+            self._scores = scored_generations
             chosen_idx, chosen_score = await self.display_results(scored_generations)
 
-            if self._status_task:
-                self._status_task.cancel()
-                await asyncio.sleep(0.1)
-
-            if await self.handle_countdown(chosen_idx, chosen_score):
-                await self.generate()
+            return await self.handle_countdown(chosen_idx, chosen_score, session)
 
         except Exception as e:
             if not self.is_closing:
                 await self.update_status(f"Error: {str(e)}")
                 self.app.show_input_view()
+            return False
+
+    async def toggle_pause(self):
+        """Pause the running session at its next round or countdown tick, or resume it"""
+        session = self.session
+        if session is None or session.done:
+            return
+        if session.paused:
+            session.resume()
+            await self.update_status("Resuming")
+        else:
+            session.pause()
+            await self.update_status("Pausing after the current step")
+
+    async def stop(self):
+        """Cancel the running session and return to the input view"""
+        session, self.session = self.session, None
+        if session is not None and not session.done:
+            await self.scheduler.cancel(session.id)
+            await self.update_status("Stopped")
+            self.app.show_input_view()
+
+    def discard_speculation(self):
+        for speculation in list(self._speculations.values()) + [self._adopted]:
+            if speculation is not None:
+                speculation.discard()
+        self._speculations.clear()
+        self._adopted = None
 
     async def close(self):
         """Cleanup resources"""
@@ -146,4 +293,8 @@ class GenerationManager:
         self.is_closing = True
         if self._status_task:
             self._status_task.cancel()
-        await self.generator.close()
\ No newline at end of file
+        await self.scheduler.close()
+        self.discard_speculation()
+        await self.engine.close()
+        await close_transport()
+        get_telemetry().close()
\ No newline at end of file
@@ -0,0 +1,183 @@
+"""Offline throughput benchmark for the lui and tuni hot paths.
+
+Starts a MockServer in-process, points every client at it and measures
+rounds per second, round latency percentiles and requests in flight:
+
+    python -m tests.bench --output bench_results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import time
+from typing import Callable, Dict, List, Optional
+
+from .mock_server import MockConfig, MockServer
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile; 0.0 for no values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def latency_summary(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    return {
+        'rounds': len(latencies),
+        'elapsed_s': elapsed,
+        'rounds_per_s': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50_s': percentile(latencies, 50),
+        'p95_s': percentile(latencies, 95),
+        'p99_s': percentile(latencies, 99),
+    }
+
+
+def point_clients_at(server: MockServer, setenv: Optional[Callable[[str, str], None]] = None):
+    """Route every backend to the mock server; must run before clients are created.
+
+    `setenv` defaults to writing os.environ; tests pass monkeypatch.setenv so the
+    environment is restored afterwards.
+    """
+    setenv = setenv or os.environ.__setitem__
+    setenv("OPENAI_BASE_URL", server.base_url)
+    setenv("HYPERBOLIC_BASE_URL", server.base_url)
+    setenv("LOCAL_LLM_BASE_URL", server.base_url)
+    for name in ("OPENAI_API_KEY", "HYPERBOLIC_API_KEY"):
+        if os.getenv(name) is None:
+            setenv(name, "mock")
+
+
+async def bench_lui(server: MockServer, sessions: int, rounds: int, num_generations: int,
+                    max_tokens: int, stream: bool, model: str = "mock-base") -> Dict[str, float]:
+    """Run `sessions` concurrent loom sessions of `rounds` rounds each against one generation model"""
+    from lui.engine import LoomEngine, LoomParams
+    from lui.models.score_cache import ScoreCache
+
+    engine = LoomEngine()
+    params = LoomParams(model, "mock-classifier", max_tokens=max_tokens,
+                        num_generations=num_generations, stream=stream)
+    # A private cache keeps scores from earlier scenarios out of the measurement
+    engine.generator.get_classifier(params.classifier_model).score_cache = ScoreCache()
+    latencies: List[float] = []
+
+    async def session(prompt: str):
+        for _ in range(rounds):
+            started = time.monotonic()
+            result = await engine.run_round(prompt, params)
+            latencies.append(time.monotonic() - started)
+            if result is None:
+                break
+            prompt = result.chosen_text
+
+    server.stats.reset()
+    started = time.monotonic()
+    await asyncio.gather(*(session(f"Session {i} begins:") for i in range(sessions)))
+    elapsed = time.monotonic() - started
+    await engine.close()
+    return {**latency_summary(latencies, elapsed), **server.stats.summary()}
+
+
+async def bench_tuni(server: MockServer, docs: int, breakpoints: int, completions: int,
+                     request_concurrency: int) -> Dict[str, float]:
+    """Build contrast examples for a synthetic corpus; a round is one breakpoint"""
+    from tuni.hyper_api import HyperBaseClient
+    from tuni.pipeline import CorpusPipeline
+    from tuni.tuner import ContrastContext
+
+    client = HyperBaseClient({'HYPERBOLIC_API_KEY': os.environ["HYPERBOLIC_API_KEY"]})
+    latencies: List[float] = []
+    multi_query = client.multiQuery
+
+    async def timed_multi_query(*args, **kwargs):
+        started = time.monotonic()
+        try:
+            return await multi_query(*args, **kwargs)
+        finally:
+            latencies.append(time.monotonic() - started)
+
+    client.multiQuery = timed_multi_query
+    ctx = ContrastContext(max_tokens=5, breakpoints_per_doc=breakpoints,
+                          ai_completions_per_breakpoint=completions, client=client, seed=0)
+    corpus = [" ".join(f"word{j}" for j in range(200 + i)) for i in range(docs)]
+
+    server.stats.reset()
+    started = time.monotonic()
+    await CorpusPipeline(ctx, request_concurrency=request_concurrency, progress_interval=3600).run(corpus)
+    elapsed = time.monotonic() - started
+    await client.close()
+    return {**latency_summary(latencies, elapsed), **server.stats.summary()}
+
+
+async def run_benchmarks(args: argparse.Namespace,
+                         setenv: Optional[Callable[[str, str], None]] = None) -> Dict[str, dict]:
+    server = MockServer(MockConfig(
+        latency=args.latency,
+        token_delay=args.token_delay,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+    ))
+    await server.start()
+    point_clients_at(server, setenv)
+
+    from lui.models.transport import close_transport
+    from lui.telemetry import get_telemetry
+    try:
+        results = {}
+        for model in args.models:
+            # Models are named "<backend>:<model>" to compare backends side by side
+            suffix = "" if len(args.models) == 1 else f"[{model}]"
+            for stream in (False, True):
+                name = f"lui_{'stream' if stream else 'batch'}{suffix}"
+                results[name] = await bench_lui(server, args.sessions, args.rounds, args.num_generations,
+                                                args.max_tokens, stream=stream, model=model)
+        results['tuni'] = await bench_tuni(server, args.docs, args.breakpoints, args.num_generations, args.request_concurrency)
+        return results
+    finally:
+        await close_transport()
+        await server.stop()
+        get_telemetry().close()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark against a mock backend")
+    parser.add_argument("-o", "--output", default="bench_results.json")
+    parser.add_argument("--models", nargs="+", default=["mock-base"],
+                        help="Generation models to benchmark, e.g. hyperbolic:mock-base local:mock-base")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--num-generations", type=int, default=5)
+    parser.add_argument("--max-tokens", type=int, default=20)
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--breakpoints", type=int, default=3)
+    parser.add_argument("--request-concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.002)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None, setenv: Optional[Callable[[str, str], None]] = None):
+    args = parse_args(argv)
+    results = asyncio.run(run_benchmarks(args, setenv))
+    report = {
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'config': vars(args),
+        'results': results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    for name, result in results.items():
+        print(f"{name}: {result['rounds_per_s']:.2f} rounds/s, p50 {result['p50_s']:.3f}s, "
+              f"p95 {result['p95_s']:.3f}s, p99 {result['p99_s']:.3f}s, max in flight {result['max_in_flight']}")
+    print(f"Results written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
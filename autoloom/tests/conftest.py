@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def isolated_clients(monkeypatch):
+    """Fresh process-wide clients for one test; closed and restored on teardown.
+
+    Yields monkeypatch so the test can route backends with monkeypatch.setenv.
+    """
+    from lui import telemetry
+    from lui.models import backends, hedging, prefix, rate_limiter, resilience, score_cache, splitting, transport
+
+    monkeypatch.setattr(transport, "_transport", None)
+    monkeypatch.setattr(telemetry, "_telemetry", None)
+    monkeypatch.setattr(score_cache, "_score_cache", None)
+    monkeypatch.setattr(hedging, "_hedger", None)
+    monkeypatch.setattr(splitting, "_splitter", None)
+    monkeypatch.setattr(backends, "_registry", None)
+    monkeypatch.setattr(prefix, "_router", None)
+    monkeypatch.setattr(rate_limiter, "_shared_limiters", {})
+    monkeypatch.setattr(resilience, "_breakers", {})
+    yield monkeypatch
+
+    if transport._transport is not None:
+        asyncio.run(transport.close_transport())
+    if score_cache._score_cache is not None:
+        score_cache._score_cache.close()
+    if telemetry._telemetry is not None:
+        telemetry._telemetry.close()
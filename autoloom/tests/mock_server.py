@@ -0,0 +1,213 @@
+"""Offline stand-in for the OpenAI/Hyperbolic completions and chat-completions endpoints.
+
+Run standalone with `python -m tests.mock_server --port 8900`, then point the
+clients at it with OPENAI_BASE_URL / HYPERBOLIC_BASE_URL=http://127.0.0.1:8900/v1.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from aiohttp import web
+
+WORDS = ["the", "loom", "weaves", "a", "thread", "through", "latent", "space", "and", "light"]
+
+
+class MockConfig:
+    """Latency and failure behaviour of the mock server"""
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, token_delay: float = 0.002,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after: float = 0.1,
+                 seed: int = 0):
+        self.latency = latency          # seconds before the first byte
+        self.jitter = jitter            # uniform +/- added to latency
+        self.token_delay = token_delay  # seconds per streamed token
+        self.error_rate = error_rate    # fraction of requests answered with 500
+        self.rate_limit_rate = rate_limit_rate  # fraction answered with 429
+        self.retry_after = retry_after  # Retry-After sent with 429s
+        self.rng = random.Random(seed)
+
+
+class MockStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._in_flight_area = 0.0
+        self._last_change = time.monotonic()
+        self._started = self._last_change
+
+    def _account(self):
+        now = time.monotonic()
+        self._in_flight_area += self.in_flight * (now - self._last_change)
+        self._last_change = now
+
+    def enter(self):
+        self._account()
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def leave(self):
+        self._account()
+        self.in_flight -= 1
+
+    def reset(self):
+        self.__init__()
+
+    def summary(self) -> dict:
+        self._account()
+        elapsed = self._last_change - self._started
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'rate_limited': self.rate_limited,
+            'max_in_flight': self.max_in_flight,
+            'avg_in_flight': self._in_flight_area / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+class MockServer:
+    def __init__(self, config: MockConfig = None):
+        self.config = config or MockConfig()
+        self.stats = MockStats()
+        self.app = web.Application()
+        self.app.router.add_post("/v1/completions", self.completions)
+        self.app.router.add_post("/v1/chat/completions", self.chat_completions)
+        self._runner = None
+        self.port = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    async def start(self, port: int = 0):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _text(self, tokens: int) -> str:
+        return "".join(" " + self.config.rng.choice(WORDS) for _ in range(tokens))
+
+    async def _delay(self):
+        latency = self.config.latency + self.config.rng.uniform(-self.config.jitter, self.config.jitter)
+        await asyncio.sleep(max(latency, 0.0))
+
+    def _failure(self):
+        """A 429 or 500 response for this request, or None"""
+        roll = self.config.rng.random()
+        if roll < self.config.rate_limit_rate:
+            self.stats.rate_limited += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                status=429,
+                headers={"Retry-After": str(self.config.retry_after)}
+            )
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self.stats.errors += 1
+            return web.json_response({"error": {"message": "Internal error", "type": "server_error"}}, status=500)
+        return None
+
+    async def completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        n = body.get("n", 1)
+        max_tokens = body.get("max_tokens", 16)
+        self.stats.enter()
+        try:
+            await self._delay()
+            failure = self._failure()
+            if failure is not None:
+                return failure
+
+            if not body.get("stream"):
+                await asyncio.sleep(self.config.token_delay * max_tokens)
+                return web.json_response({
+                    "object": "text_completion",
+                    "model": body.get("model"),
+                    "choices": [{"index": i, "text": self._text(max_tokens), "finish_reason": "length"} for i in range(n)],
+                    "usage": {"prompt_tokens": len(body.get("prompt", "").split()), "completion_tokens": n * max_tokens},
+                })
+
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for step in range(max_tokens):
+                await asyncio.sleep(self.config.token_delay)
+                for i in range(n):
+                    chunk = {"choices": [{
+                        "index": i,
+                        "text": self._text(1),
+                        "finish_reason": "length" if step == max_tokens - 1 else None,
+                    }]}
+                    await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            await response.write(b"data: [DONE]\n\n")
+            return response
+        finally:
+            self.stats.leave()
+
+    async def chat_completions(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.stats.enter()
+        try:
+            await self._delay()
+            failure = self._failure()
+            if failure is not None:
+                return failure
+            if body.get("response_format", {}).get("type") == "json_object":
+                # Batched scoring: one score per text in the user message's "texts" list
+                texts = json.loads(body["messages"][-1]["content"]).get("texts", [])
+                content = json.dumps({"scores": [self.config.rng.randint(0, 100) for _ in texts]})
+            else:
+                content = str(self.config.rng.randint(0, 100))
+            choice = {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+            if body.get("logprobs"):
+                # Spread the probability over a few scores around the sampled one
+                center = int(content)
+                tokens = [str(max(0, min(100, center + offset))) for offset in (0, -10, 10, -20, 20)]
+                weights = [0.5, 0.2, 0.15, 0.1, 0.05]
+                choice["logprobs"] = {"content": [{
+                    "token": tokens[0],
+                    "logprob": math.log(weights[0]),
+                    "top_logprobs": [{"token": token, "logprob": math.log(weight)}
+                                     for token, weight in zip(tokens, weights)][:body.get("top_logprobs", 5)],
+                }]}
+            return web.json_response({
+                "object": "chat.completion",
+                "model": body.get("model"),
+                "choices": [choice],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 1},
+            })
+        finally:
+            self.stats.leave()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the mock completions server")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--token-delay", type=float, default=0.002)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockServer(MockConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        token_delay=args.token_delay,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+    ))
+    web.run_app(server.app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+from lui.models.backends import default_registry
+from lui.models.prefix import pick_server
+
+
+def registry_without_local(monkeypatch):
+    monkeypatch.delenv("LOCAL_LLM_BASE_URL", raising=False)
+    return default_registry()
+
+
+def test_resolve_explicit_backend_prefix(isolated_clients):
+    registry = registry_without_local(isolated_clients)
+
+    backend, model = registry.resolve("openai:meta-llama/Meta-Llama-3.1-405B")
+    assert (backend.name, model) == ("openai", "meta-llama/Meta-Llama-3.1-405B")
+    backend, model = registry.resolve("hyperbolic:gpt-4-base")
+    assert (backend.name, model) == ("hyperbolic", "gpt-4-base")
+
+
+def test_resolve_listed_prefixed_and_default_models(isolated_clients):
+    registry = registry_without_local(isolated_clients)
+
+    assert registry.resolve("gpt-4-base")[0].name == "openai"
+    # Unlisted models claimed by a prefix
+    assert registry.resolve("gpt-5-base")[0].name == "openai"
+    assert registry.resolve("meta-llama/Meta-Llama-3.1-405B")[0].name == "hyperbolic"
+    # Anything else goes to the default backend, unchanged
+    backend, model = registry.resolve("mistral-7b")
+    assert (backend.name, model) == ("hyperbolic", "mistral-7b")
+    # A colon that does not name a backend is part of the model name
+    backend, model = registry.resolve("org:model")
+    assert (backend.name, model) == ("hyperbolic", "org:model")
+
+
+def test_local_backend_from_environment(isolated_clients):
+    isolated_clients.setenv("LOCAL_LLM_BASE_URL", "http://a:8000/v1, http://b:8000/v1/,")
+    isolated_clients.setenv("LOCAL_LLM_MODELS", "llama-3-8b, qwen")
+    isolated_clients.setenv("LOCAL_LLM_MAX_N", "8")
+    registry = default_registry()
+
+    backend, model = registry.resolve("qwen")
+    assert (backend.name, model) == ("local", "qwen")
+    assert registry.resolve("local:other")[0] is backend
+    assert backend.max_n == 8
+    assert backend.servers == ["http://a:8000/v1", "http://b:8000/v1"]
+    assert ("qwen (local)", "qwen") in registry.generation_models()
+
+
+def test_local_replica_follows_prompt_prefix(isolated_clients):
+    isolated_clients.setenv("LOCAL_LLM_BASE_URL", "http://a:8000/v1,http://b:8000/v1,http://c:8000/v1")
+    isolated_clients.setenv("PREFIX_AFFINITY_CHARS", "16")
+    backend, _ = default_registry().resolve("local:model")
+
+    prompts = [f"Story {i:02d} opens: and then" for i in range(30)]
+    urls = [backend.completions_url_for(prompt) for prompt in prompts]
+    # Each prompt goes to the replica its first 16 characters hash to
+    assert urls == [f"{pick_server(backend.servers, prompt[:16])}/completions" for prompt in prompts]
+    assert len(set(urls)) > 1
+    # Prompts that share the affinity prefix share a replica
+    assert backend.completions_url_for(prompts[0] + " much later") == urls[0]
@@ -0,0 +1,24 @@
+import asyncio
+import json
+
+from lui import batch
+from lui.engine import LoomEngine, LoomParams
+
+
+def test_failed_session_is_recorded_and_batch_continues(tmp_path, monkeypatch):
+    async def run_session(self, prompt, params, rounds, session=None):
+        if prompt == "bad":
+            raise RuntimeError("backend exploded")
+        await asyncio.sleep(0.01)
+        return []
+
+    monkeypatch.setattr(LoomEngine, "run_session", run_session)
+    output = tmp_path / "results.jsonl"
+    asyncio.run(batch.run_batch(["good", "bad", "also good"], LoomParams("mock-base", "mock-classifier"),
+                                rounds=1, concurrency=2, output_path=output))
+
+    records = {record['original_prompt']: record
+               for record in map(json.loads, output.read_text().splitlines())}
+    assert set(records) == {"good", "bad", "also good"}
+    assert records["bad"]["error"] == "RuntimeError: backend exploded"
+    assert records["good"]["rounds"] == [] and "error" not in records["good"]
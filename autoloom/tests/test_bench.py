@@ -0,0 +1,25 @@
+import json
+
+from tests import bench
+
+
+def test_benchmark_runs_offline(tmp_path, isolated_clients):
+    output = tmp_path / "bench_results.json"
+    bench.main([
+        "--output", str(output),
+        "--sessions", "2",
+        "--rounds", "2",
+        "--num-generations", "3",
+        "--max-tokens", "4",
+        "--docs", "3",
+        "--latency", "0.01",
+        "--token-delay", "0.0",
+    ], setenv=isolated_clients.setenv)
+
+    results = json.loads(output.read_text())["results"]
+    assert results["lui_batch"]["rounds"] == 4
+    assert results["lui_stream"]["rounds"] == 4
+    assert results["tuni"]["rounds"] == 9
+    for result in results.values():
+        assert result["p50_s"] <= result["p95_s"] <= result["p99_s"]
+        assert result["max_in_flight"] >= 1
@@ -0,0 +1,65 @@
+import asyncio
+
+from lui.models.cascade import PrefilteredClassifier
+from lui.models.classifier import rank_scores
+
+
+class TableScorer:
+    """Scores texts from a table and records every batch it was asked to score"""
+    def __init__(self, model, table):
+        self.model = model
+        self.table = table
+        self.batches = []
+        self.prefixes = []
+
+    async def classify_batch(self, texts, callback=None, prefix=""):
+        self.batches.append(list(texts))
+        self.prefixes.append(prefix)
+        scores = [(idx, self.table[text]) for idx, text in enumerate(texts)]
+        if callback:
+            for idx, score in scores:
+                await callback(idx, score)
+        return rank_scores(scores)
+
+    async def close(self):
+        pass
+
+
+def test_select_keeps_top_fraction_close_calls_and_unscored():
+    cascade = PrefilteredClassifier(TableScorer("cheap", {}), TableScorer("judge", {}), keep_fraction=0.25, margin=5)
+    cheap = [(3, 90.0), (0, 70.0), (4, 67.0), (1, 40.0), (5, None), (2, None)]
+
+    judged, settled = cascade.select(cheap)
+    # ceil(0.25 * 4 scored) = 1 kept, and 70 is not within 5 points of it; unscored are always judged
+    assert judged == [3, 5, 2]
+    assert settled == [(0, 70.0), (4, 67.0), (1, 40.0)]
+
+    cascade.margin = 25
+    judged, settled = cascade.select(cheap)
+    assert judged == [3, 0, 4, 5, 2]
+    assert settled == [(1, 40.0)]
+    assert cascade.stats.close_calls == 2
+
+
+def test_only_top_candidates_reach_the_judge():
+    texts = ["t0", "t1", "t2", "t3", "t4"]
+    prefilter = TableScorer("cheap", {"t0": 10, "t1": 80, "t2": 50, "t3": 90, "t4": 20})
+    judge = TableScorer("judge", {"t1": 95, "t2": 60, "t3": 30})
+    cascade = PrefilteredClassifier(prefilter, judge, keep_fraction=0.5)
+    calls = []
+
+    async def callback(idx, score):
+        calls.append((idx, score))
+
+    ranked = asyncio.run(cascade.classify_batch(texts, callback, prefix="Once"))
+
+    # ceil(0.5 * 5) = 3 best cheap scores go to the judge, in cheap rank order
+    assert judge.batches == [["t3", "t1", "t2"]]
+    assert judge.prefixes == prefilter.prefixes == ["Once"]
+    # Judge scores are mapped back to the caller's indices and ranked first
+    assert ranked == [(1, 95), (2, 60), (3, 30), (4, 20), (0, 10)]
+    assert sorted(calls) == sorted(ranked)
+
+    summary = cascade.stats.summary()
+    assert summary['candidates'] == 5 and summary['judged'] == 3
+    assert summary['judge_calls_saved'] == 2
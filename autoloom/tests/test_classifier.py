@@ -0,0 +1,142 @@
+import asyncio
+import math
+
+from lui.models.classifier import Classifier, logprob_score, parse_batch_scores
+from lui.models.score_cache import ScoreCache
+
+
+def make_classifier(monkeypatch, delay=0.05):
+    classifier = Classifier(score_cache=ScoreCache(), scoring="digits", batch_size=1)
+    calls = []
+
+    async def request_score(text):
+        calls.append(text)
+        await asyncio.sleep(delay)
+        return 42
+
+    monkeypatch.setattr(classifier, "_request_score", request_score)
+    return classifier, calls
+
+
+def test_identical_texts_share_one_request(monkeypatch):
+    classifier, calls = make_classifier(monkeypatch)
+
+    async def run():
+        return await asyncio.gather(*(classifier.classify_one("same") for _ in range(3)))
+
+    assert asyncio.run(run()) == [42, 42, 42]
+    assert calls == ["same"]
+
+
+def test_cancelled_caller_does_not_cancel_waiters(monkeypatch):
+    classifier, calls = make_classifier(monkeypatch)
+
+    async def run():
+        first = asyncio.ensure_future(classifier.classify_one("same"))
+        second = asyncio.ensure_future(classifier.classify_one("same"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == 42
+    assert calls == ["same"]
+
+
+def test_parse_batch_scores():
+    assert parse_batch_scores('{"scores": [10, 95, 50]}', 3) == [10, 95, 50]
+    # Out-of-range numbers are clamped, numeric strings accepted
+    assert parse_batch_scores('{"scores": [-5, "120", 7.9]}', 3) == [0, 100, 7]
+    assert parse_batch_scores('{"scores": [10, 95]}', 3) is None
+    assert parse_batch_scores('{"scores": "10"}', 1) is None
+    assert parse_batch_scores('{"score": [10]}', 1) is None
+    assert parse_batch_scores('[10]', 1) is None
+    assert parse_batch_scores('10, 95', 2) is None
+    assert parse_batch_scores('{"scores": ["high"]}', 1) is None
+
+
+def test_logprob_score_yes_no():
+    candidates = [
+        {"token": " Yes", "logprob": math.log(0.6)},
+        {"token": "N", "logprob": math.log(0.2)},
+        {"token": "maybe", "logprob": math.log(0.2)},
+    ]
+    assert logprob_score(candidates) == 75.0
+
+
+def test_logprob_score_numeric():
+    candidates = [
+        {"token": "80", "logprob": math.log(0.5)},
+        {"token": "60", "logprob": math.log(0.5)},
+        {"token": "250", "logprob": math.log(0.1)},
+    ]
+    assert logprob_score(candidates) == 70.0
+
+
+def test_logprob_score_without_labels():
+    assert logprob_score([{"token": "hello", "logprob": -0.1}]) is None
+    assert logprob_score([]) is None
+
+
+def test_batched_scores_are_cached_apart_from_single_scores(monkeypatch):
+    cache = ScoreCache()
+    batched = Classifier(score_cache=cache, scoring="digits", batch_size=2, batch_window=0.01)
+
+    async def request_scores(texts):
+        return [70 + idx for idx in range(len(texts))]
+
+    monkeypatch.setattr(batched, "_request_scores", request_scores)
+
+    async def run():
+        return await asyncio.gather(batched.classify_one("a"), batched.classify_one("b"))
+
+    assert asyncio.run(run()) == [70, 71]
+    assert asyncio.run(batched.classify_one("a")) == 70
+    assert cache.summary()['hits'] == 1
+
+    single, calls = make_classifier(monkeypatch)
+    single.score_cache = cache
+    assert asyncio.run(single.classify_one("a")) == 42
+    assert calls == ["a"]
+
+
+def test_logprob_mode_asks_in_tuni_format(monkeypatch):
+    from lui.models.local_classifier import SUFFIX_PATTERN
+    from tuni.tuner import ContrastContext, get_system_message, get_user_message
+
+    classifier = Classifier(score_cache=ScoreCache(), scoring="logprob")
+    sent = []
+
+    async def post(data, tokens, hedge_key):
+        sent.append(data["messages"])
+        logprobs = [{"token": "Y", "logprob": math.log(0.75)}, {"token": "N", "logprob": math.log(0.25)}]
+        return {"choices": [{"logprobs": {"content": [{"top_logprobs": logprobs}]}}]}
+
+    monkeypatch.setattr(classifier, "_post", post)
+    assert asyncio.run(classifier.classify_one(" the end.", prefix="  Once upon a time")) == 75.0
+
+    ctx = ContrastContext(max_tokens=5, breakpoints_per_doc=1, ai_completions_per_breakpoint=5, client=None)
+    assert sent[0] == [get_system_message(), get_user_message(ctx, "Once upon a time", " the end.")]
+    assert SUFFIX_PATTERN.search(sent[0][1]["content"]).group(1) == " the end."
+    # The prefix is part of the cache key
+    assert asyncio.run(classifier.classify_one(" the end.", prefix="Another story")) == 75.0
+    assert len(sent) == 2
+
+
+def test_classify_batch_pairs_scores_with_their_texts(monkeypatch):
+    classifier = Classifier(score_cache=ScoreCache(), scoring="digits", batch_size=1)
+
+    async def request_score(text):
+        # Later texts finish first
+        await asyncio.sleep(0.01 * (5 - int(text)))
+        return int(text) * 10
+
+    monkeypatch.setattr(classifier, "_request_score", request_score)
+    reported = []
+
+    async def callback(idx, score):
+        reported.append((idx, score))
+
+    ranked = asyncio.run(classifier.classify_batch(["1", "4", "2", "3"], callback))
+    assert ranked == [(1, 40), (3, 30), (2, 20), (0, 10)]
+    assert sorted(reported) == [(0, 10), (1, 40), (2, 20), (3, 30)]
+    assert [idx for idx, _ in reported] == [1, 3, 2, 0]
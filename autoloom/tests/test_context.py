@@ -0,0 +1,28 @@
+import asyncio
+
+from lui.models.context import ChatSummarizer
+from lui.models.rate_limiter import RateLimiter
+from lui.models.transport import close_transport
+from tests.mock_server import MockConfig, MockServer
+
+
+def test_summarizer_retries_rate_limited_requests(monkeypatch):
+    async def run():
+        server = MockServer(MockConfig(latency=0.0, jitter=0.0, rate_limit_rate=0.5, retry_after=0.0, seed=1))
+        await server.start()
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        limiter = RateLimiter(max_concurrency=1)
+        summarizer = ChatSummarizer(rate_limiter=limiter)
+        summarizer.retry_policy.base_delay = 0.01
+        try:
+            summaries = [await summarizer(f"A long story, part {idx}.", 16) for idx in range(4)]
+        finally:
+            await close_transport()
+            await server.stop()
+        return summaries, server.stats.summary(), limiter.stats.summary()
+
+    summaries, server_stats, limiter_stats = asyncio.run(run())
+    assert all(summary.endswith("\n\n") for summary in summaries)
+    assert server_stats["rate_limited"] > 0
+    # Every attempt, retries included, went through the rate limiter
+    assert limiter_stats["requests"] == server_stats["requests"]
@@ -0,0 +1,96 @@
+import asyncio
+
+from lui.engine import LoomListener, LoomParams, RoundResult, SpeculativeRound
+from lui.models.context import get_token_counter
+
+
+class GatedEngine:
+    """Streams two tokens and a score, then holds the round open until `release` is set"""
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.streamed = asyncio.Event()
+
+    async def run_round(self, prompt, params, listener):
+        await listener.on_round_start(prompt, 2)
+        await listener.on_token(0, " hello")
+        await listener.on_token(1, " brave new world")
+        await listener.on_score(0, 70)
+        self.streamed.set()
+        await self.release.wait()
+        await listener.on_score(1, 40)
+        return RoundResult(prompt, [" hello", " brave new world"], [(0, 70), (1, 40)])
+
+
+class RecordingListener(LoomListener):
+    def __init__(self):
+        self.events = []
+
+    async def on_round_start(self, prompt, num_generations):
+        self.events.append(("on_round_start", prompt, num_generations))
+
+    async def on_token(self, idx, text):
+        self.events.append(("on_token", idx, text))
+
+    async def on_score(self, idx, score):
+        self.events.append(("on_score", idx, score))
+
+
+PARAMS = LoomParams("mock-base", "mock-classifier")
+
+
+def test_adopt_replays_buffered_progress_then_forwards_live(isolated_clients):
+    async def main():
+        engine = GatedEngine()
+        round_ = SpeculativeRound(engine, "Once", PARAMS)
+        await engine.streamed.wait()
+
+        listener = RecordingListener()
+        adopted = asyncio.ensure_future(round_.adopt(listener))
+        await asyncio.sleep(0)
+        # Everything buffered so far reaches the listener in order, before the round finishes
+        assert listener.events == [
+            ("on_round_start", "Once", 2),
+            ("on_token", 0, " hello"),
+            ("on_token", 1, " brave new world"),
+            ("on_score", 0, 70),
+        ]
+        engine.release.set()
+        result = await adopted
+        return listener, result
+
+    listener, result = asyncio.run(main())
+    assert listener.events[-1] == ("on_score", 1, 40)
+    assert len(listener.events) == 5
+    assert result.chosen_text == " hello"
+
+
+def test_adopt_after_finish_returns_result_without_replay(isolated_clients):
+    async def main():
+        engine = GatedEngine()
+        engine.release.set()
+        round_ = SpeculativeRound(engine, "Once", PARAMS)
+        await asyncio.wait_for(asyncio.shield(round_.task), 1)
+        listener = RecordingListener()
+        return listener, await round_.adopt(listener)
+
+    listener, result = asyncio.run(main())
+    assert listener.events == []
+    assert result.scores == [(0, 70), (1, 40)]
+
+
+def test_discard_cancels_and_reports_what_was_spent(isolated_clients):
+    async def main():
+        engine = GatedEngine()
+        round_ = SpeculativeRound(engine, "Once", PARAMS)
+        await engine.streamed.wait()
+        cost = round_.discard()
+        await asyncio.gather(round_.task, return_exceptions=True)
+        return round_, cost
+
+    round_, cost = asyncio.run(main())
+    counter = get_token_counter(PARAMS.generation_model)
+    assert round_.task.cancelled()
+    assert cost['completion_tokens'] == counter.count(" hello") + counter.count(" brave new world")
+    assert cost['scores'] == 1
+    assert cost['seconds'] >= 0
+
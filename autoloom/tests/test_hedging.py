@@ -0,0 +1,97 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from lui.models.hedging import Hedger
+from lui.models.resilience import RetryPolicy
+
+
+def make_hedger(latency=0.05):
+    hedger = Hedger(enabled=True, min_samples=1, max_hedge_fraction=1.0, min_delay=0.01)
+    asyncio.run(hedger.run("key", lambda: asyncio.sleep(latency)))
+    return hedger
+
+
+def test_queue_time_does_not_trigger_hedge():
+    hedger = make_hedger()
+
+    @asynccontextmanager
+    async def queued():
+        await asyncio.sleep(0.2)
+        yield
+
+    async def request():
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    policy = RetryPolicy(max_attempts=1)
+    assert asyncio.run(policy.call("http://hedge.test", lambda: hedger.run("key", request, admit=queued),
+                                   admit=queued)) == "ok"
+    assert hedger.hedged == 0
+    assert max(hedger._trackers["key"].samples) < 0.2
+
+
+def test_slow_request_is_hedged():
+    hedger = make_hedger()
+    calls = []
+
+    async def request():
+        calls.append(1)
+        await asyncio.sleep(1.0 if len(calls) == 1 else 0.01)
+        return len(calls)
+
+    assert asyncio.run(hedger.run("key", request)) == 2
+    assert hedger.hedged == 1 and hedger.hedge_wins == 1
+
+
+def test_losing_result_is_discarded():
+    hedger = make_hedger()
+    discarded = []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def request():
+            await release.wait()
+            return "opened"
+
+        asyncio.get_running_loop().call_later(0.2, release.set)
+        return await hedger.run("key", request, discard=discarded.append)
+
+    assert asyncio.run(run()) == "opened"
+    assert discarded == ["opened"]
+
+
+def test_cancelled_attempt_loses_to_the_other():
+    hedger = make_hedger()
+    calls = []
+
+    async def request():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(0.2)
+            raise asyncio.CancelledError()
+        await asyncio.sleep(0.3)
+        return "hedge"
+
+    assert asyncio.run(hedger.run("key", request)) == "hedge"
+    assert hedger.hedge_wins == 1
+
+
+def test_error_is_raised_when_the_other_attempt_was_cancelled():
+    hedger = make_hedger()
+    calls = []
+
+    async def request():
+        calls.append(1)
+        attempt = len(calls)
+        await asyncio.sleep(0.2)
+        if attempt == 1:
+            raise ValueError("primary failed")
+        raise asyncio.CancelledError()
+
+    try:
+        asyncio.run(hedger.run("key", request))
+    except ValueError as e:
+        assert str(e) == "primary failed"
+    else:
+        raise AssertionError("expected the primary's error")
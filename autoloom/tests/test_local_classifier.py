@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from lui.models.local_classifier import LocalClassifier, NgramModel, featurize
+
+HUMAN = [
+    "the rain kept falling on the old tin roof all night",
+    "she laughed and spilled her coffee across the letters",
+    "we walked home the long way past the river",
+    "my grandfather kept bees behind the shed",
+]
+AI = [
+    "as an ai language model i cannot browse the internet",
+    "in conclusion it is important to note the key points",
+    "it is important to note that there are many factors",
+    "as a language model i do not have personal opinions",
+]
+
+
+def test_featurize_rows_are_unit_length():
+    rows, columns, values = featurize(["a b a", "", "c"], dims=64)
+
+    assert rows.tolist() == sorted(rows.tolist())
+    assert set(rows.tolist()) == {0, 2}  # the empty text has no features
+    assert ((columns >= 0) & (columns < 64)).all()
+    norms = np.bincount(rows, weights=values ** 2, minlength=3)
+    assert norms.tolist() == pytest.approx([1.0, 0.0, 1.0])
+
+
+def test_train_predict_round_trip(tmp_path):
+    model = NgramModel.train(HUMAN + AI, [1] * len(HUMAN) + [0] * len(AI), dims=2 ** 12)
+    probabilities = model.predict(HUMAN + AI)
+
+    assert probabilities.shape == (len(HUMAN) + len(AI),)
+    assert (probabilities[:len(HUMAN)] > 0.5).all()
+    assert (probabilities[len(HUMAN):] < 0.5).all()
+
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    loaded = NgramModel.load(path)
+    assert loaded.dims == model.dims and loaded.ngram == model.ngram
+    assert loaded.predict(HUMAN + AI) == pytest.approx(probabilities, abs=1e-6)
+
+
+def test_predict_empty_text_and_empty_batch():
+    model = NgramModel.train(HUMAN + AI, [1] * len(HUMAN) + [0] * len(AI), dims=2 ** 12)
+
+    # No features leaves only the bias
+    empty = model.predict(["", HUMAN[0]])
+    assert empty[0] == pytest.approx(1 / (1 + np.exp(-model.bias)))
+    assert empty[1] == pytest.approx(model.predict([HUMAN[0]])[0])
+    assert model.predict([]).shape == (0,)
+
+
+def test_local_classifier_ranks_batch():
+    model = NgramModel.train(HUMAN + AI, [1] * len(HUMAN) + [0] * len(AI), dims=2 ** 12)
+    classifier = LocalClassifier("local:test", model)
+    texts = [AI[0], HUMAN[0]]
+    seen = []
+
+    async def callback(idx, score):
+        seen.append(idx)
+
+    ranked = asyncio.run(classifier.classify_batch(texts, callback))
+    assert [idx for idx, _ in ranked] == [1, 0]
+    assert all(0 <= score <= 100 for _, score in ranked)
+    assert seen == [0, 1]
+    assert asyncio.run(classifier.classify_batch([])) == []
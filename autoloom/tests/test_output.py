@@ -0,0 +1,52 @@
+import json
+
+from tuni.output import CheckpointManifest, ExampleWriter, manifest_path, shard_paths
+
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_manifest_skips_partial_last_line(tmp_path):
+    path = tmp_path / "out.checkpoint.jsonl"
+    path.write_text('{"doc": "ab", "breakpoint": 3}\n{"doc": "ab", "brea')
+    manifest = CheckpointManifest(path)
+    assert manifest.is_done("ab", 3)
+    assert not manifest.is_done("ab", 4)
+    manifest.close()
+
+
+def test_resume_skips_flushed_breakpoints(tmp_path):
+    output = tmp_path / "examples.jsonl"
+    writer = ExampleWriter(output, buffer_size=2)
+    writer.add("0a", 5, [{"text": "first"}])
+    writer.add("0a", 9, [{"text": "second"}])
+    # Buffered but never flushed, as if the run were killed here
+    writer.add("0b", 2, [{"text": "lost"}])
+    writer._files[0].close()
+    writer.manifest.close()
+
+    resumed = ExampleWriter(output, buffer_size=2, resume=True)
+    assert resumed.is_done("0a", 5) and resumed.is_done("0a", 9)
+    assert not resumed.is_done("0b", 2)
+    resumed.add("0b", 2, [{"text": "redone"}])
+    resumed.close()
+    assert [example["text"] for example in read_lines(output)] == ["first", "second", "redone"]
+
+    fresh = ExampleWriter(output)
+    assert not fresh.is_done("0a", 5)
+    fresh.close()
+    assert output.read_text() == ""
+
+
+def test_sharded_output(tmp_path):
+    output = tmp_path / "examples.jsonl"
+    writer = ExampleWriter(output, shards=2, buffer_size=1)
+    writer.add("00", 1, [{"text": "even"}])
+    writer.add("01", 1, [{"text": "odd"}])
+    writer.close()
+    paths = shard_paths(output, 2)
+    assert [path.name for path in paths] == ["examples-000.jsonl", "examples-001.jsonl"]
+    assert read_lines(paths[0]) == [{"text": "even"}]
+    assert read_lines(paths[1]) == [{"text": "odd"}]
+    assert len(read_lines(manifest_path(output))) == 2
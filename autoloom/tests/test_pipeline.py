@@ -0,0 +1,33 @@
+import asyncio
+
+from tuni.client_types import BaseClient
+from tuni.pipeline import CorpusPipeline
+from tuni.tuner import ContrastContext
+
+
+class StubClient(BaseClient):
+    model = ""
+
+    async def multiQuery(self, prefix, max_tokens, n, stop=None):
+        await asyncio.sleep(0)
+        return ["an AI suffix"] * n
+
+
+def test_pipeline_streams_documents_and_releases_them():
+    ctx = ContrastContext(max_tokens=2, breakpoints_per_doc=2, ai_completions_per_breakpoint=3,
+                          client=StubClient(), seed=0)
+    read = []
+
+    def docs():
+        for idx in range(5):
+            read.append(idx)
+            yield f"Document number {idx} has a few words in it. " * 3
+
+    pipeline = CorpusPipeline(ctx, doc_concurrency=2, queue_size=1, progress_interval=60)
+    examples = asyncio.run(pipeline.run(docs(), docs_total=5))
+
+    assert read == [0, 1, 2, 3, 4]
+    assert len(examples) == 5 * 2 * (1 + 3)
+    assert pipeline.progress.docs_done == 5
+    # Each document is dropped from the tokenization cache once its examples are out
+    assert len(ctx.preprocessor._cache) == 0
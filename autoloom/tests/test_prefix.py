@@ -0,0 +1,30 @@
+import asyncio
+
+from lui.models.prefix import PrefixRouter, pick_server
+
+
+def test_pick_server_is_stable():
+    servers = ["http://a", "http://b", "http://c"]
+    assert pick_server(servers, "prompt") == pick_server(list(reversed(servers)), "prompt")
+    assert pick_server(["http://a"], "prompt") == "http://a"
+
+
+def test_cancelled_caller_does_not_cancel_coalesced_request():
+    router = PrefixRouter()
+    calls = []
+
+    async def request():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(router.coalesce("key", request))
+        second = asyncio.ensure_future(router.coalesce("key", request))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+    assert calls == [1]
+    assert router.summary() == {'requests': 2, 'coalesced': 1}
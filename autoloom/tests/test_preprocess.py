@@ -0,0 +1,66 @@
+import pytest
+
+from tuni import preprocess
+from tuni.preprocess import PreparedDoc, Preprocessor, token_boundaries
+from tuni.tuner import ContrastContext, get_breakpoints
+
+TEXT = "Hi there. You ok? Yes."
+
+
+@pytest.fixture(params=["numpy", "lists"])
+def backend(request, monkeypatch):
+    if request.param == "lists":
+        monkeypatch.setattr(preprocess, "np", None)
+    elif preprocess.np is None:
+        pytest.skip("NumPy is not installed")
+    return request.param
+
+
+def test_token_boundaries(backend):
+    offsets, sentence_starts = token_boundaries(TEXT, "")
+    assert list(offsets) == [0, 2, 8, 9, 13, 16, 17, 21, 22]
+    assert list(sentence_starts) == [3, 6]
+
+
+def test_prepared_doc_lookups(backend):
+    prepared = PreparedDoc(TEXT, *token_boundaries(TEXT, ""))
+    assert prepared.n_tokens == 8
+    assert prepared.char_offset(3) == 9
+    assert prepared.char_offset(-1) == 0
+    assert prepared.char_offset(100) == len(TEXT)
+    assert prepared.token_at(9) == 3
+    assert prepared.token_at(10) == 4
+    assert prepared.sentence_starts_between(1, 5) == [3]
+    assert prepared.sentence_starts_between(4, 8) == [6]
+
+
+def test_preprocessor_caches_recent_documents():
+    preprocessor = Preprocessor("", cache_size=1)
+    first = preprocessor.get(TEXT)
+    assert preprocessor.get(TEXT) is first
+    preprocessor.get("Another document.")
+    assert preprocessor.get(TEXT) is not first
+
+
+def make_context(breakpoints, boundary="token", max_tokens=2):
+    return ContrastContext(max_tokens=max_tokens, breakpoints_per_doc=breakpoints, ai_completions_per_breakpoint=1,
+                           client=None, seed=0, boundary=boundary)
+
+
+def test_breakpoints_are_distinct_token_starts():
+    doc = "The cat sat on the mat. " * 20
+    ctx = make_context(10)
+    breakpoints = get_breakpoints(ctx, doc)
+    assert len(set(breakpoints)) == 10
+    starts = set(int(offset) for offset in ctx.preprocessor.get(doc).offsets)
+    assert set(breakpoints) <= starts
+    # Seeded sampling depends only on the document
+    assert get_breakpoints(make_context(10), doc) == breakpoints
+
+
+def test_breakpoints_capped_by_candidates():
+    # Eight tokens leave six starts with a two-token suffix
+    assert sorted(get_breakpoints(make_context(20), TEXT)) == [2, 8, 9, 13, 16, 17]
+    # Only two sentence starts exist, so no breakpoint repeats
+    assert sorted(get_breakpoints(make_context(5, boundary="sentence"), TEXT)) == [9, 17]
+    assert get_breakpoints(make_context(3), "Hi") == []
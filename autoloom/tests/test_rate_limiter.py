@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from lui.models import rate_limiter
+from lui.models.rate_limiter import RateLimiter, TokenBucket
+
+
+def test_bucket_bursts_to_capacity_then_refills(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=2, capacity=4)
+    for _ in range(4):
+        assert bucket.delay_for(1) == 0.0
+        bucket.take(1)
+    assert bucket.delay_for(1) == pytest.approx(0.5)
+
+    now[0] += 1.0
+    assert bucket.delay_for(2) == 0.0
+    # Refill never exceeds the capacity
+    now[0] += 100.0
+    bucket.take(0)
+    assert bucket.tokens == 4
+    # A request larger than the bucket waits only for a full bucket
+    assert bucket.delay_for(10) == 0.0
+
+
+def test_requests_per_second_paces_after_the_burst():
+    limiter = RateLimiter(requests_per_second=20)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        async def one():
+            async with limiter.acquire():
+                return loop.time() - started
+
+        return await asyncio.gather(*(one() for _ in range(30)))
+
+    times = sorted(asyncio.run(run()))
+    assert times[19] < 0.1
+    # Ten requests past the burst of twenty take about half a second at 20/s
+    assert times[-1] == pytest.approx(0.5, abs=0.15)
+
+
+def test_concurrency_limit():
+    limiter = RateLimiter(max_concurrency=2)
+    in_flight = []
+
+    async def one():
+        async with limiter.acquire():
+            in_flight.append(limiter.stats.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(one() for _ in range(6)))
+
+    asyncio.run(run())
+    assert max(in_flight) == 2
+    summary = limiter.stats.summary()
+    assert summary['requests'] == 6 and summary['in_flight'] == 0
+    assert summary['max_wait'] > 0
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from lui.models import resilience
+from lui.models.rate_limiter import RateLimiter
+from lui.models.resilience import (
+    CircuitBreaker, RetryPolicy, RetryableError, _parse_duration, error_for_status, get_circuit_breaker,
+    parse_retry_after,
+)
+
+
+def test_parse_duration():
+    assert _parse_duration("20ms") == pytest.approx(0.02)
+    assert _parse_duration("1s") == 1.0
+    assert _parse_duration("6m0s") == 360.0
+    assert _parse_duration("1.5") == 1.5
+    assert _parse_duration("soon") is None
+
+
+def test_retry_after_header_wins():
+    headers = {"Retry-After": "2", "x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "6m0s"}
+    assert parse_retry_after(headers, 429) == 2.0
+    assert parse_retry_after({"retry-after": "3"}, 503) == 3.0
+
+
+def test_reset_headers_only_for_exhausted_limits_on_429():
+    headers = {
+        "x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1s",
+        "x-ratelimit-remaining-tokens": "5000", "x-ratelimit-reset-tokens": "6m0s",
+    }
+    assert parse_retry_after(headers, 429) == 1.0
+    # A server error says nothing about rate limits, whatever the headers
+    assert parse_retry_after(headers, 503) is None
+    assert parse_retry_after({"x-ratelimit-reset-tokens": "6m0s"}, 429) is None
+
+
+def test_error_for_status():
+    error = error_for_status(429, {"Retry-After": "1"}, "slow down")
+    assert isinstance(error, RetryableError) and error.retry_after == 1.0
+    assert not isinstance(error_for_status(401, {}, "bad key"), RetryableError)
+
+
+def test_circuit_breaker_opens_and_probes(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] += 10
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_retry_policy_deadline_bounds_running_attempt():
+    async def hang():
+        await asyncio.sleep(10)
+
+    policy = RetryPolicy(max_attempts=5, base_delay=0.01, deadline=0.1)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(policy.call("http://deadline.test/v1", hang))
+
+
+def test_rate_limiter_wait_is_outside_deadline_and_breaker():
+    limiter = RateLimiter(requests_per_second=10)
+    policy = RetryPolicy(max_attempts=1, deadline=0.2)
+    url = "http://queued.test/v1"
+
+    async def request():
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(*(policy.call(url, request, admit=lambda: limiter.acquire(1))
+                                      for _ in range(20)))
+
+    # Twenty calls at ten per second queue for about a second, well past the deadline
+    assert asyncio.run(run()) == ["ok"] * 20
+    breaker = get_circuit_breaker(url)
+    assert breaker.state == "closed" and breaker.failures == 0
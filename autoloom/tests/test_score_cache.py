@@ -0,0 +1,55 @@
+from lui.models.score_cache import ScoreCache
+
+
+def test_keys_depend_on_every_part():
+    key = ScoreCache.make_key("gpt-4", "prompt", "text")
+    assert key == ScoreCache.make_key("gpt-4", "prompt", "text")
+    assert key != ScoreCache.make_key("gpt-4", "prompt", "other")
+    assert key != ScoreCache.make_key("gpt-4:logprob", "prompt", "text")
+    # Parts are separated, so moving characters across them changes the key
+    assert ScoreCache.make_key("a", "bc", "") != ScoreCache.make_key("ab", "c", "")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ScoreCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.summary()['hits'] == 3 and cache.summary()['misses'] == 1
+
+
+def test_sqlite_tier_survives_restarts(tmp_path):
+    path = str(tmp_path / "cache" / "scores.sqlite")
+    cache = ScoreCache(max_entries=1, path=path)
+    cache.put("a", 10)
+    cache.put("b", 20)
+    # "a" was evicted from memory but is still on disk
+    assert cache.get("a") == 10
+    assert cache.summary()['disk_hits'] == 1
+    cache.close()
+
+    reopened = ScoreCache(path=path)
+    assert reopened.get("b") == 20
+    assert reopened.get("missing") is None
+    assert reopened.summary()['disk_hits'] == 1
+    reopened.close()
+
+
+def test_sqlite_writes_are_committed_in_batches(tmp_path):
+    path = str(tmp_path / "scores.sqlite")
+    cache = ScoreCache(path=path, commit_every=3, commit_interval=60)
+    other = ScoreCache(path=path)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    # Not committed yet, so another connection cannot see them
+    assert other.get("a") is None
+    cache.put("c", 3)
+    assert other.get("a") == 1
+    cache.put("d", 4)
+    cache.flush()
+    assert other.get("d") == 4
+    cache.close()
+    other.close()
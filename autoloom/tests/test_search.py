@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from lui.engine import LoomParams
+from lui.search import SearchParams, TreeSearch
+from lui.tree import NodeStore
+
+
+class StubGenerator:
+    """Samples fixed continuations and scores them from a table, recording every call"""
+    def __init__(self, continuations, score):
+        self.continuations = continuations
+        self.score = score
+        self.prompts = []
+        self.prefixes = []
+
+    async def generate_batch(self, prompt, model, max_tokens, temperature, n=5):
+        self.prompts.append(prompt)
+        return self.continuations[:n]
+
+    async def classify(self, generations, classifier_model, callback=None, prefix=""):
+        self.prefixes.append(prefix)
+        scores = [(idx, self.score(prefix, text)) for idx, text in enumerate(generations)]
+        return sorted(scores, key=lambda item: item[1], reverse=True)
+
+
+def search(generator, **kwargs) -> TreeSearch:
+    return TreeSearch(generator, LoomParams("stub", "stub"), SearchParams(**kwargs))
+
+
+def test_beam_keeps_only_the_best_nodes_at_each_depth():
+    base = {" a": 10, " b": 50, " c": 30}
+    # Children of a " c" node score 5 higher, so the second-ranked branch wins at depth 2
+    generator = StubGenerator([" a", " b", " c"], lambda prefix, text: base[text] + (5 if prefix.endswith(" c") else 0))
+    result = asyncio.run(search(generator, strategy="beam", beam_width=2, branching=3, depth=2).run("Root"))
+    store = result.store
+
+    assert result.best_text == "Root c b"
+    assert store.score(result.best) == 55
+    # Depth 1 keeps " b" and " c"; the pruned " a" is never expanded
+    assert generator.prompts == ["Root", "Root b", "Root c"]
+    assert generator.prefixes == generator.prompts
+    assert result.requests == 3
+    pruned = [node for node in store.children(NodeStore.ROOT) if store.texts[node] == " a"]
+    assert len(pruned) == 1 and store.children(pruned[0]) == []
+    assert len(store) == 1 + 3 + 6
+
+
+def test_beam_stops_when_nothing_generates():
+    generator = StubGenerator(["Error: unavailable"], lambda prefix, text: 0)
+    result = asyncio.run(search(generator, strategy="beam", depth=3).run("Root"))
+
+    assert result.best == NodeStore.ROOT
+    assert result.requests == 1
+
+
+def test_mcts_expands_by_ucb_and_backs_up_values():
+    generator = StubGenerator([" x", " y"], lambda prefix, text: 80 if text == " x" else 20)
+    result = asyncio.run(search(generator, strategy="mcts", beam_width=1, branching=2,
+                                depth=2, iterations=3).run("Root"))
+    store = result.store
+    x, y = (node for node in store.children(NodeStore.ROOT))
+    assert (store.texts[x], store.texts[y]) == (" x", " y")
+
+    # The better child is expanded first, then exploration pulls in the less visited one
+    assert generator.prompts == ["Root", "Root x", "Root y"]
+    assert result.requests == 3
+
+    # Every expansion backs two child values (score / 100) up to the root;
+    # the virtual visits used to spread selections are undone
+    assert store.visits[NodeStore.ROOT] == 6
+    assert store.value_sums[NodeStore.ROOT] == pytest.approx(3.0)
+    assert store.visits[x] == 3 and store.value_sums[x] == pytest.approx(1.8)
+    assert store.visits[y] == 3 and store.value_sums[y] == pytest.approx(1.2)
+    for child in store.children(x) + store.children(y):
+        assert store.visits[child] == 1
+
+    # The best result is the highest scored node at the deepest level
+    assert store.depths[result.best] == 2
+    assert result.best_text == "Root x x"
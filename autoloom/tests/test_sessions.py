@@ -0,0 +1,160 @@
+import asyncio
+
+from lui.engine import LoomEngine, LoomParams, RoundResult
+from lui.sessions import SessionScheduler
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrency_limit_queues_extra_sessions():
+    async def main():
+        scheduler = SessionScheduler(max_sessions=2)
+        gate = asyncio.Event()
+        running = []
+
+        async def run(session):
+            running.append(session.id)
+            await gate.wait()
+            return session.id
+
+        sessions = [scheduler.start(run) for _ in range(3)]
+        await settle()
+        states = [session.state for session in sessions]
+        seen = list(running)
+        gate.set()
+        results = await asyncio.gather(*(session.task for session in sessions))
+        return sessions, states, seen, results, scheduler
+
+    sessions, states, seen, results, scheduler = asyncio.run(main())
+    assert states == ["running", "running", "queued"]
+    assert seen == [0, 1]
+    assert results == [0, 1, 2]
+    assert [session.state for session in sessions] == ["finished"] * 3
+    assert scheduler.sessions == []
+
+
+def test_pause_holds_at_checkpoint_until_resumed():
+    async def main():
+        scheduler = SessionScheduler()
+        steps = []
+        first_step = asyncio.Event()
+
+        async def run(session):
+            for step in range(3):
+                await session.checkpoint()
+                steps.append(step)
+                first_step.set()
+                await asyncio.sleep(0.01)
+
+        session = scheduler.start(run)
+        await first_step.wait()
+        # The step in progress is not interrupted; the session stops at its next checkpoint
+        scheduler.pause(session.id)
+        await asyncio.sleep(0.05)
+        held, state = list(steps), session.state
+        scheduler.resume(session.id)
+        await session.task
+        return held, state, steps, session
+
+    held, state, steps, session = asyncio.run(main())
+    assert state == "paused"
+    assert held == [0]
+    assert steps == [0, 1, 2]
+    assert session.state == "finished"
+
+
+def test_cancel_running_and_paused_sessions():
+    async def main():
+        scheduler = SessionScheduler(max_sessions=1)
+        stopped = []
+
+        async def run(session):
+            try:
+                while True:
+                    await session.checkpoint()
+                    await asyncio.sleep(0.01)
+            finally:
+                stopped.append(session.id)
+
+        running = scheduler.start(run)
+        queued = scheduler.start(run)
+        await settle()
+        # Cancelling waits for the running session's cleanup and frees its slot
+        await scheduler.cancel(running.id)
+        assert running.state == "cancelled" and stopped == [0]
+        await settle()
+        assert queued.state == "running"
+
+        scheduler.pause(queued.id)
+        await asyncio.sleep(0.05)
+        assert queued.state == "paused"
+        await scheduler.cancel(queued.id)
+        return queued, stopped, scheduler
+
+    queued, stopped, scheduler = asyncio.run(main())
+    assert queued.state == "cancelled"
+    assert stopped == [0, 1]
+    assert scheduler.sessions == []
+
+
+def test_failed_session_is_marked_failed():
+    async def main():
+        scheduler = SessionScheduler()
+
+        async def run(session):
+            raise RuntimeError("boom")
+
+        session = scheduler.start(run)
+        await asyncio.gather(session.task, return_exceptions=True)
+        return session
+
+    assert asyncio.run(main()).state == "failed"
+
+
+def test_close_cancels_every_session():
+    async def main():
+        scheduler = SessionScheduler(max_sessions=1)
+
+        async def run(session):
+            await asyncio.sleep(10)
+
+        sessions = [scheduler.start(run) for _ in range(3)]
+        await settle()
+        await scheduler.close()
+        return sessions, scheduler
+
+    sessions, scheduler = asyncio.run(main())
+    assert [session.state for session in sessions] == ["cancelled"] * 3
+    assert scheduler.sessions == []
+
+
+def test_run_session_pauses_between_rounds(monkeypatch):
+    async def main():
+        rounds = []
+        gate = asyncio.Event()
+
+        async def run_round(self, prompt, params, listener=None):
+            rounds.append(prompt)
+            await gate.wait()
+            return RoundResult(prompt, [prompt + " more"], [(0, 50)])
+
+        monkeypatch.setattr(LoomEngine, "run_round", run_round)
+        engine = LoomEngine(generator=object())
+        scheduler = SessionScheduler()
+        params = LoomParams("mock-base", "mock-classifier")
+        session = scheduler.start(lambda session: engine.run_session("Once", params, 3, session=session))
+        await settle()
+        # Pausing mid-round lets that round finish, then holds before the next one
+        scheduler.pause(session.id)
+        gate.set()
+        await settle()
+        held = list(rounds)
+        scheduler.resume(session.id)
+        return held, await session.task
+
+    held, results = asyncio.run(main())
+    assert held == ["Once"]
+    assert [result.prompt for result in results] == ["Once", "Once more", "Once more more"]
@@ -0,0 +1,37 @@
+from lui.models.splitting import ChunkLimit, RequestSplitter, split_n
+
+
+def test_split_n_is_even():
+    assert split_n(5, 4) == [3, 2]
+    assert split_n(8, 4) == [4, 4]
+    assert split_n(3, 16) == [3]
+    assert split_n(0, 4) == []
+
+
+def test_limit_grows_when_round_was_split():
+    limit = ChunkLimit(size=4, max_size=16, slowdown=2.0)
+    for chunk in split_n(5, limit.size):
+        limit.record_success(chunk, max_tokens=10, seconds=1.0, requested=5)
+    assert limit.size == 6
+    assert split_n(5, limit.size) == [5]
+
+
+def test_limit_does_not_grow_past_what_is_used():
+    limit = ChunkLimit(size=8, max_size=16, slowdown=2.0)
+    limit.record_success(3, max_tokens=10, seconds=1.0, requested=3)
+    assert limit.size == 8
+
+
+def test_limit_shrinks_on_failure_and_slowdown():
+    limit = ChunkLimit(size=16, max_size=16, slowdown=2.0)
+    limit.record_failure(16)
+    assert limit.size == 8
+    limit.record_success(8, max_tokens=10, seconds=1.0, requested=8)
+    limit.record_success(8, max_tokens=10, seconds=5.0, requested=8)
+    assert limit.size == 4 and limit.slow == 1
+
+
+def test_splitter_starts_unsplit():
+    splitter = RequestSplitter(max_size=16)
+    assert splitter.split("openai", "gpt-4", 10) == [10]
+    assert RequestSplitter(initial_size=4).split("openai", "gpt-4", 10) == [4, 3, 3]
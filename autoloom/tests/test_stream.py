@@ -0,0 +1,118 @@
+import asyncio
+import json
+from typing import List
+
+import pytest
+from aiohttp import web
+
+from lui.models.generator import Generator
+from tests.mock_server import MockConfig, MockServer
+
+
+def event(choices) -> bytes:
+    return f"data: {json.dumps({'choices': choices})}\n\n".encode("utf-8")
+
+
+class ScriptedServer(MockServer):
+    """Streams a fixed list of byte writes; batch requests get the usual mock answer"""
+    def __init__(self, writes: List[bytes]):
+        super().__init__(MockConfig(latency=0.0, jitter=0.0, token_delay=0.0))
+        self.writes = writes
+        self.streams = 0
+
+    async def completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        if not body.get("stream"):
+            return await super().completions(request)
+        self.streams += 1
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for data in self.writes:
+            await response.write(data)
+            # Separate writes arrive as separate reads, splitting events mid-line
+            await asyncio.sleep(0.01)
+        return response
+
+
+@pytest.fixture
+def stream_against(isolated_clients):
+    """Run generate_stream against a ScriptedServer; returns texts and the on_token/on_choice calls"""
+    def run(writes: List[bytes], n: int = 2):
+        server = ScriptedServer(writes)
+        tokens, choices = [], []
+
+        async def on_token(idx, text):
+            tokens.append((idx, text))
+
+        async def on_choice(idx, text):
+            choices.append((idx, text))
+
+        async def main():
+            await server.start()
+            isolated_clients.setenv("LOCAL_LLM_BASE_URL", server.base_url)
+            generator = Generator()
+            try:
+                texts = await generator.generate_stream("Once", "local:mock", max_tokens=4, temperature=1.0,
+                                                        n=n, on_token=on_token, on_choice=on_choice)
+            finally:
+                await generator.close()
+                await server.stop()
+            return texts
+
+        texts = asyncio.run(main())
+        return texts, tokens, choices, server
+    return run
+
+
+def test_stream_reassembles_events_split_across_reads(stream_against):
+    first = event([{"index": 0, "text": " hello", "finish_reason": None}])
+    texts, tokens, choices, _ = stream_against([
+        first[:10], first[10:],
+        b": keep-alive\n\n",
+        event([{"index": 1, "text": " world", "finish_reason": None}]),
+        event([{"index": 0, "text": "!", "finish_reason": "stop"}]),
+        event([{"index": 1, "text": "?", "finish_reason": "length"}]),
+        b"data: [DONE]\n\n",
+    ])
+
+    assert texts == [" hello!", " world?"]
+    assert tokens == [(0, " hello"), (1, " world"), (0, " hello!"), (1, " world?")]
+    assert choices == [(0, " hello!"), (1, " world?")]
+
+
+def test_stream_stops_at_done(stream_against):
+    texts, _, choices, server = stream_against([
+        event([{"index": 0, "text": " a", "finish_reason": "stop"}]),
+        b"data: [DONE]\n\n",
+        event([{"index": 1, "text": " never", "finish_reason": "stop"}]),
+    ])
+
+    # Choices the stream never finished are closed with what arrived
+    assert texts == [" a", ""]
+    assert choices == [(0, " a"), (1, "")]
+    assert server.streams == 1
+
+
+def test_stream_error_event_falls_back_to_batch(stream_against):
+    texts, _, choices, server = stream_against([
+        event([{"index": 0, "text": " partial", "finish_reason": None}]),
+        b'data: {"error": {"message": "overloaded", "type": "server_error"}}\n\n',
+    ])
+
+    # Nothing had finished, so the round is regenerated without streaming
+    assert server.stats.requests == 1
+    assert len(texts) == 2 and all(text.strip() for text in texts)
+    assert " partial" not in texts
+    assert sorted(idx for idx, _ in choices) == [0, 1]
+
+
+def test_stream_error_event_keeps_finished_choices(stream_against):
+    texts, _, choices, server = stream_against([
+        event([{"index": 0, "text": " done", "finish_reason": "stop"}]),
+        event([{"index": 1, "text": " cut", "finish_reason": None}]),
+        b'data: {"error": {"message": "overloaded"}}\n\n',
+    ])
+
+    assert texts == [" done", " cut"]
+    assert choices == [(0, " done"), (1, " cut")]
+    assert server.stats.requests == 0
@@ -0,0 +1,61 @@
+import io
+import json
+
+from lui.tree import NodeStore, format_score
+
+
+def test_add_links_children_and_depths():
+    store = NodeStore("Root")
+    a = store.add(NodeStore.ROOT, " a", 40)
+    b = store.add(NodeStore.ROOT, " b")
+    c = store.add(a, " c", 75.5)
+
+    assert (a, b, c) == (1, 2, 3)
+    assert len(store) == 4
+    assert store.children(NodeStore.ROOT) == [a, b]
+    assert store.children(a) == [c]
+    assert list(store.depths) == [0, 1, 1, 2]
+    assert store.score(a) == 40 and store.score(b) is None and store.score(c) == 75.5
+
+    store.set_score(b, 0)
+    assert store.score(b) == 0
+
+
+def test_path_and_text_follow_parent_pointers():
+    store = NodeStore("Once")
+    a = store.add(NodeStore.ROOT, " upon")
+    store.add(NodeStore.ROOT, " more")
+    b = store.add(a, " a")
+    c = store.add(b, " time")
+
+    assert store.path(c) == [NodeStore.ROOT, a, b, c]
+    assert store.path(NodeStore.ROOT) == [NodeStore.ROOT]
+    assert store.text(c) == "Once upon a time"
+    assert store.text(NodeStore.ROOT) == "Once"
+
+
+def test_export_jsonl_writes_only_new_nodes():
+    store = NodeStore("Root")
+    a = store.add(NodeStore.ROOT, " a", 10)
+    f = io.StringIO()
+
+    start = store.export_jsonl(f)
+    assert start == 2
+    store.add(a, " b")
+    start = store.export_jsonl(f, start)
+    assert start == 3
+    # Nothing new since the last export
+    assert store.export_jsonl(f, start) == 3
+
+    records = [json.loads(line) for line in f.getvalue().splitlines()]
+    assert records == [
+        {'id': 0, 'parent': -1, 'text': "Root", 'score': None},
+        {'id': 1, 'parent': 0, 'text': " a", 'score': 10},
+        {'id': 2, 'parent': 1, 'text': " b", 'score': None},
+    ]
+
+
+def test_format_score():
+    assert format_score(None) == "unscored"
+    assert format_score(42.0) == "42"
+    assert format_score(42.5) == "42.5"
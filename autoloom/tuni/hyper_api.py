@@ -1,39 +1,92 @@
+import asyncio
+import openai
 from openai import AsyncOpenAI
-from typing import List, Optional
+from typing import Dict, List, Optional
+from lui.models.transport import get_transport
+from lui.models.backends import get_backend_registry
+from lui.models.prefix import get_prefix_router
+from lui.models.splitting import split_n
+from lui.models.resilience import RetryableError, error_for_status
+from lui.telemetry import get_telemetry
 from .client_types import BaseClient
 
+DEFAULT_MODEL = 'meta-llama/Meta-Llama-3.1-405B'
+
 class HyperBaseClient(BaseClient):
-    def __init__(self, config: dict):
-        if not config['HYPERBOLIC_API_KEY']:
-            raise ValueError('HYPERBOLIC_API_KEY is not set in the config')
-            
-        self.client = AsyncOpenAI(
-            api_key=config['HYPERBOLIC_API_KEY'],
-            base_url='https://api.hyperbolic.xyz/v1'
-        )
+    """Completions client for any backend in the shared registry (Hyperbolic by default)"""
+    def __init__(self, config: dict, model: str = DEFAULT_MODEL, temperature: float = 1.0):
+        self.backend, self.model = get_backend_registry().resolve(model)
+        self.temperature = temperature
+        api_key = config.get(self.backend.api_key_env) or self.backend.api_key
+        if self.backend.name != "local" and not api_key:
+            raise ValueError(f'{self.backend.api_key_env} is not set in the config')
+        # The SDK insists on a key; local servers accept any
+        self.api_key = api_key or "none"
+        self._clients: Dict[str, AsyncOpenAI] = {}
+        self.client = self.client_for(self.backend.base_url)
+        self.retry_policy = self.backend.retry_policy()
+
+    def client_for(self, server: str) -> AsyncOpenAI:
+        """One SDK client per backend replica, all on the shared connection pool"""
+        if server not in self._clients:
+            self._clients[server] = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=server,
+                http_client=get_transport().get_httpx_client(),
+                timeout=self.backend.timeout,
+                # Retries are handled by the shared RetryPolicy instead of the SDK
+                max_retries=0
+            )
+        return self._clients[server]
 
     async def multiQuery(self, 
                         prompt: str, 
                         max_tokens: int, 
                         n: int, 
                         stop: Optional[str] = None) -> List[str]:
-        """Generate multiple completions for a given prompt"""
+        """Generate multiple completions for a given prompt; raises if the request ultimately fails.
+
+        Rounds larger than the backend's max_n are sent as several requests.
+        A query identical to one in flight (a breakpoint drawn twice) shares its completions.
+        """
+        key = (self.backend.name, self.model, self.temperature, prompt, max_tokens, n, stop)
+        return list(await get_prefix_router().coalesce(key, lambda: self._query(prompt, max_tokens, n, stop)))
+
+    async def _query(self, prompt: str, max_tokens: int, n: int, stop: Optional[str]) -> List[str]:
+        if self.backend.max_n is not None and n > self.backend.max_n:
+            parts = await asyncio.gather(*(self._query(prompt, max_tokens, part, stop)
+                                           for part in split_n(n, self.backend.max_n)))
+            return [text for part in parts for text in part]
+
         params = {
-            'model': 'meta-llama/Meta-Llama-3.1-405B',
+            'model': self.model,
             'prompt': prompt,
             'max_tokens': max_tokens,
             'n': n,
             'stop': stop,
-            'temperature': 1.0
+            'temperature': self.temperature
         }
         
-        try:
-            response = await self.client.completions.create(**params)
-            return [choice.text for choice in response.choices if choice.text]
-        except Exception as e:
-            print(f"Error in multiQuery: {str(e)}")
-            return [f"Error: {str(e)}"] * n
-            
+        telemetry = get_telemetry()
+        # Breakpoints of one document share its opening, so they go to the same replica
+        client = self.client_for(self.backend.server_for(prompt))
+
+        async def request():
+            try:
+                with telemetry.span("http.completions", backend=self.backend.name, model=self.model, n=n,
+                                    max_tokens=max_tokens):
+                    response = await client.completions.create(**params)
+                    if response.usage is not None:
+                        telemetry.record_usage(response.usage.model_dump())
+                    return response
+            except openai.APIStatusError as e:
+                raise error_for_status(e.status_code, e.response.headers, str(e))
+            except (openai.APIConnectionError, openai.APITimeoutError) as e:
+                raise RetryableError(str(e))
+
+        # Failures propagate so the caller can skip (and later resume) this breakpoint
+        response = await self.retry_policy.call(str(client.base_url), request)
+        return [choice.text for choice in response.choices if choice.text]
+
     async def close(self):
-        """Close the client session"""
-        await self.client.close()
\ No newline at end of file
+        """Nothing to release; connections belong to the shared transport"""
\ No newline at end of file
@@ -1,58 +1,111 @@
 # tuni/main.py
 # Standard library imports
-from typing import List
-import json
+from typing import Dict, Iterator, List
+import argparse
 import asyncio
 from pathlib import Path
 
 # Local imports
+from lui.models.prefix import get_prefix_router
+from lui.models.transport import close_transport
+from lui.telemetry import configure_logging
 from .config import read_config
-from .hyper_api import HyperBaseClient
-from .tuner import ContrastContext, get_doc_examples
+from .hyper_api import DEFAULT_MODEL, HyperBaseClient
+from .tuner import ContrastContext
+from .pipeline import CorpusPipeline
+from .output import ExampleWriter
 
-async def read_corpus_from_folder(folder: str) -> List[str]:
-    folder_path = Path(folder)
-    texts = []
-    for file_path in folder_path.glob("*.txt"):
+def corpus_files(folder: str) -> List[Path]:
+    return sorted(Path(folder).glob("*.txt"))
+
+def read_corpus(files: List[Path]) -> Iterator[str]:
+    """Yield each file's text when the pipeline asks for it, so only queued documents are held in memory"""
+    for file_path in files:
         try:
             with open(file_path, "r", encoding="utf-8") as f:
-                texts.append(f.read())
+                yield f.read()
         except Exception as e:
             print(f"Error reading {file_path}: {e}")
-    return texts
 
-async def amain():
+async def amain(args: argparse.Namespace):
+    writer = None
     try:
         config = read_config()
-        client = HyperBaseClient(config)
+        client = HyperBaseClient(config, model=args.model, temperature=args.temperature)
         ctx = ContrastContext(
-            max_tokens=5,
-            breakpoints_per_doc=3,
-            ai_completions_per_breakpoint=5,
-            client=client
+            max_tokens=args.max_tokens,
+            breakpoints_per_doc=args.breakpoints,
+            ai_completions_per_breakpoint=args.completions,
+            client=client,
+            seed=args.seed,
+            boundary=args.boundary,
+            max_prefix_tokens=args.max_prefix_tokens,
+            preprocess_workers=args.preprocess_workers
         )
-        
-        text = input("Enter the text to tune on: ")
-        examples = await get_doc_examples(ctx, text)
-        
-        # Write to JSONL file
-        output_path = Path("tunes") / "generated_examples.jsonl"
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(output_path, "w", encoding="utf-8") as f:
-            for example in examples:
-                f.write(json.dumps(example) + "\n")
-                
-        print(f"Generated examples saved to {output_path}")
+
+        if args.folder:
+            files = corpus_files(args.folder)
+            docs, docs_total = read_corpus(files), len(files)
+            print(f"Found {docs_total} documents in {args.folder}")
+        else:
+            docs, docs_total = [input("Enter the text to tune on: ")], 1
+
+        # Examples are streamed to disk as breakpoints finish, so an interrupted run can --resume
+        output_path = Path(args.output)
+        writer = ExampleWriter(output_path, shards=args.shards, buffer_size=args.buffer_size, resume=args.resume)
+
+        async def on_examples(doc_key: str, breakpoint: int, examples: List[Dict]):
+            writer.add(doc_key, breakpoint, examples)
+
+        pipeline = CorpusPipeline(
+            ctx,
+            doc_concurrency=args.doc_concurrency,
+            request_concurrency=args.request_concurrency,
+            on_examples=on_examples,
+            is_done=writer.is_done
+        )
+        await pipeline.run(docs, docs_total=docs_total)
+        writer.flush()
+        print(f"Generated {writer.examples_written} examples saved to {', '.join(str(p) for p in writer.paths)}")
+        if get_prefix_router().coalesced:
+            print(f"Duplicate queries coalesced: {get_prefix_router().summary()}")
         
     finally:
+        if writer is not None:
+            writer.close()
+        if 'ctx' in locals():
+            ctx.preprocessor.close()
         if 'client' in locals():
             await client.close()
+        await close_transport()
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate human-vs-AI contrast examples for fine-tuning")
+    parser.add_argument("--folder", help="Folder of .txt documents; prompts for a single text if omitted")
+    parser.add_argument("-o", "--output", default=str(Path("tunes") / "generated_examples.jsonl"))
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Completion model; routed through the backend registry")
+    parser.add_argument("--temperature", type=float, default=1.0)
+    parser.add_argument("--max-tokens", type=int, default=5, help="Length of each suffix in tokens")
+    parser.add_argument("--boundary", choices=["token", "sentence"], default="token",
+                        help="Place breakpoints at token starts or, where the document has them, sentence starts")
+    parser.add_argument("--max-prefix-tokens", type=int, default=None, help="Keep at most this many tokens of prompt before each breakpoint")
+    parser.add_argument("--preprocess-workers", type=int, default=0, help="Processes tokenizing large documents (0 tokenizes inline)")
+    parser.add_argument("--breakpoints", type=int, default=3, help="Breakpoints per document")
+    parser.add_argument("--completions", type=int, default=5, help="AI completions per breakpoint")
+    parser.add_argument("--doc-concurrency", type=int, default=8, help="Documents processed at once")
+    parser.add_argument("--request-concurrency", type=int, default=16, help="API requests in flight across all documents")
+    parser.add_argument("--shards", type=int, default=1, help="Split output across this many files by document")
+    parser.add_argument("--buffer-size", type=int, default=32, help="Breakpoints buffered before writing to disk")
+    parser.add_argument("--resume", action="store_true", help="Keep existing output and skip breakpoints already in the checkpoint")
+    parser.add_argument("--seed", type=int, default=0, help="Breakpoint sampling seed; keep it fixed when resuming")
+    return parser.parse_args()
 
 def main():
     """Synchronous entry point"""
+    args = parse_args()
+    configure_logging()
     try:
-        asyncio.get_event_loop().run_until_complete(amain())
+        asyncio.run(amain(args))
     except KeyboardInterrupt:
         print("\nProcess interrupted by user")
     except Exception as e:
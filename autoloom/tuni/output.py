@@ -0,0 +1,95 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+
+def shard_paths(output_path: Path, shards: int) -> List[Path]:
+    """generated_examples.jsonl, or generated_examples-000.jsonl ... when sharded"""
+    if shards <= 1:
+        return [output_path]
+    return [output_path.with_name(f"{output_path.stem}-{i:03d}{output_path.suffix}") for i in range(shards)]
+
+
+def manifest_path(output_path: Path) -> Path:
+    return output_path.with_name(f"{output_path.stem}.checkpoint.jsonl")
+
+
+class CheckpointManifest:
+    """Append-only record of finished (document hash, breakpoint) pairs"""
+    def __init__(self, path: Path):
+        self.path = path
+        self.done: Set[Tuple[str, int]] = set()
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A run killed mid-write can leave a partial last line
+                        continue
+                    self.done.add((entry['doc'], entry['breakpoint']))
+        self._file = open(path, "a", encoding="utf-8")
+
+    def is_done(self, doc_key: str, breakpoint: int) -> bool:
+        return (doc_key, breakpoint) in self.done
+
+    def mark_done(self, entries: List[Tuple[str, int]]):
+        for doc_key, breakpoint in entries:
+            self.done.add((doc_key, breakpoint))
+            self._file.write(json.dumps({'doc': doc_key, 'breakpoint': breakpoint}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ExampleWriter:
+    """Buffered, optionally sharded JSONL output with a resumable checkpoint.
+
+    Examples are buffered and written `buffer_size` breakpoints at a time.
+    A breakpoint is marked done in the manifest only after its examples have
+    been flushed, so a crash can repeat a breakpoint but never lose one.
+    """
+    def __init__(self, output_path: Path, shards: int = 1, buffer_size: int = 32, resume: bool = False):
+        self.paths = shard_paths(output_path, shards)
+        self.buffer_size = buffer_size
+        self.examples_written = 0
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        checkpoint = manifest_path(output_path)
+        if not resume:
+            for path in self.paths + [checkpoint]:
+                if path.exists():
+                    path.unlink()
+        self.manifest = CheckpointManifest(checkpoint)
+
+        self._files = [open(path, "a", encoding="utf-8") for path in self.paths]
+        self._buffers: List[List[str]] = [[] for _ in self.paths]
+        self._pending: List[Tuple[str, int]] = []
+
+    def is_done(self, doc_key: str, breakpoint: int) -> bool:
+        return self.manifest.is_done(doc_key, breakpoint)
+
+    def add(self, doc_key: str, breakpoint: int, examples: List[Dict]):
+        shard = int(doc_key, 16) % len(self._files)
+        self._buffers[shard].extend(json.dumps(example) + "\n" for example in examples)
+        self._pending.append((doc_key, breakpoint))
+        if len(self._pending) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        for f, buffer in zip(self._files, self._buffers):
+            if buffer:
+                f.writelines(buffer)
+                f.flush()
+                self.examples_written += len(buffer)
+                buffer.clear()
+        if self._pending:
+            self.manifest.mark_done(self._pending)
+            self._pending = []
+
+    def close(self):
+        self.flush()
+        for f in self._files:
+            f.close()
+        self.manifest.close()
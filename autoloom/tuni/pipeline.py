@@ -0,0 +1,135 @@
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+from .tuner import ContrastContext, doc_hash, get_breakpoints, get_breakpoint_examples
+
+# Called with (document hash, breakpoint, examples) as each breakpoint finishes
+ExamplesCallback = Callable[[str, int, List[Dict]], Awaitable[None]]
+# Returns True for (document hash, breakpoint) pairs finished by an earlier run
+DoneCheck = Callable[[str, int], bool]
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineProgress:
+    """Counters for a corpus run, printed at most every `interval` seconds"""
+    def __init__(self, docs_total: Optional[int] = None, interval: float = 5.0):
+        self.docs_total = docs_total
+        self.docs_done = 0
+        self.breakpoints_done = 0
+        self.breakpoints_failed = 0
+        self.breakpoints_skipped = 0
+        self.examples = 0
+        self.interval = interval
+        self.started = time.monotonic()
+        self._last_report = 0.0
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self.started
+        docs = f"{self.docs_done}/{self.docs_total}" if self.docs_total is not None else str(self.docs_done)
+        rate = self.breakpoints_done / elapsed if elapsed > 0 else 0.0
+        return (f"docs {docs}, breakpoints {self.breakpoints_done} ({self.breakpoints_failed} failed, {self.breakpoints_skipped} skipped), "
+                f"examples {self.examples}, {rate:.2f} breakpoints/s, {elapsed:.0f}s elapsed")
+
+    def report(self, force: bool = False):
+        now = time.monotonic()
+        if force or now - self._last_report >= self.interval:
+            self._last_report = now
+            print(self.line())
+
+
+class CorpusPipeline:
+    """Builds contrast examples for a corpus with bounded concurrency.
+
+    Documents flow through a bounded queue to `doc_concurrency` workers, so a
+    slow backend pushes back on the reader instead of piling up documents.
+    All breakpoints of all documents share `request_concurrency` request slots.
+    Breakpoints for which `is_done` returns True are skipped.
+    """
+    def __init__(self, ctx: ContrastContext, doc_concurrency: int = 8,
+                 request_concurrency: int = 16, queue_size: int = 32,
+                 on_examples: Optional[ExamplesCallback] = None,
+                 is_done: Optional[DoneCheck] = None,
+                 progress_interval: float = 5.0):
+        self.ctx = ctx
+        self.doc_concurrency = doc_concurrency
+        self.request_concurrency = request_concurrency
+        self.queue_size = queue_size
+        self.on_examples = on_examples
+        self.is_done = is_done
+        self.progress_interval = progress_interval
+        self.progress: Optional[PipelineProgress] = None
+
+    async def _run_breakpoint(self, doc_idx: int, doc_key: str, doc: str, breakpoint: int,
+                              semaphore: asyncio.Semaphore, collected: List[Dict]):
+        try:
+            async with semaphore:
+                examples = await get_breakpoint_examples(self.ctx, doc, breakpoint)
+        except Exception as e:
+            logger.warning("Error at breakpoint %d of document %d: %s", breakpoint, doc_idx, e)
+            self.progress.breakpoints_failed += 1
+            return
+
+        self.progress.breakpoints_done += 1
+        self.progress.examples += len(examples)
+        if self.on_examples:
+            await self.on_examples(doc_key, breakpoint, examples)
+        else:
+            collected.extend(examples)
+        self.progress.report()
+
+    async def _worker(self, queue: asyncio.Queue, semaphore: asyncio.Semaphore, collected: List[Dict]):
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                doc_idx, doc = item
+                doc_key = doc_hash(doc)
+                await self.ctx.preprocessor.prepare(doc)
+                try:
+                    # Each breakpoint's prompt is a prefix of the next one's, so shorter ones go first to warm prompt caches
+                    breakpoints = sorted(get_breakpoints(self.ctx, doc))
+                    if self.is_done:
+                        remaining = [bp for bp in breakpoints if not self.is_done(doc_key, bp)]
+                        self.progress.breakpoints_skipped += len(breakpoints) - len(remaining)
+                        breakpoints = remaining
+                    await asyncio.gather(*(
+                        self._run_breakpoint(doc_idx, doc_key, doc, breakpoint, semaphore, collected)
+                        for breakpoint in breakpoints
+                    ))
+                finally:
+                    # Every example of the document has been emitted; keep only queued documents in memory
+                    self.ctx.preprocessor.release(doc)
+                self.progress.docs_done += 1
+            finally:
+                queue.task_done()
+
+    async def run(self, docs: Iterable[str], docs_total: Optional[int] = None) -> List[Dict]:
+        """Process every document; returns the examples unless `on_examples` consumes them"""
+        if docs_total is None and hasattr(docs, "__len__"):
+            docs_total = len(docs)
+        self.progress = PipelineProgress(docs_total, self.progress_interval)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        semaphore = asyncio.Semaphore(self.request_concurrency)
+        collected: List[Dict] = []
+
+        async def produce():
+            for doc_idx, doc in enumerate(docs):
+                await queue.put((doc_idx, doc))
+            for _ in range(self.doc_concurrency):
+                await queue.put(None)
+
+        # A failing worker must not leave the producer blocked on a full queue
+        tasks = [asyncio.create_task(produce())]
+        tasks.extend(asyncio.create_task(self._worker(queue, semaphore, collected))
+                     for _ in range(self.doc_concurrency))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        self.progress.report(force=True)
+        return collected
@@ -0,0 +1,128 @@
+import re
+import asyncio
+import hashlib
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional; offsets fall back to plain lists
+    np = None
+
+from lui.models.context import get_token_counter
+
+# Sentence-ending punctuation, with any closing quotes or brackets, followed by whitespace
+SENTENCE_END = re.compile(r"[.!?][\"')\]]*(?=\s)")
+
+
+class PreparedDoc:
+    """A tokenized document: where each token starts, and which tokens begin a sentence.
+
+    `offsets` holds every token's start plus the document length, so token
+    `i` spans `offsets[i]:offsets[i + 1]`. Both are NumPy arrays when NumPy is
+    installed and sorted lists otherwise.
+    """
+    __slots__ = ("text", "offsets", "sentence_starts")
+
+    def __init__(self, text: str, offsets, sentence_starts):
+        self.text = text
+        self.offsets = offsets
+        self.sentence_starts = sentence_starts
+
+    @property
+    def n_tokens(self) -> int:
+        return len(self.offsets) - 1
+
+    def char_offset(self, token: int) -> int:
+        """Where token `token` starts; the document length past the last token"""
+        return int(self.offsets[max(0, min(token, self.n_tokens))])
+
+    def token_at(self, char: int) -> int:
+        """Index of the first token starting at or after character `char`"""
+        if np is not None:
+            return int(np.searchsorted(self.offsets, char))
+        return bisect_left(self.offsets, char)
+
+    def sentence_starts_between(self, first: int, last: int) -> List[int]:
+        """Tokens in [first, last] that begin a sentence"""
+        starts = self.sentence_starts
+        if np is not None:
+            return starts[(starts >= first) & (starts <= last)].tolist()
+        return [token for token in starts if first <= token <= last]
+
+
+def token_boundaries(text: str, model: str) -> Tuple[List[int], List[int]]:
+    """Token start offsets (with the document length appended) and the indices of tokens that begin a sentence"""
+    offsets = get_token_counter(model).offsets(text)
+    # Byte-level tokens inside one character share its offset; keep a single boundary there
+    if np is not None:
+        starts = np.unique(np.asarray(offsets + [len(text)], dtype=np.int64))
+        ends = np.fromiter((match.end() for match in SENTENCE_END.finditer(text)), dtype=np.int64)
+        return starts, np.flatnonzero(np.isin(starts, ends))
+    starts = sorted(set(offsets) | {len(text)})
+    ends = {match.end() for match in SENTENCE_END.finditer(text)}
+    return starts, [token for token, start in enumerate(starts) if start in ends]
+
+
+def doc_hash(doc: str) -> str:
+    return hashlib.sha256(doc.encode("utf-8")).hexdigest()[:16]
+
+
+def _prepare_in_worker(text: str, model: str):
+    return token_boundaries(text, model)
+
+
+class Preprocessor:
+    """Tokenizes each document once and keeps its boundaries for breakpoint sampling.
+
+    Documents are keyed by their hash. The corpus pipeline `release`s each
+    one once its examples are emitted; at most the `cache_size` most recent
+    documents are kept otherwise. With `workers`,
+    documents of at least `pool_threshold` characters are tokenized in a
+    process pool, so preprocessing keeps up with parallel requests on large
+    corpora.
+    """
+    def __init__(self, model: str, cache_size: int = 32, workers: int = 0, pool_threshold: int = 20000):
+        self.model = model
+        self.cache_size = cache_size
+        self.workers = workers
+        self.pool_threshold = pool_threshold
+        self._cache: "OrderedDict[str, PreparedDoc]" = OrderedDict()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _remember(self, text: str, offsets, sentence_starts) -> PreparedDoc:
+        prepared = PreparedDoc(text, offsets, sentence_starts)
+        self._cache[doc_hash(text)] = prepared
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return prepared
+
+    def get(self, text: str) -> PreparedDoc:
+        """The prepared document, tokenizing it here if it is not cached"""
+        key = doc_hash(text)
+        prepared = self._cache.get(key)
+        if prepared is not None:
+            self._cache.move_to_end(key)
+            return prepared
+        return self._remember(text, *token_boundaries(text, self.model))
+
+    async def prepare(self, text: str) -> PreparedDoc:
+        """Prepare a document ahead of sampling, in the process pool when it is large enough"""
+        if doc_hash(text) in self._cache or not self.workers or len(text) < self.pool_threshold:
+            return self.get(text)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        loop = asyncio.get_running_loop()
+        offsets, sentence_starts = await loop.run_in_executor(self._pool, _prepare_in_worker, text, self.model)
+        return self._remember(text, offsets, sentence_starts)
+
+    def release(self, text: str):
+        """Forget a document that will not be sampled again"""
+        self._cache.pop(doc_hash(text), None)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
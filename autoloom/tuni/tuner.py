@@ -1,14 +1,25 @@
 import random
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from .client_types import BaseClient
+from .preprocess import PreparedDoc, Preprocessor, doc_hash
 
 class ContrastContext:
     def __init__(self, max_tokens: int, breakpoints_per_doc: int, 
-                 ai_completions_per_breakpoint: int, client: BaseClient):
+                 ai_completions_per_breakpoint: int, client: BaseClient,
+                 seed: Optional[int] = None, boundary: str = "token",
+                 max_prefix_tokens: Optional[int] = None, preprocess_workers: int = 0):
         self.max_tokens = max_tokens
         self.breakpoints_per_doc = breakpoints_per_doc
         self.ai_completions_per_breakpoint = ai_completions_per_breakpoint
         self.client = client
+        # With a seed, breakpoints depend only on the document, so a resumed run picks the same ones
+        self.seed = seed
+        # Breakpoints fall on token starts, or on sentence starts where the document has any
+        self.boundary = boundary
+        # Prompts keep at most this many tokens before the breakpoint
+        self.max_prefix_tokens = max_prefix_tokens
+        # Documents are tokenized with the generation model's tokenizer (or its approximation)
+        self.preprocessor = Preprocessor(getattr(client, "model", ""), workers=preprocess_workers)
 
 def get_system_message() -> Dict[str, str]:
     return {"role": "system", "content": "You are a helpful assistant."}
@@ -29,39 +40,51 @@ def mk_fine_tuning_example(ctx: ContrastContext, prefix: str, suffix: str, is_hu
     }
 
 def get_breakpoints(ctx: ContrastContext, doc: str) -> List[int]:
-    return [random.randint(0, len(doc) - ctx.max_tokens) 
-            for _ in range(ctx.breakpoints_per_doc)]
+    """Distinct character offsets of token (or sentence) starts that leave a full `max_tokens` suffix where possible.
+
+    Documents shorter than that get breakpoints with whatever suffix remains;
+    documents with fewer than two tokens get none. A document with fewer
+    candidates than `breakpoints_per_doc` gets one breakpoint per candidate.
+    """
+    prepared = ctx.preprocessor.get(doc)
+    if prepared.n_tokens < 2:
+        return []
+    rng = random.Random(f"{ctx.seed}:{doc_hash(doc)}") if ctx.seed is not None else random
+    last = max(1, prepared.n_tokens - ctx.max_tokens)
+    sentences = prepared.sentence_starts_between(1, last) if ctx.boundary == "sentence" else []
+    candidates = sentences or range(1, last + 1)
+    tokens = rng.sample(candidates, min(ctx.breakpoints_per_doc, len(candidates)))
+    return [prepared.char_offset(token) for token in tokens]
+
+def get_prefix(ctx: ContrastContext, prepared: PreparedDoc, breakpoint: int) -> str:
+    """The text before a breakpoint, trimmed to the last `max_prefix_tokens` tokens"""
+    start = 0
+    if ctx.max_prefix_tokens is not None:
+        start = prepared.char_offset(prepared.token_at(breakpoint) - ctx.max_prefix_tokens)
+    return prepared.text[start:breakpoint].lstrip()
 
 def get_human_example(ctx: ContrastContext, doc: str, breakpoint: int) -> Dict:
+    prepared = ctx.preprocessor.get(doc)
+    end = prepared.char_offset(prepared.token_at(breakpoint) + ctx.max_tokens)
     return mk_fine_tuning_example(
         ctx, 
-        doc[:breakpoint], 
-        doc[breakpoint:breakpoint + ctx.max_tokens], 
+        get_prefix(ctx, prepared, breakpoint), 
+        doc[breakpoint:end], 
         True
     )
 
 async def get_ai_examples(ctx: ContrastContext, doc: str, breakpoint: int) -> List[Dict]:
+    prefix = get_prefix(ctx, ctx.preprocessor.get(doc), breakpoint)
     completions = await ctx.client.multiQuery(
-        doc[:breakpoint], 
+        prefix, 
         ctx.max_tokens,
         ctx.ai_completions_per_breakpoint
     )
-    return [mk_fine_tuning_example(ctx, doc[:breakpoint], completion, False) 
+    return [mk_fine_tuning_example(ctx, prefix, completion, False) 
             for completion in completions]
 
-async def get_doc_examples(ctx: ContrastContext, doc: str) -> List[Dict]:
-    breakpoints = get_breakpoints(ctx, doc)
-    all_examples = []
-    for breakpoint in breakpoints:
-        examples = [get_human_example(ctx, doc, breakpoint)]
-        ai_examples = await get_ai_examples(ctx, doc, breakpoint)
-        examples.extend(ai_examples)
-        all_examples.extend(examples)
-    return all_examples
-
-async def get_corpus_examples(ctx: ContrastContext, docs: List[str]) -> List[Dict]:
-    all_examples = []
-    for doc in docs:
-        examples = await get_doc_examples(ctx, doc)
-        all_examples.extend(examples)
-    return all_examples
\ No newline at end of file
+async def get_breakpoint_examples(ctx: ContrastContext, doc: str, breakpoint: int) -> List[Dict]:
+    """The human example at a breakpoint followed by its AI examples"""
+    examples = [get_human_example(ctx, doc, breakpoint)]
+    examples.extend(await get_ai_examples(ctx, doc, breakpoint))
+    return examples